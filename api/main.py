@@ -25,21 +25,48 @@ if sys.platform == "win32":
 from fastapi import FastAPI, WebSocket, HTTPException, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field, field_validator, ValidationError, model_validator
-from typing import Any, List, Literal, Optional, Union
-
-from sim_app.services import StructureFactory, ModalService, TimeSimulationService
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from sim_core.records import RECORD_NAME, default_library
+from sim_core.spectrum import spectrum_samples
+from sim_app.cache import ResponseCache
+from sim_app.executor import ExecutorBusy
+from sim_app.registry import RegisteredModel
+from sim_app.services import (StructureFactory, TimeSimulationService, MonteCarloService,
+                              DEFAULT_SPECTRUM_PERIODS, UPLOAD_AHEAD_MESSAGES, executor,
+                              frequency_response, ida_response, load_suite_response,
+                              modal_response, model_registry, register_model,
+                              registered_stepper, registry_key, scheduler, spectrum_response)
+from sim_app.session import SimulationSession
+from sim_app.upload import pump_record
 
 # ---------------------------------------------------------------------------
 # Resource / safety limits — tune here, not scattered through the code
 # ---------------------------------------------------------------------------
 
-MAX_DOFS             = 20          # stories; generous vs. the UI's 1-3 design
+MAX_DOFS             = 2000        # stories; ShearBuilding is stored banded, modal solve is tridiagonal
 MAX_TF               = 600.0       # seconds; cap on simulation duration
 MIN_DT               = 1e-4        # seconds; floor on time step (prevents runaway step count)
 MAX_SPEED            = 10.0        # playback speed multiplier (UI max is 2.0)
 MAX_WS_MESSAGE_BYTES = 1_048_576   # 1 MiB; explicit app gate before json.loads
+MAX_FRAMES_PER_MESSAGE = 1024      # steps packed into one binary WebSocket message
+MAX_OUTPUT_FPS       = 1000.0      # frames per wall-clock second; decimation target cap
+MAX_FFT_TF           = 3600.0      # seconds; frequency-domain runs have no step loop
+MAX_UPLOAD_SAMPLES   = 10_000_000  # samples in one streamed record (record_upload)
+MAX_SUITE_LOADS      = 256         # excitations advanced together in one load-suite run
+MAX_IDA_RECORDS      = 64          # records per IDA request (each integrated once)
+MAX_IDA_LEVELS       = 1000        # scale factors per IDA request (free: superposition)
+MAX_MC_SAMPLES       = 20_000      # realizations per Monte Carlo run (all kept for quantiles)
+MAX_MC_BATCH         = 1000        # realizations sampled and solved together in one worker job
+MAX_MC_QUANTILES     = 19          # quantiles reported per Monte Carlo statistic
+MAX_SPECTRUM_PERIODS = 500         # oscillators per damping ratio in /spectrum
+MAX_SPECTRUM_DAMPING = 10          # damping ratios per /spectrum request
+MAX_SPECTRUM_WORK    = 50_000_000  # oscillator-steps per /spectrum request (periods x damping x samples)
+MODAL_CACHE_ENTRIES  = 256         # cached /shear-building/modal responses (LRU)
+MODAL_CACHE_BYTES    = 64 * 1024 * 1024
+MODAL_CACHE_TTL      = 3600.0      # seconds
 
 # ---------------------------------------------------------------------------
 # CORS — set ALLOWED_ORIGINS env var in production (e.g. on Render)
@@ -55,6 +82,8 @@ ALLOWED_ORIGINS = [o.strip() for o in _origins_env.split(",") if o.strip()]
 # WebSocket payload schema
 # ---------------------------------------------------------------------------
 
+MODEL_ID_PATTERN = r"^[0-9a-f]{64}$"   # registry_key() of a POST /models request
+
 class ModelRequest(BaseModel):
     Hc:             List[Any]
     Ec:             List[Any]
@@ -125,6 +154,18 @@ class ForceFunction(BaseModel):
     amp:      float = 1000.0
     freq:     float = 0.0
     duration: float = Field(default=2.0, ge=0)
+    record:   str   = Field(default="el_centro", pattern=RECORD_NAME.pattern)
+
+
+class RecordUpload(BaseModel):
+    """
+    Announces a ground-motion record streamed after the JSON message, as
+    binary WebSocket messages of little-endian `dtype` samples in g (each
+    message at most MAX_WS_MESSAGE_BYTES), `npts` samples in all.
+    """
+    npts:  int   = Field(gt=1, le=MAX_UPLOAD_SAMPLES)
+    dt:    float = Field(gt=0)
+    dtype: Literal["float32", "float64"] = "float32"
 
 
 class InitialConditions(BaseModel):
@@ -137,16 +178,212 @@ class SimRequest(BaseModel):
     tf:                 float             = Field(default=60.0, gt=0,    le=MAX_TF)
     dt:                 float             = Field(default=0.02, ge=MIN_DT)
     speed:              float             = Field(default=1.0,  gt=0,    le=MAX_SPEED)
+    integrator:         Literal["newmark", "exact", "modal"] = "newmark"
+    modal_mass_threshold: float           = Field(default=1.0,  gt=0,    le=1.0)
+    protocol:           Literal["json", "binary"] = "json"
+    frames_per_message: int               = Field(default=16,   ge=1,    le=MAX_FRAMES_PER_MESSAGE)
+    binary_dtype:       Literal["float32", "float64"] = "float32"
+    output_fps:         Optional[float]   = Field(default=None, gt=0,    le=MAX_OUTPUT_FPS)
+    envelope:           bool              = False
     force_function:     ForceFunction     = Field(default_factory=ForceFunction)
     damping_ratios:     List[float]       = Field(default_factory=lambda: [0.02])
     initial_conditions: InitialConditions = Field(default_factory=InitialConditions)
+    record_upload:      Optional[RecordUpload] = None
+    session:            bool              = False   # keep the socket open for ControlMessages
+
+    @model_validator(mode="after")
+    def _check_upload(self) -> "SimRequest":
+        if self.record_upload is not None and self.force_function.type != "earthquake":
+            raise ValueError("record_upload requires force_function.type 'earthquake'")
+        if self.record_upload is not None and self.session:
+            raise ValueError("record_upload cannot be used in a session")
+        return self
+
+
+class ControlMessage(BaseModel):
+    """Text message steering a session (sim_req.session = true) after it started."""
+    action:         Literal["pause", "resume", "set_speed", "seek", "set_force", "stop"]
+    speed:          Optional[float]         = Field(default=None, gt=0, le=MAX_SPEED)
+    t:              Optional[float]         = Field(default=None, ge=0)
+    force_function: Optional[ForceFunction] = None
+
+    @model_validator(mode="after")
+    def _check_arguments(self) -> "ControlMessage":
+        required = {"set_speed": "speed", "seek": "t", "set_force": "force_function"}
+        name = required.get(self.action)
+        if name is not None and getattr(self, name) is None:
+            raise ValueError(f"'{self.action}' needs '{name}'")
+        return self
+
+
+class SpectrumRequest(BaseModel):
+    record:         str = Field(default="el_centro", pattern=RECORD_NAME.pattern)
+    periods:        Optional[List[float]] = Field(default=None, max_length=MAX_SPECTRUM_PERIODS)
+    damping_ratios: List[float] = Field(default_factory=lambda: [0.05],
+                                        min_length=1, max_length=MAX_SPECTRUM_DAMPING)
+
+    @field_validator("periods")
+    @classmethod
+    def _check_periods(cls, v):
+        if v is not None:
+            if len(v) == 0:
+                raise ValueError("periods must not be empty")
+            for i, T in enumerate(v):
+                if not math.isfinite(T) or not 0.01 <= T <= 20.0:
+                    raise ValueError(f"periods[{i}] must be between 0.01 and 20 s")
+        return v
+
+    @field_validator("damping_ratios")
+    @classmethod
+    def _check_damping(cls, v):
+        for i, z in enumerate(v):
+            if not math.isfinite(z) or not 0.0 <= z < 1.0:
+                raise ValueError(f"damping_ratios[{i}] must be in [0, 1)")
+        return v
+
+    @model_validator(mode="after")
+    def _check_work(self) -> "SpectrumRequest":
+        # Short periods shrink dt and long ones extend the run: bound the product
+        library = default_library()
+        if self.record not in library:
+            return self                      # 404 from the endpoint
+        periods = self.periods or DEFAULT_SPECTRUM_PERIODS
+        _, samples = spectrum_samples(library.get(self.record).duration, periods)
+        work = samples * len(periods) * len(self.damping_ratios)
+        if work > MAX_SPECTRUM_WORK:
+            raise ValueError(
+                f"{len(periods)} periods x {len(self.damping_ratios)} damping ratios x "
+                f"{samples} samples exceeds MAX_SPECTRUM_WORK={MAX_SPECTRUM_WORK}; "
+                "use fewer or longer periods."
+            )
+        return self
+
+
+class FrequencyRequest(BaseModel):
+    t0:                   float         = Field(default=0.0,  ge=0)
+    tf:                   float         = Field(default=60.0, gt=0,  le=MAX_FFT_TF)
+    dt:                   float         = Field(default=0.02, ge=MIN_DT)
+    mode:                 Literal["transient", "steady"] = "transient"
+    modal_mass_threshold: float         = Field(default=1.0,  gt=0,  le=1.0)
+    force_function:       ForceFunction = Field(default_factory=ForceFunction)
+    damping_ratios:       List[float]   = Field(default_factory=lambda: [0.02], min_length=1)
+    include_histories:    bool          = True
+    output_stride:        int           = Field(default=1,    ge=1)
+
+
+class LoadSuiteRequest(BaseModel):
+    t0:                 float               = Field(default=0.0,  ge=0)
+    tf:                 float               = Field(default=60.0, gt=0,  le=MAX_TF)
+    dt:                 float               = Field(default=0.02, ge=MIN_DT)
+    integrator:         Literal["newmark", "exact"] = "newmark"
+    loads:              List[ForceFunction] = Field(min_length=1, max_length=MAX_SUITE_LOADS)
+    damping_ratios:     List[float]         = Field(default_factory=lambda: [0.02], min_length=1)
+    include_histories:  bool                = False
+    output_stride:      int                 = Field(default=1,    ge=1)
+
+
+class IDARequest(BaseModel):
+    tf:                 float       = Field(default=60.0, gt=0,  le=MAX_TF)
+    dt:                 float       = Field(default=0.02, ge=MIN_DT)
+    integrator:         Literal["newmark", "exact"] = "newmark"
+    records:            List[str]   = Field(default_factory=lambda: ["el_centro"],
+                                            min_length=1, max_length=MAX_IDA_RECORDS)
+    scale_factors:      List[float] = Field(min_length=1, max_length=MAX_IDA_LEVELS)
+    damping_ratios:     List[float] = Field(default_factory=lambda: [0.02], min_length=1)
+    include_histories:  bool        = False
+    output_stride:      int         = Field(default=1,    ge=1)
+
+    @field_validator("records")
+    @classmethod
+    def _check_records(cls, v):
+        for i, name in enumerate(v):
+            if not RECORD_NAME.match(name):
+                raise ValueError(f"records[{i}] is not a valid record name")
+        return v
+
+    @field_validator("scale_factors")
+    @classmethod
+    def _check_scales(cls, v):
+        for i, s in enumerate(v):
+            if not math.isfinite(s) or s < 0:
+                raise ValueError(f"scale_factors[{i}] must be finite and >= 0")
+        return v
+
+
+class PropertyDistribution(BaseModel):
+    """Random factor (mean 1) on one model property, see sim_core.stochastic."""
+    dist:  Literal["fixed", "normal", "lognormal", "uniform"] = "fixed"
+    cov:   float = Field(default=0.0, ge=0, le=1.0)
+    low:   float = Field(default=1.0, gt=0)
+    high:  float = Field(default=1.0, gt=0)
+    scope: Literal["element", "story", "global"] = "element"
+
+    @model_validator(mode="after")
+    def _check_bounds(self) -> "PropertyDistribution":
+        if self.low > self.high:
+            raise ValueError("low must not exceed high")
+        return self
+
+
+class MonteCarloRequest(BaseModel):
+    distributions:      Dict[Literal["Ec", "Ic", "Hc", "floor_mass"], PropertyDistribution] \
+                                            = Field(default_factory=dict)
+    n_samples:          int                 = Field(default=1000, ge=2,  le=MAX_MC_SAMPLES)
+    batch_size:         int                 = Field(default=100,  ge=1,  le=MAX_MC_BATCH)
+    seed:               int                 = Field(default=0,    ge=0)
+    quantiles:          List[float]         = Field(default_factory=lambda: [0.05, 0.5, 0.95],
+                                                    min_length=1, max_length=MAX_MC_QUANTILES)
+    rel_tol:            float               = Field(default=0.01, gt=0,  le=1.0)
+    min_samples:        int                 = Field(default=200,  ge=2)
+    include_drifts:     bool                = True
+    t0:                 float               = Field(default=0.0,  ge=0)
+    tf:                 float               = Field(default=20.0, gt=0,  le=MAX_TF)
+    dt:                 float               = Field(default=0.02, ge=MIN_DT)
+    integrator:         Literal["newmark", "exact"] = "newmark"
+    force_function:     ForceFunction       = Field(default_factory=ForceFunction)
+    damping_ratios:     List[float]         = Field(default_factory=lambda: [0.02], min_length=1)
+
+    @field_validator("quantiles")
+    @classmethod
+    def _check_quantiles(cls, v):
+        for i, q in enumerate(v):
+            if not 0.0 <= q <= 1.0:
+                raise ValueError(f"quantiles[{i}] must be in [0, 1]")
+        return v
+
+
+class ModelReference(BaseModel):
+    """The model inline (model_req), or the ID POST /models returned for it."""
+    model_req: Optional[ModelRequest] = None
+    model_id:  Optional[str]          = Field(default=None, pattern=MODEL_ID_PATTERN)
+
+    @model_validator(mode="after")
+    def _check_model(self) -> "ModelReference":
+        if (self.model_req is None) == (self.model_id is None):
+            raise ValueError("exactly one of model_req and model_id is required")
+        return self
+
+
+class FrequencyPayload(ModelReference):
+    sim_req:   FrequencyRequest = Field(default_factory=FrequencyRequest)
+
+
+class LoadSuitePayload(ModelReference):
+    sim_req:   LoadSuiteRequest
 
 
-class WsPayload(BaseModel):
-    model_req: ModelRequest
+class IDAPayload(ModelReference):
+    sim_req:   IDARequest
+
+
+class WsPayload(ModelReference):
     sim_req:   SimRequest = Field(default_factory=SimRequest)
 
 
+class MonteCarloPayload(ModelReference):
+    sim_req:   MonteCarloRequest = Field(default_factory=MonteCarloRequest)
+
+
 app = FastAPI()
 
 app.add_middleware(
@@ -181,15 +418,17 @@ async def read_style_css():
 app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
 
-# === WebSocket endpoint ===
-@app.websocket("/ws/simulate")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-
+# === WebSocket endpoints ===
+async def _receive_payload(websocket: WebSocket, schema):
+    """
+    Read and validate a socket's first message against `schema` (a
+    ModelReference), resolving a model_id. (payload, registry entry or
+    None), or None after an ERROR frame and close.
+    """
     try:
         raw_text = await websocket.receive_text()
     except WebSocketDisconnect:
-        return
+        return None
 
     # 1. App-level message-size gate — explicit, not relying on library defaults
     if len(raw_text.encode()) > MAX_WS_MESSAGE_BYTES:
@@ -198,7 +437,7 @@ async def websocket_endpoint(websocket: WebSocket):
             "message": f"Message too large (limit {MAX_WS_MESSAGE_BYTES // 1024} KiB).",
         })
         await websocket.close()
-        return
+        return None
 
     # 2. JSON parse
     try:
@@ -206,11 +445,11 @@ async def websocket_endpoint(websocket: WebSocket):
     except json.JSONDecodeError as e:
         await websocket.send_json({"type": "ERROR", "message": f"Invalid JSON: {e}"})
         await websocket.close()
-        return
+        return None
 
     # 3. Schema + domain validation (ModelRequest.model_validator runs here)
     try:
-        ws_payload = WsPayload.model_validate(raw)
+        ws_payload = schema.model_validate(raw)
     except ValidationError as e:
         errors = [
             {"field": " -> ".join(str(p) for p in err["loc"]), "detail": err["msg"]}
@@ -218,13 +457,61 @@ async def websocket_endpoint(websocket: WebSocket):
         ]
         await websocket.send_json({"type": "ERROR", "message": "Invalid payload", "errors": errors})
         await websocket.close()
-        return
+        return None
 
-    # 4. Simulation
+    # 4. A registered model: no arrays to validate or matrices to rebuild
+    entry = None
+    if ws_payload.model_id is not None:
+        entry = model_registry.get(ws_payload.model_id)
+        if entry is None:
+            await websocket.send_json({
+                "type": "ERROR", "unknown_model": True,
+                "message": "Unknown model_id; register the model again with POST /models.",
+            })
+            await websocket.close()
+            return None
+
+    return ws_payload, entry
+
+
+@app.websocket("/ws/simulate")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    received = await _receive_payload(websocket, WsPayload)
+    if received is None:
+        return
+    ws_payload, entry = received
+
+    # 5. Optional streamed record: binary messages after the JSON one, read
+    #    concurrently with the simulation through a bounded channel
+    upload = pump = None
+    spec = ws_payload.sim_req.record_upload
+    if spec is not None:
+        upload = executor.channel(UPLOAD_AHEAD_MESSAGES)
+        pump = asyncio.create_task(pump_record(websocket.receive_bytes, upload, spec.npts,
+                                               spec.dtype, MAX_WS_MESSAGE_BYTES))
+
+    # 6. Simulation — one-shot, or a session steered by ControlMessages
+    session = reader = None
     try:
-        model = StructureFactory.create_shear_building(ws_payload.model_req.model_dump())
-        async for result in TimeSimulationService().run(model, ws_payload.sim_req.model_dump()):
-            await websocket.send_json(result)
+        if entry is not None:
+            model = entry.model
+        else:
+            model = StructureFactory.create_shear_building(ws_payload.model_req.model_dump())
+        client = websocket.client.host if websocket.client else "unknown"
+        sim_dict = ws_payload.sim_req.model_dump()
+        if ws_payload.sim_req.session:
+            session = SimulationSession(model, sim_dict, client=client, entry=entry)
+            reader = asyncio.create_task(_read_controls(websocket, session))
+            results = session.run()
+        else:
+            results = TimeSimulationService().run(model, sim_dict, client=client,
+                                                  upload=upload, entry=entry)
+        async for result in results:
+            if isinstance(result, bytes):
+                await websocket.send_bytes(result)   # binary protocol DATA block
+            else:
+                await websocket.send_json(result)
 
     except WebSocketDisconnect:
         pass
@@ -237,6 +524,77 @@ async def websocket_endpoint(websocket: WebSocket):
             })
         except Exception:
             pass
+    finally:
+        if reader is not None:
+            reader.cancel()
+        if pump is not None:
+            upload.stop.set()
+            pump.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+async def _read_controls(websocket: WebSocket, session: SimulationSession) -> None:
+    """Feed a session's control messages; invalid ones come back as non-fatal ERRORs."""
+    while True:
+        try:
+            message = await websocket.receive()
+        except RuntimeError:                 # already disconnected
+            message = {"type": "websocket.disconnect"}
+        if message["type"] == "websocket.disconnect":
+            session.control({"action": "stop"})
+            return
+        raw_text = message.get("text")
+        if raw_text is None:
+            session.control({"action": "invalid", "error": "Control messages are JSON text."})
+            continue
+        if len(raw_text.encode()) > MAX_WS_MESSAGE_BYTES:
+            session.control({"action": "invalid", "error": "Control message too large."})
+            continue
+        try:
+            msg = ControlMessage.model_validate_json(raw_text)
+        except ValidationError as e:
+            detail = "; ".join(err["msg"] for err in e.errors())
+            session.control({"action": "invalid", "error": f"Invalid control: {detail}"})
+            continue
+        session.control(msg.model_dump(exclude_none=True))
+
+
+@app.websocket("/ws/monte-carlo")
+async def monte_carlo_endpoint(websocket: WebSocket):
+    """
+    Monte Carlo uncertainty propagation: INIT, then a STATS frame (running
+    mean / std / quantiles of periods and peak drifts) per finished batch,
+    then DONE with reason "converged" or "max_samples".
+    """
+    await websocket.accept()
+    received = await _receive_payload(websocket, MonteCarloPayload)
+    if received is None:
+        return
+    mc_payload, entry = received
+
+    try:
+        if entry is not None:
+            model = entry.model
+        else:
+            model = StructureFactory.create_shear_building(mc_payload.model_req.model_dump())
+        client = websocket.client.host if websocket.client else "unknown"
+        async for frame in MonteCarloService().run(model, mc_payload.sim_req.model_dump(),
+                                                   client=client):
+            await websocket.send_json(frame)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Monte Carlo error: {e}")
+        try:
+            await websocket.send_json({
+                "type": "ERROR",
+                "message": "Monte Carlo run failed — invalid input or internal error.",
+            })
+        except Exception:
+            pass
     finally:
         try:
             await websocket.close()
@@ -245,20 +603,216 @@ async def websocket_endpoint(websocket: WebSocket):
 
 
 # === REST endpoint (modal analysis only) ===
+# Serialized responses keyed by the validated request's canonical hash
+modal_cache = ResponseCache(max_entries=MODAL_CACHE_ENTRIES,
+                            max_bytes=MODAL_CACHE_BYTES, ttl=MODAL_CACHE_TTL)
+
+
 @app.post("/shear-building/modal")
 async def calculate_modal_properties(payload: ModelRequest):
     """
     Accepts the same ModelRequest schema as the WebSocket endpoint so all
     validation (dofs cap, finiteness, range checks) runs automatically.
+    Identical models are served from `modal_cache` as stored JSON bytes;
+    misses are solved in the job executor, off the event loop. The key
+    leaves out damping_ratios, which do not change the eigen-solution.
     """
     try:
-        model = StructureFactory.create_shear_building(payload.model_dump())
-        return ModalService().run(model)
+        model_dict = payload.model_dump()
+        key = registry_key(model_dict)
+        body = modal_cache.get(key)
+        if body is None:
+            body = await executor.call(modal_response, model_dict)
+            modal_cache.put(key, body)
+        return Response(content=body, media_type="application/json")
     except HTTPException:
         raise
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error during Modal Calculation: {e}")
         raise HTTPException(
             status_code=500,
             detail="Modal calculation failed — invalid input or internal error.",
         )
+
+
+# === REST endpoints (model registry) ===
+def _registered(model_id: str) -> RegisteredModel:
+    entry = model_registry.get(model_id)
+    if entry is None:
+        raise HTTPException(status_code=404,
+                            detail="Unknown model_id; register the model again with POST /models.")
+    return entry
+
+
+@app.post("/models")
+async def register_model_endpoint(payload: ModelRequest):
+    """
+    Validate and build a model once; returns its content-hash `model_id`
+    (plus the modal response) for later modal, simulation and
+    frequency-response requests. Registering the same model again returns
+    the same ID without rebuilding it.
+    """
+    try:
+        model_dict = payload.model_dump()
+        key = registry_key(model_dict)
+        entry = model_registry.get(key)
+        created = entry is None
+        if created:
+            model, modal_body = await executor.call(register_model, model_dict)
+            entry = model_registry.add(RegisteredModel(key, model, modal_body))
+        head = json.dumps({"model_id": key, "dofs": entry.model.dofs, "created": created},
+                          separators=(",", ":"))
+        # Splice the stored modal JSON in as-is rather than decoding it again
+        body = head[:-1].encode() + b',"modal":' + entry.modal_body + b"}"
+        return Response(content=body, media_type="application/json")
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error during Model Registration: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Model registration failed — invalid input or internal error.",
+        )
+
+
+@app.get("/models/stats")
+async def model_registry_stats():
+    """Registered models, memory held and hit / eviction counters."""
+    return model_registry.stats()
+
+
+@app.get("/models/{model_id}/modal")
+async def registered_modal_properties(model_id: str):
+    """Modal response of a registered model (same body as /shear-building/modal)."""
+    return Response(content=_registered(model_id).modal_body, media_type="application/json")
+
+
+# === REST endpoint (frequency-domain response) ===
+@app.post("/shear-building/frequency-response")
+async def calculate_frequency_response(payload: FrequencyPayload):
+    """
+    Whole-run x / v / a by FFT of the load and the modal transfer functions —
+    transient from rest (zero-padded) or periodic steady state. Not streamed:
+    for long excitations that would take minutes to play through the socket.
+    """
+    force = payload.sim_req.force_function
+    if force.type == "earthquake" and force.record not in default_library():
+        raise HTTPException(status_code=404, detail=f"Unknown record '{force.record}'")
+    if payload.model_id is not None:
+        model_args = (None, payload.sim_req.model_dump(), _registered(payload.model_id).model)
+    else:
+        model_args = (payload.model_req.model_dump(), payload.sim_req.model_dump())
+    try:
+        body = await executor.call(frequency_response, *model_args)
+        return Response(content=body, media_type="application/json")
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error during Frequency Response: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Frequency response failed — invalid input or internal error.",
+        )
+
+
+# === REST endpoint (many excitations, one factorization) ===
+@app.post("/shear-building/load-suite")
+async def calculate_load_suite(payload: LoadSuitePayload):
+    """
+    One model against up to MAX_SUITE_LOADS excitations (records and scale
+    factors), integrated together as an (n, R) right-hand side. Returns a
+    peak table per load case; full histories with include_histories.
+    """
+    records = [f.record for f in payload.sim_req.loads if f.type == "earthquake"]
+    return await _suite_job(load_suite_response, payload, records, "Load-suite run")
+
+
+# === REST endpoint (incremental dynamic analysis) ===
+@app.post("/shear-building/ida")
+async def calculate_ida(payload: IDAPayload):
+    """
+    Peak-demand curves over any number of scale factors for each record.
+    The model is linear, so each record is integrated once at unit scale
+    and every level follows by superposition; "cost" in the response
+    reports the runs this saved.
+    """
+    return await _suite_job(ida_response, payload, payload.sim_req.records, "IDA")
+
+
+async def _suite_job(job, payload, records: list, what: str) -> Response:
+    """Run a load-suite style executor job on an inline or registered model."""
+    library = default_library()
+    for name in records:
+        if name not in library:
+            raise HTTPException(status_code=404, detail=f"Unknown record '{name}'")
+    sim_dict = payload.sim_req.model_dump()
+    try:
+        if payload.model_id is not None:
+            stepper = await registered_stepper(_registered(payload.model_id), sim_dict)
+            body = await executor.call(job, None, sim_dict, stepper)
+        else:
+            body = await executor.call(job, payload.model_req.model_dump(), sim_dict)
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error during {what}: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"{what} failed — invalid input or internal error.",
+        )
+
+
+@app.get("/shear-building/modal/cache")
+async def modal_cache_stats():
+    """Hit / miss / eviction counters and current size of the modal cache."""
+    return modal_cache.stats()
+
+
+@app.get("/executor/stats")
+async def executor_stats():
+    """Worker pool configuration and job counters."""
+    return executor.stats()
+
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """Simulation admission control: budget in use, running / queued runs."""
+    return scheduler.stats()
+
+
+@app.get("/records")
+async def list_records():
+    """Ground-motion records usable as force_function.record / spectrum record."""
+    library = default_library()
+    return [library.info(name) for name in library.names()]
+
+
+# === REST endpoint (elastic response spectrum) ===
+@app.post("/spectrum")
+async def calculate_response_spectrum(payload: SpectrumRequest):
+    """
+    SD / PSV / PSA of a ground-motion record over a period x damping grid.
+    Results are cached per (record, periods, damping_ratios).
+    """
+    if payload.record not in default_library():
+        raise HTTPException(status_code=404, detail=f"Unknown record '{payload.record}'")
+    try:
+        body = await executor.call(spectrum_response, payload.model_dump())
+        return Response(content=body, media_type="application/json")
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error during Spectrum Calculation: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Spectrum calculation failed — invalid input or internal error.",
+        )
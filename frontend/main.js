@@ -41,6 +41,7 @@ let exactFreqFromSet = null;
 let isAutoScroll = true;
 let lastState = { t:0, all_x:null, all_v:null };
 let resultsDirty = true;
+let registeredModelId = null;   // server-side handle from POST /models
 
 // --- 3. CANVAS / CHART PALETTE HELPER ---
 function getCanvasPalette() {
@@ -521,14 +522,21 @@ async function toggleSimulation() {
     const speedSel = document.getElementById("sim-speed");
 
     if (isRunning) {
-        if (ws) ws.close();
+        // The session stays open server-side; pausing keeps its state warm
+        sendControl({ action: "pause" });
         isRunning = false;
         isPaused = true;
 
         btn.innerText = "Resume";
         btn.className = "action-btn start-btn paused";
         document.body.classList.remove("sim-running");
-        if(speedSel) speedSel.disabled = false;
+
+    } else if (isPaused && !resultsDirty && sendControl({ action: "resume" })) {
+        isRunning = true;
+        isPaused = false;
+        btn.innerText = "Stop";
+        btn.className = "action-btn start-btn running";
+        document.body.classList.add("sim-running");
 
     } else {
         // Auto-calculate whenever results are stale
@@ -553,13 +561,25 @@ async function toggleSimulation() {
             }
             btn.disabled = false;
         }
-        if(speedSel) speedSel.disabled = true;
         startWebSocket();
     }
 }
 
+// Control message to the open simulation session; false if there is none
+function sendControl(msg) {
+    if (!ws || ws.readyState !== WebSocket.OPEN) return false;
+    ws.send(JSON.stringify(msg));
+    return true;
+}
+
+function changeSpeed() {
+    const speedSel = document.getElementById("sim-speed");
+    if (speedSel) sendControl({ action: "set_speed", speed: parseFloat(speedSel.value) });
+}
+
 function resetSimulation() {
     if (ws) ws.close();
+    stopPlayback();
     isRunning = false;
     isPaused = false;
 
@@ -593,6 +613,110 @@ function resetSimulation() {
     }
 }
 
+// Binary DATA block: 32-byte little-endian header + channel-major x/v/a data
+const FRAME_HEADER_BYTES = 32;
+const OUTPUT_FPS = 60;           // sim_req.output_fps: frames per second the server paces to
+const FRAMES_PER_MESSAGE = 16;   // sim_req.frames_per_message
+
+// A binary message carries FRAMES_PER_MESSAGE frames at once; they are queued
+// and played back one per 1/OUTPUT_FPS s on requestAnimationFrame, so the view
+// repaints at the output rate rather than once per message
+let frameQueue = [];
+let playbackHandle = null;
+let playbackClock = 0;
+
+function decodeFrameBlock(buffer) {
+    const view = new DataView(buffer);
+    const itemsize = view.getUint8(4);
+    const channels = view.getUint8(5);
+    const dofs = view.getUint32(8, true);
+    const count = view.getUint32(12, true);
+    const t0 = view.getFloat64(16, true);
+    const dt = view.getFloat64(24, true);
+    const Arr = itemsize === 8 ? Float64Array : Float32Array;
+    const data = new Arr(buffer, FRAME_HEADER_BYTES, channels * count * dofs);
+    const row = (c, k) => data.subarray((c * count + k) * dofs, (c * count + k + 1) * dofs);
+    return {
+        dofs, count, t0, dt,
+        x: (k) => row(0, k),
+        v: (k) => row(1, k),
+        a: (k) => row(2, k)
+    };
+}
+
+// Record one step: state, peak tracking, chart points (no redraw here)
+function applyFrame(t, allX, allV, allA) {
+    lastState.t = t;
+    lastState.all_x = Array.from(allX);
+    lastState.all_v = Array.from(allV);
+
+    for (let i = 0; i < allX.length; i++) {
+        const ax = Math.abs(allX[i]);
+        if (ax > maxAbsDisp) maxAbsDisp = ax;
+    }
+
+    activeCharts.forEach((obj, i) => {
+        const ds = obj.chart.data.datasets;
+        const normT = t / obj.period;
+        ds[0].data.push({ x: normT, y: allX[i] });
+        ds[1].data.push({ x: normT, y: allV[i] });
+        ds[2].data.push({ x: normT, y: allA[i] });
+    });
+}
+
+function queueFrameBlock(block) {
+    for (let k = 0; k < block.count; k++) {
+        frameQueue.push([block.t0 + k * block.dt, block.x(k), block.v(k), block.a(k)]);
+    }
+    if (playbackHandle === null && frameQueue.length) {
+        playbackClock = performance.now();
+        playbackHandle = requestAnimationFrame(playQueuedFrames);
+    }
+}
+
+function playQueuedFrames(now) {
+    const interval = 1000 / OUTPUT_FPS;
+    let due = Math.floor((now - playbackClock) / interval);
+    // Never lag more than one message behind the socket (e.g. a throttled tab)
+    due = Math.min(frameQueue.length, Math.max(due, frameQueue.length - FRAMES_PER_MESSAGE));
+    if (due > 0) {
+        playbackClock = Math.max(playbackClock + due * interval, now - interval);
+        const frames = frameQueue.splice(0, due);
+        frames.forEach(f => applyFrame(...f));
+        refreshView(frames[frames.length - 1][1]);
+    }
+    playbackHandle = frameQueue.length ? requestAnimationFrame(playQueuedFrames) : null;
+}
+
+function stopPlayback() {
+    frameQueue = [];
+    if (playbackHandle !== null) cancelAnimationFrame(playbackHandle);
+    playbackHandle = null;
+}
+
+// Once per displayed frame: slider, chart windows, structure drawing
+function refreshView(allX) {
+    const t = lastState.t;
+    const slider = document.getElementById('time-slider');
+    if(slider) {
+        slider.max = t;
+        if(isAutoScroll) slider.value = t;
+    }
+
+    if (isAutoScroll) {
+        activeCharts.forEach(obj => {
+            const win = 20;
+            const normT = t / obj.period;
+            const ax = obj.chart.options.scales.x;
+            if (normT > win) { ax.min = normT - win; ax.max = normT; }
+            else { ax.min = 0; ax.max = win; }
+            obj.chart.update('none');
+        });
+    }
+
+    drawFrame(Array.from(allX));
+}
+
 function startWebSocket() {
     if (ws) ws.close();
 
@@ -602,6 +726,8 @@ function startWebSocket() {
         return;
     }
 
+    // A paused session whose inputs changed (resultsDirty) restarts from its
+    // last state; otherwise resume goes through the open session
     const startT = isPaused ? lastState.t : 0;
     const initialConds = isPaused ? { x0: lastState.all_x, v0: lastState.all_v } : {};
 
@@ -613,7 +739,6 @@ function startWebSocket() {
     const simSpeed = speedSel ? parseFloat(speedSel.value) : 1.0;
 
     const wsPayload = {
-        model_req: payload,
         sim_req: {
             t0: startT,
             dt: 0.02,
@@ -625,10 +750,19 @@ function startWebSocket() {
                 duration: parseFloat(document.getElementById("num-dur").value)
             },
             damping_ratios: getDampingValues(),
-            initial_conditions: initialConds
+            initial_conditions: initialConds,
+            protocol: "binary",
+            frames_per_message: FRAMES_PER_MESSAGE,
+            binary_dtype: "float32",
+            output_fps: OUTPUT_FPS,
+            session: true
         }
     };
+    if (registeredModelId && !resultsDirty) wsPayload.model_id = registeredModelId;
+    else wsPayload.model_req = payload;
 
+    if (ws) ws.close();          // a paused session of the old model/load
+    stopPlayback();
     ws = new WebSocket(WS_URL);
     const btn = document.getElementById("btn-sim");
     btn.innerText = "Connecting...";
@@ -650,59 +784,52 @@ function startWebSocket() {
         }
     };
 
+    ws.binaryType = "arraybuffer";
     ws.onmessage = (event) => {
-        const msg = JSON.parse(event.data);
-        if (msg.type === 'DATA') {
-
-            lastState.t = msg.t;
-            lastState.all_x = msg.all_x;
-            lastState.all_v = msg.all_v;
-
-            if (msg.all_x) {
-                const frameMax = Math.max(...msg.all_x.map(Math.abs));
-                if (frameMax > maxAbsDisp) maxAbsDisp = frameMax;
-            }
-
-            const slider = document.getElementById('time-slider');
-            if(slider) {
-                slider.max = msg.t;
-                if(isAutoScroll) slider.value = msg.t;
-            }
-
-            activeCharts.forEach((obj, i) => {
-                const chart = obj.chart;
-                const T = obj.period;
-                const normT = msg.t / T;
-
-                const floorX = msg.all_x ? msg.all_x[i] : msg.x;
-                const floorV = msg.all_v ? msg.all_v[i] : msg.v;
-                const floorA = msg.all_a ? msg.all_a[i] : (i === activeCharts.length - 1 ? msg.a : null);
-
-                chart.data.datasets[0].data.push({ x: normT, y: floorX });
-                chart.data.datasets[1].data.push({ x: normT, y: floorV });
-                if (floorA !== null) chart.data.datasets[2].data.push({ x: normT, y: floorA });
-
-                if (isAutoScroll) {
-                    const win = 20;
-                    const ax = chart.options.scales.x;
-                    if (normT > win) { ax.min = normT - win; ax.max = normT; }
-                    else { ax.min = 0; ax.max = win; }
-                    chart.update('none');
-                }
-            });
+        if (event.data instanceof ArrayBuffer) {
+            // Binary protocol: one message = many steps (see sim_app/framing.py)
+            queueFrameBlock(decodeFrameBlock(event.data));
+            return;
+        }
 
-            drawFrame(msg.all_x);
+        const msg = JSON.parse(event.data);
+        if (msg.type === 'QUEUED') {
+            btn.innerText = `Queued (#${msg.position})`;
+        }
+        else if (msg.type === 'INIT') {
+            btn.innerText = "Stop";
+        }
+        else if (msg.type === 'DATA') {
+            applyFrame(msg.t, msg.all_x, msg.all_v, msg.all_a);
+            refreshView(msg.all_x);
+        }
+        else if (msg.type === 'DONE') {
+            // End of the run: close the session; onclose resets the controls
+            ws.close();
+        }
+        else if (msg.type === 'ERROR' && msg.unknown_model) {
+            // Registration expired on the server: register again and start over
+            registeredModelId = null;
+            resultsDirty = true;
+            isRunning = false;
+            isPaused = false;
+            toggleSimulation();
+        }
+        else if (msg.type === 'ERROR' && msg.fatal === false) {
+            console.warn("Session control rejected: " + msg.message);
         }
         else if (msg.type === 'ERROR') {
             alert("Sim Error: " + msg.message);
             toggleSimulation();
         }
     };
+    const socket = ws;
     ws.onclose = () => {
         // Only act when the server closed the socket unexpectedly (simulation ended
         // or network dropped). User-triggered stops (toggleSimulation / resetSimulation)
-        // set isRunning=false before the socket closes, so we skip those here.
-        if (!isRunning) return;
+        // set isRunning=false before the socket closes, so we skip those here, as
+        // well as a replaced session closing after its successor opened.
+        if (!isRunning || ws !== socket) return;
 
         // Reset to a clean "stopped" state — not "paused", because the server
         // has already ended the session and there is nothing to resume.
@@ -727,9 +854,12 @@ async function calculateSystem() {
         if (!payload) return;
 
         console.log("Fetching matrices...");
-        const res = await fetch(`${API_URL}/shear-building/modal`, { method:"POST", headers:{"Content-Type":"application/json"}, body:JSON.stringify(payload) });
+        // Register once: simulations then send the returned ID, not the arrays
+        const res = await fetch(`${API_URL}/models`, { method:"POST", headers:{"Content-Type":"application/json"}, body:JSON.stringify(payload) });
         if(!res.ok) throw new Error("Server error");
-        const data = await res.json();
+        const reg = await res.json();
+        registeredModelId = reg.model_id;
+        const data = reg.modal;
 
         // ... (קוד הגרפים נשאר אותו דבר) ...
         const newPeriods = data.frequencies.map(w => 2*Math.PI/w);
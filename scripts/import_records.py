@@ -0,0 +1,34 @@
+import sys
+import os
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sim_core.records import RecordLibrary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import text accelerograms (PEER .AT2, time/accel columns, "
+                    "single column) into a binary record library.")
+    parser.add_argument("files", nargs="+", help="record files; the name is the file stem")
+    parser.add_argument("--library", default=os.getenv("RECORD_LIBRARY_DIR", "records"),
+                        help="library directory (default: $RECORD_LIBRARY_DIR or ./records)")
+    parser.add_argument("--format", default="auto", choices=["auto", "peer", "columns", "single"])
+    parser.add_argument("--dt", type=float, default=None, help="sample step for single-column files")
+    args = parser.parse_args()
+
+    library = RecordLibrary(args.library)
+    for path in args.files:
+        try:
+            rec = library.import_file(path, fmt=args.format, dt=args.dt)
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}")
+            continue
+        info = library.info(rec.name)
+        print(f"✅ {rec.name}: {info['npts']} pts, dt={info['dt']}, "
+              f"{info['duration']:.2f} s, PGA={info['pga_g']:.3f} g")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# sim_app/cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, ClassVar
+
+import numpy as np
+
+
+def canonical_hash(payload: dict) -> str:
+    """
+    SHA-256 of a payload's canonical JSON form (sorted keys, no whitespace),
+    so equal validated requests hash equal regardless of key order.
+    """
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), allow_nan=False)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def encode_json(obj) -> bytes:
+    """Same JSON encoding as Starlette's JSONResponse."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized responses (bytes), keyed by content hash.
+
+    Entries are evicted least-recently-used first when either `max_entries`
+    or `max_bytes` would be exceeded, and dropped on access once older than
+    `ttl` seconds. A hit returns the stored bytes as-is, so it skips both
+    the computation and the JSON encoding.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float | None = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and \
+                    self._clock() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return   # would evict everything and still not fit
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self._clock(), value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+@dataclass
+class Trajectory:
+    """
+    A finished simulation: per-step time labels and x/v/a (n_steps, dofs),
+    plus the solver info its INIT frame reported (replayed as is).
+    """
+    t: np.ndarray
+    x: np.ndarray
+    v: np.ndarray
+    a: np.ndarray
+    periods: np.ndarray
+    solver: dict | None = None
+
+    FIELDS: ClassVar[tuple] = ("t", "x", "v", "a", "periods")
+
+    @classmethod
+    def empty(cls, n_steps: int, dofs: int, periods: np.ndarray,
+              solver: dict | None = None) -> "Trajectory":
+        return cls(t=np.empty(n_steps), x=np.empty((n_steps, dofs)),
+                   v=np.empty((n_steps, dofs)), a=np.empty((n_steps, dofs)),
+                   periods=np.asarray(periods, dtype=float), solver=solver)
+
+    @staticmethod
+    def estimate_nbytes(n_steps: int, dofs: int) -> int:
+        return 8 * n_steps * (1 + 3 * dofs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f).nbytes for f in self.FIELDS)
+
+
+class TrajectoryCache:
+    """
+    Bounded LRU of finished trajectories.
+
+    Up to `max_bytes` live in memory. With a `spill_dir`, entries evicted
+    from memory (or too large for it) are written there as .npy files and
+    read back memory-mapped on a hit, up to `max_disk_bytes`; the oldest
+    spilled entries are deleted first. Without a `spill_dir`, evicted
+    entries are simply dropped.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, spill_dir: str | None = None,
+                 max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: OrderedDict[str, Trajectory] = OrderedDict()
+        self._mem_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.spills = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._scan_spill_dir()
+
+    def max_entry_bytes(self) -> int:
+        """Largest trajectory worth recording (fits memory or disk)."""
+        return max(self.max_bytes, self.max_disk_bytes if self.spill_dir else 0)
+
+    def get(self, key: str) -> Trajectory | None:
+        with self._lock:
+            traj = self._mem.get(key)
+            if traj is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return traj
+            if key in self._disk:
+                try:
+                    traj = self._load(key)
+                except OSError:
+                    self._remove_spilled(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return traj
+            self.misses += 1
+            return None
+
+    def put(self, key: str, traj: Trajectory) -> None:
+        size = traj.nbytes
+        with self._lock:
+            if key in self._mem or key in self._disk:
+                return
+            if size > self.max_bytes:
+                self._spill(key, traj)
+                return
+            self._mem[key] = traj
+            self._mem_bytes += size
+            while self._mem_bytes > self.max_bytes:
+                old_key, old = self._mem.popitem(last=False)
+                self._mem_bytes -= old.nbytes
+                self.evictions += 1
+                self._spill(old_key, old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            for key in list(self._disk):
+                self._remove_spilled(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._mem),
+                "bytes": self._mem_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "spills": self.spills,
+            }
+
+    # -- disk spill ------------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key)
+
+    def _load(self, key: str) -> Trajectory:
+        path = self._path(key)
+        solver = None
+        if os.path.exists(os.path.join(path, "solver.json")):
+            with open(os.path.join(path, "solver.json")) as fh:
+                solver = json.load(fh)
+        return Trajectory(**{f: np.load(os.path.join(path, f + ".npy"), mmap_mode="r")
+                             for f in Trajectory.FIELDS}, solver=solver)
+
+    def _spill(self, key: str, traj: Trajectory) -> None:
+        size = traj.nbytes
+        if not self.spill_dir or size > self.max_disk_bytes:
+            return
+        while self._disk and self._disk_bytes + size > self.max_disk_bytes:
+            self._remove_spilled(next(iter(self._disk)))
+        # Write into a temp directory, then rename: a reader never sees half a spill
+        tmp = tempfile.mkdtemp(dir=self.spill_dir, prefix=".tmp-")
+        try:
+            for f in Trajectory.FIELDS:
+                np.save(os.path.join(tmp, f + ".npy"), np.asarray(getattr(traj, f)))
+            if traj.solver is not None:
+                with open(os.path.join(tmp, "solver.json"), "w") as fh:
+                    json.dump(traj.solver, fh)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self._disk[key] = size
+        self._disk_bytes += size
+        self.spills += 1
+
+    def _remove_spilled(self, key: str) -> None:
+        self._disk_bytes -= self._disk.pop(key)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _scan_spill_dir(self) -> None:
+        """Re-index spills left by a previous process, oldest first."""
+        found = []
+        for name in os.listdir(self.spill_dir):
+            path = self._path(name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            files = [os.path.join(path, f + ".npy") for f in Trajectory.FIELDS]
+            if all(os.path.exists(f) for f in files):
+                found.append((os.path.getmtime(path), name,
+                              sum(os.path.getsize(f) for f in files)))
+        for _, name, size in sorted(found):
+            self._disk[name] = size
+            self._disk_bytes += size
@@ -0,0 +1,201 @@
+# sim_app/executor.py
+from __future__ import annotations
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+
+class ExecutorBusy(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+class CpuTimeExceeded(RuntimeError):
+    """A job used more CPU time than the executor's per-job limit."""
+
+
+class Channel:
+    """
+    Bounded pipe from a worker job back to the event loop.
+
+    Works the same in a worker thread (queue.Queue / threading.Event) and in
+    a worker process (multiprocessing manager proxies, which pickle). put()
+    blocks while the consumer is behind — that is the backpressure — and
+    gives up once the consumer has gone away.
+    """
+
+    def __init__(self, q, stop, cpu_time_limit: float | None = None):
+        self.queue, self.stop = q, stop
+        self.cpu_time_limit = cpu_time_limit
+        self._cpu0 = 0.0
+
+    def start(self) -> None:
+        self._cpu0 = time.thread_time()
+
+    def check_cpu(self) -> None:
+        if self.cpu_time_limit is not None and \
+                time.thread_time() - self._cpu0 > self.cpu_time_limit:
+            raise CpuTimeExceeded(f"Job exceeded its CPU time limit of {self.cpu_time_limit:g} s")
+
+    def put(self, item) -> bool:
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+def _run_streaming(job, args, channel: Channel) -> None:
+    """Worker side of JobExecutor.stream: pump a generator job into the channel."""
+    channel.start()
+    try:
+        for item in job(*args):
+            channel.check_cpu()
+            if not channel.put(item):
+                return
+        channel.put(None)
+    except Exception as e:
+        channel.put(e)
+
+
+class JobExecutor:
+    """
+    Runs NumPy-heavy jobs off the event loop, in a thread or process pool.
+
+        kind            "thread" or "process"
+        workers         pool size (default: CPU count)
+        max_queue       jobs allowed to wait for a worker; beyond that
+                        call()/stream() raise ExecutorBusy
+        cpu_time_limit  per-job CPU seconds for streamed jobs, checked
+                        between items (None = unlimited)
+
+    call() returns a function's result; stream() runs a generator function
+    in a worker and yields its items as they are produced, through a
+    bounded Channel.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int | None = None,
+                 max_queue: int = 16, cpu_time_limit: float | None = None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind '{kind}'; expected 'thread' or 'process'")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cpu_time_limit = cpu_time_limit
+        self._pool = None
+        self._manager = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.completed = self.cancelled = self.rejected = self.failed = 0
+
+    @classmethod
+    def from_env(cls) -> "JobExecutor":
+        """SIM_EXECUTOR, SIM_WORKERS, SIM_MAX_QUEUE, SIM_JOB_CPU_SECONDS."""
+        cpu = os.getenv("SIM_JOB_CPU_SECONDS")
+        return cls(kind=os.getenv("SIM_EXECUTOR", "thread"),
+                   workers=int(os.getenv("SIM_WORKERS", "0")) or None,
+                   max_queue=int(os.getenv("SIM_MAX_QUEUE", "16")),
+                   cpu_time_limit=float(cpu) if cpu else None)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="sim-job")
+            return self._pool
+
+    def channel(self, maxsize: int) -> Channel:
+        """A bounded Channel usable by this executor's workers (either direction)."""
+        if self.kind == "process":
+            with self._lock:
+                if self._manager is None:
+                    self._manager = multiprocessing.Manager()
+            return Channel(self._manager.Queue(maxsize), self._manager.Event(),
+                           self.cpu_time_limit)
+        return Channel(queue.Queue(maxsize), threading.Event(), self.cpu_time_limit)
+
+    def _admit(self) -> None:
+        if self.active >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ExecutorBusy(
+                f"Server busy: {self.active} jobs running or queued "
+                f"(limit {self.workers + self.max_queue})."
+            )
+        self.active += 1
+
+    def _done(self, outcome: str) -> None:
+        self.active -= 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+
+    async def call(self, fn, *args):
+        self._admit()
+        outcome = "failed"
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+            outcome = "completed"
+            return result
+        finally:
+            self._done(outcome)
+
+    async def stream(self, job, *args, maxsize: int = 8):
+        """Yield the items of generator function job(*args), run in a worker."""
+        self._admit()
+        outcome = "cancelled"          # consumer stopped early (e.g. client left)
+        channel = self.channel(maxsize)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), _run_streaming, job, args, channel)
+        try:
+            while True:
+                try:
+                    item = await asyncio.to_thread(channel.queue.get, True, 0.5)
+                except queue.Empty:
+                    if future.done():
+                        outcome = "failed"
+                        future.result()       # surfaces submission / pickling errors
+                        raise RuntimeError("Job ended without finishing its stream")
+                    continue
+                if item is None:
+                    outcome = "completed"
+                    return
+                if isinstance(item, BaseException):
+                    outcome = "failed"
+                    raise item
+                yield item
+        finally:
+            channel.stop.set()
+            try:                              # release a worker blocked on put()
+                while True:
+                    channel.queue.get_nowait()
+            except (queue.Empty, OSError, EOFError):
+                pass
+            self._done(outcome)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "cpu_time_limit": self.cpu_time_limit,
+            "active": self.active,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
@@ -0,0 +1,120 @@
+"""
+Binary DATA frames for /ws/simulate (opt-in with sim_req.protocol = "binary").
+
+One WebSocket binary message carries `count` consecutive integration steps:
+
+    offset  size  field
+    0       4     magic      b"DLF1"
+    4       1     itemsize   4 = float32, 8 = float64
+    5       1     channels   number of channel blocks (x, v, a -> 3;
+                             9 with the min/max envelope channels)
+    6       2     reserved   0
+    8       4     dofs       uint32
+    12      4     count      uint32, steps in this message
+    16      8     t0         float64, time of the first step
+    24      8     dt         float64, step between consecutive frames
+    32      ...   data       channel-major: channels x count x dofs values
+
+With decimation (sim_req.output_fps) `dt` is the spacing of the emitted
+frames, i.e. the integration dt times the decimation stride, and the
+optional envelope channels hold the per-interval min / max of every DOF
+over all integration steps folded into each frame.
+
+All fields are little-endian. The 32-byte header keeps the data block
+8-byte aligned, so a browser can view it directly as a Float32Array /
+Float64Array without copying or parsing individual values.
+"""
+from __future__ import annotations
+import struct
+import numpy as np
+
+MAGIC = b"DLF1"
+HEADER = struct.Struct("<4sBBHIIdd")
+CHANNELS = ("x", "v", "a")
+ENVELOPE_CHANNELS = ("x_min", "x_max", "v_min", "v_max", "a_min", "a_max")
+DTYPES = {"float32": np.dtype("<f4"), "float64": np.dtype("<f8")}
+
+
+class Envelope:
+    """
+    Running per-DOF min / max of x, v, a between two emitted frames, so a
+    decimated stream still shows every peak that happened in between.
+    """
+
+    def __init__(self, dofs: int):
+        self.lo = np.full((3, dofs), np.inf)
+        self.hi = np.full((3, dofs), -np.inf)
+
+    def update(self, x: np.ndarray, v: np.ndarray, a: np.ndarray) -> None:
+        """Fold in one step (dofs,) or a run of steps (steps, dofs)."""
+        for i, s in enumerate((x, v, a)):
+            s = np.atleast_2d(s)
+            np.minimum(self.lo[i], s.min(axis=0), out=self.lo[i])
+            np.maximum(self.hi[i], s.max(axis=0), out=self.hi[i])
+
+    def take(self) -> np.ndarray:
+        """(6, dofs) rows in ENVELOPE_CHANNELS order; resets the interval."""
+        out = np.empty((6, self.lo.shape[1]))
+        out[0::2], out[1::2] = self.lo, self.hi
+        self.lo.fill(np.inf)
+        self.hi.fill(-np.inf)
+        return out
+
+    def as_frame(self) -> dict:
+        """JSON DATA-frame keys for the interval (x_min, x_max, ...)."""
+        return {name: row.tolist() for name, row in zip(ENVELOPE_CHANNELS, self.take())}
+
+
+class FrameBlock:
+    """Accumulates up to `capacity` steps and packs them into one message."""
+
+    def __init__(self, dofs: int, capacity: int, dtype: str = "float32",
+                 envelope: bool = False):
+        self.dofs = dofs
+        self.capacity = capacity
+        self.dtype = DTYPES[dtype]
+        self.channels = len(CHANNELS) + (len(ENVELOPE_CHANNELS) if envelope else 0)
+        self.buf = np.empty((self.channels, capacity, dofs), dtype=self.dtype)
+        self.count = 0
+        self.t0 = 0.0
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def append(self, t: float, x: np.ndarray, v: np.ndarray, a: np.ndarray,
+               envelope: np.ndarray | None = None) -> None:
+        if self.count == 0:
+            self.t0 = float(t)
+        self.buf[0, self.count] = x
+        self.buf[1, self.count] = v
+        self.buf[2, self.count] = a
+        if envelope is not None:
+            self.buf[3:, self.count] = envelope
+        self.count += 1
+
+    def pack(self, dt: float) -> bytes:
+        """Serialize the buffered steps and reset the block."""
+        header = HEADER.pack(MAGIC, self.dtype.itemsize, self.channels, 0,
+                             self.dofs, self.count, self.t0, float(dt))
+        data = self.buf[:, :self.count].tobytes()
+        self.count = 0
+        return header + data
+
+
+def unpack_frames(message: bytes) -> dict:
+    """
+    Decode one binary message (Python clients / tests). Returns
+    {"t": (count,), "x"/"v"/"a": (count, dofs)}, plus the envelope
+    channels ("x_min", ...) when present.
+    """
+    magic, itemsize, channels, _, dofs, count, t0, dt = HEADER.unpack_from(message)
+    if magic != MAGIC:
+        raise ValueError("Not a Dynami-Learn binary frame")
+    dtype = DTYPES["float32"] if itemsize == 4 else DTYPES["float64"]
+    data = np.frombuffer(message, dtype=dtype, offset=HEADER.size)
+    data = data.reshape(channels, count, dofs)
+    out = {"t": t0 + dt * np.arange(count)}
+    for i, name in enumerate((CHANNELS + ENVELOPE_CHANNELS)[:channels]):
+        out[name] = data[i]
+    return out
@@ -0,0 +1,190 @@
+# sim_app/registry.py
+from __future__ import annotations
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+
+def _nbytes(obj, seen: set, depth: int = 3) -> int:
+    """
+    NumPy memory reachable from obj's attributes, `depth` objects deep
+    (steppers -> solvers / models -> bases). Views count their owning array,
+    once per `seen` set, so operators sharing the model's arrays are not
+    counted twice.
+    """
+    if isinstance(obj, np.ndarray):
+        while isinstance(obj.base, np.ndarray):
+            obj = obj.base
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sum(_nbytes(o, seen, depth) for o in obj)
+    if depth == 0 or not hasattr(obj, "__dict__"):
+        return 0
+    return sum(_nbytes(v, seen, depth - 1) for v in vars(obj).values())
+
+
+class RegisteredModel:
+    """
+    A model registered once (POST /models) and referenced by its ID.
+
+    Holds the built ShearBuilding with its modal basis already solved, the
+    serialized modal response, and up to `max_operators` prototype steppers
+    — the damped model plus its factorization / matrix exponential — keyed
+    by the settings they depend on (see operator_key). Runs get a shallow
+    copy of a prototype: the operators are shared read-only, the running
+    state is per copy.
+    """
+
+    def __init__(self, model_id: str, model, modal_body: bytes, max_operators: int = 8):
+        self.model_id = model_id
+        self.model = model
+        self.modal_body = modal_body
+        self.max_operators = max_operators
+        self.created = time.monotonic()
+        self._operators: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def operator_key(payload: dict) -> tuple:
+        """Everything a stepper's operators depend on besides the model."""
+        integrator = payload.get("integrator", "newmark")
+        threshold = float(payload.get("modal_mass_threshold", 1.0)) if integrator == "modal" else None
+        return (integrator, float(payload.get("dt", 0.02)),
+                tuple(float(z) for z in payload.get("damping_ratios", [0.02])), threshold)
+
+    def stepper(self, key: tuple):
+        """A fresh stepper sharing the cached operators for `key`, or None."""
+        with self._lock:
+            proto = self._operators.get(key)
+            if proto is None:
+                return None
+            self._operators.move_to_end(key)
+        return copy.copy(proto)
+
+    def remember(self, key: tuple, stepper) -> None:
+        with self._lock:
+            self._operators[key] = stepper
+            self._operators.move_to_end(key)
+            while len(self._operators) > self.max_operators:
+                self._operators.popitem(last=False)
+
+    @property
+    def operators(self) -> int:
+        return len(self._operators)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            operators = list(self._operators.values())
+        return _nbytes([self.model] + operators, set()) + len(self.modal_body)
+
+
+class ModelRegistry:
+    """
+    Bounded LRU of RegisteredModels, keyed by content hash.
+
+    Evicts least-recently-used models when `max_entries` or `max_bytes`
+    would be exceeded (operators built later count too, see resize()), and
+    drops models not used for `ttl` seconds. An evicted ID simply becomes
+    unknown; the client registers the model again.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 512 * 1024 * 1024,
+                 ttl: float | None = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, RegisteredModel, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.registrations = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self._entries
+
+    def get(self, model_id: str) -> RegisteredModel | None:
+        with self._lock:
+            item = self._entries.get(model_id)
+            if item is not None and self.ttl is not None and \
+                    self._clock() - item[0] > self.ttl:
+                self._drop(model_id)
+                self.expirations += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            _, entry, size = item
+            self._entries[model_id] = (self._clock(), entry, size)
+            self._entries.move_to_end(model_id)
+            self.hits += 1
+            return entry
+
+    def add(self, entry: RegisteredModel) -> RegisteredModel:
+        """Store `entry`, or return the one already registered under its ID."""
+        size = entry.nbytes
+        with self._lock:
+            existing = self._entries.get(entry.model_id)
+            if existing is not None:
+                self._entries.move_to_end(entry.model_id)
+                return existing[1]
+            self._entries[entry.model_id] = (self._clock(), entry, size)
+            self._bytes += size
+            self.registrations += 1
+            self._shrink(keep=entry.model_id)
+            return entry
+
+    def resize(self, entry: RegisteredModel) -> None:
+        """Re-account an entry that grew (new operators) and evict others to fit."""
+        size = entry.nbytes
+        with self._lock:
+            item = self._entries.get(entry.model_id)
+            if item is None or item[1] is not entry:
+                return
+            self._bytes += size - item[2]
+            self._entries[entry.model_id] = (item[0], entry, size)
+            self._shrink(keep=entry.model_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _shrink(self, keep: str) -> None:
+        # `keep` stays even if it alone is over max_bytes: it is in use right now
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            self._drop(victim)
+            self.evictions += 1
+
+    def _drop(self, model_id: str) -> None:
+        _, _, size = self._entries.pop(model_id)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "operators": sum(e.operators for _, e, _ in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "registrations": self.registrations,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
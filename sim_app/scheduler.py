@@ -0,0 +1,159 @@
+# sim_app/scheduler.py
+from __future__ import annotations
+import asyncio
+import itertools
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+
+class AdmissionRejected(RuntimeError):
+    """The request cannot even be queued (per-client or queue-length limit)."""
+
+
+def estimate_cost(n_steps: int, dofs: int) -> float:
+    """Work estimate of one simulation: steps x dofs²."""
+    return float(n_steps) * float(dofs) ** 2
+
+
+@dataclass(eq=False)
+class Ticket:
+    client: str
+    cost: float
+    id: int
+    admitted: bool = False
+    wake: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+
+class SimulationScheduler:
+    """
+    Global admission control for simulations.
+
+    Running work is bounded by `cost_budget` (sum of estimate_cost of the
+    admitted runs); a run larger than the whole budget is still admitted
+    when nothing else is running. Waiting runs are queued per client and
+    admitted round-robin across clients, so one client queuing many runs
+    cannot starve the others. Admission is in order: a queued run that
+    does not fit blocks the ones behind it, so large runs are not starved
+    by a stream of small ones either.
+
+    A client may hold at most `per_client_limit` runs (running + queued),
+    and at most `max_queued` runs wait in total.
+    """
+
+    def __init__(self, cost_budget: float = 1e10, per_client_limit: int = 2,
+                 max_queued: int = 64):
+        self.cost_budget = cost_budget
+        self.per_client_limit = per_client_limit
+        self.max_queued = max_queued
+        self._queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self._running: set[Ticket] = set()
+        self._per_client: dict[str, int] = {}
+        self._ids = itertools.count()
+        self.used = 0.0
+        self.admitted = self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "SimulationScheduler":
+        """SIM_COST_BUDGET, SIM_PER_CLIENT_LIMIT, SIM_MAX_QUEUED."""
+        return cls(cost_budget=float(os.getenv("SIM_COST_BUDGET", "1e10")),
+                   per_client_limit=int(os.getenv("SIM_PER_CLIENT_LIMIT", "2")),
+                   max_queued=int(os.getenv("SIM_MAX_QUEUED", "64")))
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def submit(self, client: str, cost: float) -> Ticket:
+        """Queue a run (admitting it at once if it fits); raises AdmissionRejected."""
+        if self._per_client.get(client, 0) >= self.per_client_limit:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"Too many simultaneous simulations from this client "
+                f"(limit {self.per_client_limit})."
+            )
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise AdmissionRejected("Server busy: simulation queue is full.")
+        ticket = Ticket(client=client, cost=cost, id=next(self._ids))
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        self._queues.setdefault(client, deque()).append(ticket)
+        self._dispatch()
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Finished or abandoned (running or still queued)."""
+        if ticket in self._running:
+            self._running.discard(ticket)
+            self.used -= ticket.cost
+        else:
+            q = self._queues.get(ticket.client)
+            if q is None or ticket not in q:
+                return
+            q.remove(ticket)
+            if not q:
+                del self._queues[ticket.client]
+        self._per_client[ticket.client] -= 1
+        if not self._per_client[ticket.client]:
+            del self._per_client[ticket.client]
+        self._dispatch()
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place in the admission order; 0 once admitted."""
+        if ticket.admitted:
+            return 0
+        for i, t in enumerate(self._admission_order(), start=1):
+            if t is ticket:
+                return i
+        raise KeyError("ticket is not queued")
+
+    async def wait(self, ticket: Ticket):
+        """Yield the queue position whenever it changes, until admitted."""
+        last = None
+        while not ticket.admitted:
+            pos = self.position(ticket)
+            if pos != last:
+                yield pos
+                last = pos
+            ticket.wake.clear()
+            await ticket.wake.wait()
+
+    def _admission_order(self):
+        """Queued tickets round-robin over clients, in their current rotation."""
+        queues = [list(q) for q in self._queues.values()]
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for q in queues:
+                if depth < len(q):
+                    yield q[depth]
+
+    def _dispatch(self) -> None:
+        while self._queues:
+            client, q = next(iter(self._queues.items()))
+            ticket = q[0]
+            if self._running and self.used + ticket.cost > self.cost_budget:
+                break
+            q.popleft()
+            # Rotate: this client goes to the back of the round-robin
+            del self._queues[client]
+            if q:
+                self._queues[client] = q
+            ticket.admitted = True
+            self._running.add(ticket)
+            self.used += ticket.cost
+            self.admitted += 1
+            ticket.wake.set()
+        for q in self._queues.values():         # positions may have moved
+            for t in q:
+                t.wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "cost_budget": self.cost_budget,
+            "cost_in_use": self.used,
+            "running": len(self._running),
+            "queued": self.queued,
+            "clients": len(self._per_client),
+            "per_client_limit": self.per_client_limit,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
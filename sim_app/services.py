@@ -1,14 +1,87 @@
 from __future__ import annotations
+import copy
+import functools
+import hashlib
 import math
+import os
+import queue
 import sys
+import time
 import numpy as np
 from sim_core.structures import SingleDOF, ShearBuilding
-from sim_core.modal import ModalAnalyzer
-from sim_core.matrices import caughey_damping
-from sim_core.earthquakes import get_earthquake_force
+from sim_core.forcing import (ForceSchedule, build_force_schedule, build_load_suite,
+                              ground_motion_pattern)
+from sim_core.newmark import NewmarkStepper
+from sim_core.statespace import StateSpacePropagator
+from sim_core.modal_superposition import ModalSuperpositionStepper, modes_for_mass_ratio
+from sim_core.batch import BatchSimulator, BatchTimeHistoryResult, LoadSuiteSimulator
+from sim_core.frequency import FrequencyResponseSolver
+from sim_core.earthquakes import G
+from sim_core.records import RecordLibrary, default_library, set_default_library
+from sim_core.spectrum import response_spectrum
+from sim_core.stochastic import (RunningStatistics, StochasticShearBuilding, batched_modes,
+                                 caughey_stack)
+from sim_app.cache import Trajectory, TrajectoryCache, canonical_hash, encode_json
+from sim_app.executor import ExecutorBusy, JobExecutor
+from sim_app.framing import Envelope, FrameBlock
+from sim_app.registry import ModelRegistry, RegisteredModel
+from sim_app.scheduler import AdmissionRejected, SimulationScheduler, estimate_cost
+from sim_app.upload import RecordStream, UploadError
 import asyncio
 
-MAX_STEPS = 100_000  # upper bound on Newmark integration steps per simulation
+MAX_STEPS = 100_000  # upper bound on integration steps per simulation
+MAX_EXACT_DOFS = 200  # the exact propagator's 4n x 4n expm is O(n^3) — use "modal" above this
+MAX_FFT_SAMPLES = 2_000_000  # samples per frequency-domain run (no step loop, so well above MAX_STEPS)
+MAX_SUITE_HISTORY_BYTES = 256 * 1024 * 1024  # x/v/a kept for a load suite with histories
+MAX_MC_DOFS = 200  # Monte Carlo: dense (batch, n, n) eigen-solves and operators per batch
+MAX_MC_BATCH_BYTES = 256 * 1024 * 1024  # x/v/a of one Monte Carlo batch in a worker
+DENSE_EXPORT_MAX_DOFS = 20  # modal endpoint ships dense M/K lists and all mode shapes up to this size
+MODE_EXPORT_MASS_RATIO = 0.99  # above it: mode shapes until this effective-mass ratio ...
+MODE_EXPORT_MAX = 20  # ... and at most this many (frequencies / periods are always complete)
+COMPUTE_CHUNK_STEPS = 256  # steps the worker integrates per queued chunk
+COMPUTE_AHEAD_CHUNKS = 8  # bounded queue: how far the worker may run ahead of the socket
+UPLOAD_AHEAD_MESSAGES = 8  # bounded queue: uploaded record messages not yet integrated
+
+# Modal and time-history jobs run here, never on the event loop.
+# Configured by SIM_EXECUTOR (thread|process), SIM_WORKERS, SIM_MAX_QUEUE,
+# SIM_JOB_CPU_SECONDS.
+executor = JobExecutor.from_env()
+
+# Global admission control for simulations (cost budget, round-robin
+# between clients, per-client limit). Configured by SIM_COST_BUDGET,
+# SIM_PER_CLIENT_LIMIT, SIM_MAX_QUEUED.
+scheduler = SimulationScheduler.from_env()
+TRAJECTORY_CACHE_BYTES = 256 * 1024 * 1024  # finished runs kept in memory for replay
+TRAJECTORY_DISK_BYTES = 2 * 1024 * 1024 * 1024  # spill budget when TRAJECTORY_SPILL_DIR is set
+
+# Finished simulations, replayed at any speed (see TimeSimulationService.run)
+trajectory_cache = TrajectoryCache(max_bytes=TRAJECTORY_CACHE_BYTES,
+                                   spill_dir=os.getenv("TRAJECTORY_SPILL_DIR") or None,
+                                   max_disk_bytes=TRAJECTORY_DISK_BYTES)
+
+MODEL_REGISTRY_ENTRIES = 64  # registered models (POST /models), LRU
+MODEL_REGISTRY_BYTES = 512 * 1024 * 1024  # models, modal bases and cached operators
+MODEL_REGISTRY_TTL = 3600.0  # seconds since last use
+
+# Models registered once and referenced by ID (see register_model)
+model_registry = ModelRegistry(max_entries=MODEL_REGISTRY_ENTRIES,
+                               max_bytes=MODEL_REGISTRY_BYTES, ttl=MODEL_REGISTRY_TTL)
+
+# Named ground-motion records (force_function.record, spectrum "record").
+# With RECORD_LIBRARY_DIR set, imports are stored there as memory-mapped
+# .npy files and shared with process-pool workers; otherwise in memory only.
+if os.getenv("RECORD_LIBRARY_DIR"):
+    set_default_library(RecordLibrary(os.getenv("RECORD_LIBRARY_DIR")))
+
+# Step engines selectable via payload["integrator"]; each is built once per
+# (model, dt, payload options) and driven through the sim_core Stepper API.
+INTEGRATORS = {
+    "newmark": lambda model, dt, payload: NewmarkStepper(model, dt),
+    "exact": lambda model, dt, payload: StateSpacePropagator(model, dt),
+    "modal": lambda model, dt, payload: ModalSuperpositionStepper(
+        model, dt, mass_threshold=float(payload.get("modal_mass_threshold", 1.0))
+    ),
+}
 
 
 class StructureFactory:
@@ -62,15 +135,682 @@ class StructureFactory:
 
 class ModalService:
     def run(self, model) -> dict:
-        modal = ModalAnalyzer(model).run()
-        resp = modal.as_dict()
-        resp["M_matrix"] = model.M.tolist()
-        resp["K_matrix"] = model.K.tolist()
+        basis = model.modal_basis
+        # Mode shapes are n x n: above DENSE_EXPORT_MAX_DOFS only the modes
+        # that carry the mass (as modal superposition truncates), so a tall
+        # model's response stays small enough to cache and register
+        n_shapes = model.dofs
+        if model.dofs > DENSE_EXPORT_MAX_DOFS:
+            n_shapes = min(MODE_EXPORT_MAX, modes_for_mass_ratio(
+                basis.effective_mass, basis.total_mass, MODE_EXPORT_MASS_RATIO))
+        resp = basis.as_dict(n_shapes)
+        resp["modes_exported"] = n_shapes
+
+        # Banded form always; dense matrices only at sizes the UI displays
+        m_diag, k_diag, k_off = model.tridiagonal_form()
+        resp["M_diagonal"] = m_diag.tolist()
+        resp["K_diagonal"] = k_diag.tolist()
+        resp["K_off_diagonal"] = k_off.tolist()
+        if model.dofs <= DENSE_EXPORT_MAX_DOFS:
+            resp["M_matrix"] = model.M.tolist()
+            resp["K_matrix"] = model.K.tolist()
         return resp
 
 
+def modal_response(model_payload: dict) -> bytes:
+    """Executor job for /shear-building/modal: build, solve and JSON-encode."""
+    model = StructureFactory.create_shear_building(model_payload)
+    return encode_json(ModalService().run(model))
+
+
+def registry_key(model_payload: dict) -> str:
+    """Content hash of a validated ModelRequest; damping_ratios are a run setting."""
+    return canonical_hash({k: v for k, v in model_payload.items() if k != "damping_ratios"})
+
+
+def register_model(model_payload: dict):
+    """
+    Executor job for POST /models: build the building and solve its modal
+    basis once. Returns (model, modal response bytes); the model comes back
+    with the basis cached in it, also from a process worker.
+    """
+    model = StructureFactory.create_shear_building(model_payload)
+    return model, encode_json(ModalService().run(model))
+
+
+def build_stepper(model, payload: dict):
+    """Executor job: damped copy of `model` and a stepper with its operators built."""
+    model = copy.copy(model)          # shares M, K and the basis; C is its own
+    model.C = model.modal_basis.damping_matrix(payload.get("damping_ratios", [0.02]))
+    return INTEGRATORS[payload.get("integrator", "newmark")](
+        model, float(payload.get("dt", 0.02)), payload)
+
+
+async def registered_stepper(entry: RegisteredModel, payload: dict):
+    """
+    Stepper for a run of a registered model: the cached operators for these
+    settings, or built once in the executor and kept with the model.
+    """
+    key = entry.operator_key(payload)
+    stepper = entry.stepper(key)
+    if stepper is None:
+        entry.remember(key, await executor.call(build_stepper, entry.model, payload))
+        model_registry.resize(entry)
+        stepper = entry.stepper(key)
+    return stepper
+
+
+DEFAULT_SPECTRUM_PERIODS = tuple(np.logspace(np.log10(0.05), np.log10(5.0), 100).tolist())
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_spectrum(record: str, fingerprint: str, periods: tuple, damping_ratios: tuple) -> dict:
+    # fingerprint is part of the key only, so a re-imported record is recomputed
+    rec = default_library().get(record)
+    ag = np.asarray(rec.accel_g, dtype=float) * G
+    return response_spectrum(rec.times(), ag, np.array(periods), np.array(damping_ratios)).as_dict()
+
+
+class SpectrumService:
+    """
+    Elastic response spectra, cached per (record, period grid, damping grid)
+    — the same classroom presets are requested over and over.
+    """
+
+    def run(self, payload: dict) -> dict:
+        record = payload.get("record", "el_centro")
+        try:
+            fingerprint = default_library().get(record).fingerprint
+        except KeyError:
+            raise ValueError(f"Unknown record '{record}'") from None
+        periods = payload.get("periods") or DEFAULT_SPECTRUM_PERIODS
+        damping = payload.get("damping_ratios") or [0.05]
+
+        resp = dict(_cached_spectrum(record, fingerprint,
+                                     tuple(float(T) for T in periods),
+                                     tuple(float(z) for z in damping)))
+        resp["record"] = record
+        return resp
+
+
+def spectrum_response(payload: dict) -> bytes:
+    """Executor job for /spectrum: the oscillator bank is seconds of CPU on large grids."""
+    return encode_json(SpectrumService().run(payload))
+
+
+class FrequencyResponseService:
+    """
+    Whole-run response by FFT (sim_core.frequency.FrequencyResponseSolver):
+    no step loop and no streaming, so long stationary excitations and long
+    records come back in one piece, x / v / a for every DOF.
+    """
+
+    def run(self, model, payload: dict) -> dict:
+        t0 = float(payload.get("t0", 0.0))
+        tf = float(payload.get("tf", 60.0))
+        dt = float(payload.get("dt", 0.02))
+        mode = payload.get("mode", "transient")
+        force_cfg = payload.get("force_function", {})
+
+        n_samples = int(math.ceil(tf / dt - 1e-9)) + 1
+        if n_samples > MAX_FFT_SAMPLES:
+            raise ValueError(
+                f"Requested {n_samples} samples (tf={tf}, dt={dt}); "
+                f"maximum allowed is MAX_FFT_SAMPLES={MAX_FFT_SAMPLES}."
+            )
+
+        basis = model.modal_basis
+        model.C = basis.damping_matrix(payload.get("damping_ratios", [0.02]))
+        solver = FrequencyResponseSolver(
+            model, mass_threshold=float(payload.get("modal_mass_threshold", 1.0)))
+        t_grid = t0 + dt * np.arange(n_samples)
+        forces = build_force_schedule(force_cfg, t_grid, model.M)
+        result = solver.solve_schedule(forces, dt, t0=t0, mode=mode)
+
+        resp = {"dofs": model.dofs, "periods": basis.periods.tolist(),
+                "samples": n_samples, **result.diagnostics,
+                "peaks": {k: v.tolist() for k, v in result.peaks().items()}}
+        if payload.get("include_histories", True):
+            resp.update(result.as_dict(stride=max(1, int(payload.get("output_stride", 1)))))
+        return resp
+
+
+def frequency_response(model_payload: dict | None, payload: dict, model=None) -> bytes:
+    """Executor job for /shear-building/frequency-response (or a registered `model`)."""
+    if model is None:
+        model = StructureFactory.create_shear_building(model_payload)
+    else:
+        model = copy.copy(model)      # the registered model stays undamped
+    return encode_json(FrequencyResponseService().run(model, payload))
+
+
+class BatchSimulationService:
+    """
+    Parametric sweep: B shear-building variants with the same story count,
+    integrated together by sim_core.batch.BatchSimulator, or solved one FFT
+    per variant with integrator="fft" (payload "fft_mode": transient|steady).
+    """
+
+    def run(self, model_payloads: list, payload: dict) -> dict:
+        tf = float(payload.get("tf", 60.0))
+        dt = float(payload.get("dt", 0.02))
+        t0 = float(payload.get("t0", 0.0))
+        method = payload.get("integrator", "newmark")
+        zeta_vec = payload.get("damping_ratios", [0.02])
+
+        models = [StructureFactory.create_shear_building(p) for p in model_payloads]
+        if len({m.dofs for m in models}) != 1:
+            raise ValueError("All models in a batch must have the same number of stories")
+        for m in models:
+            m.C = m.modal_basis.damping_matrix(zeta_vec)
+
+        n_steps = int(math.ceil(tf / dt - 1e-9))
+        limit, limit_name = (MAX_FFT_SAMPLES, "MAX_FFT_SAMPLES") if method == "fft" \
+            else (MAX_STEPS, "MAX_STEPS")
+        if n_steps > limit:
+            raise ValueError(
+                f"Requested {n_steps} steps (tf={tf}, dt={dt}); "
+                f"maximum allowed is {limit_name}={limit}."
+            )
+
+        t_grid = t0 + dt * np.arange(n_steps + 1)
+        force_cfg = payload.get("force_function", {})
+        if method == "fft":
+            threshold = float(payload.get("modal_mass_threshold", 1.0))
+            mode = payload.get("fft_mode", "transient")
+            runs = [FrequencyResponseSolver(m, mass_threshold=threshold).solve_schedule(
+                        build_force_schedule(force_cfg, t_grid, m.M), dt, t0=t0, mode=mode)
+                    for m in models]
+            result = BatchTimeHistoryResult(t=runs[0].t, **{
+                k: np.stack([getattr(r, k) for r in runs]) for k in ("x", "v", "a")})
+        else:
+            sim = BatchSimulator.from_models(models, dt, method=method)
+            forces = sim.force_history(force_cfg, t_grid)
+            result = sim.run(np.zeros(sim.n), np.zeros(sim.n), forces, t0=t0)
+
+        resp = {"count": len(models), "dofs": models[0].dofs,
+                "peaks": {k: v.tolist() for k, v in result.peaks().items()}}
+        if payload.get("include_histories", False):
+            resp.update(result.as_dict())
+        return resp
+
+
+class LoadSuiteService:
+    """
+    One model against R excitations (a record suite, scale factors, ...):
+    sim_core.batch.LoadSuiteSimulator advances all of them as one (n, R)
+    right-hand side through a single factorized Newmark or exact
+    recurrence. Returns a peak table per load case, histories on request.
+    """
+
+    def simulate(self, model, payload: dict, stepper=None):
+        """(n_steps, LoadSuiteResult) for payload["loads"]; ValueError past the limits."""
+        t0 = float(payload.get("t0", 0.0))
+        tf = float(payload.get("tf", 60.0))
+        dt = float(payload.get("dt", 0.02))
+        loads = payload.get("loads") or [{}]
+        integrator = payload.get("integrator", "newmark")
+        if integrator not in LoadSuiteSimulator.METHODS:
+            raise ValueError(f"Unknown integrator '{integrator}'; "
+                             f"expected one of {sorted(LoadSuiteSimulator.METHODS)}.")
+        error = run_limits_error(model, payload)
+        if error:
+            raise ValueError(error)
+        n_steps = step_count(tf, dt)
+        keep = bool(payload.get("include_histories", False))
+        if keep and Trajectory.estimate_nbytes(n_steps + 1, model.dofs) * len(loads) \
+                > MAX_SUITE_HISTORY_BYTES:
+            raise ValueError(
+                f"Histories for {len(loads)} load cases x {n_steps} steps x {model.dofs} "
+                f"stories exceed MAX_SUITE_HISTORY_BYTES={MAX_SUITE_HISTORY_BYTES}; "
+                "request peaks only or fewer cases."
+            )
+
+        if stepper is None:
+            stepper = build_stepper(model, payload)
+        t_grid = t0 + dt * np.arange(n_steps + 1)
+        suite = build_load_suite(loads, t_grid, stepper.model.M)
+        return n_steps, LoadSuiteSimulator(stepper).run(suite, keep_histories=keep)
+
+    def run(self, model, payload: dict, stepper=None) -> dict:
+        n_steps, result = self.simulate(model, payload, stepper)
+        loads = payload.get("loads") or [{}]
+        peaks = result.peaks
+        table = []
+        for r, cfg in enumerate(loads):
+            story = int(np.argmax(peaks["drift"][r]))
+            table.append({
+                "type": cfg.get("type", "pulse"),
+                "record": (cfg.get("record") or RecordLibrary.BUILTIN)
+                          if cfg.get("type") == "earthquake" else None,
+                "amp": float(cfg.get("amp", 1.0 if cfg.get("type") == "earthquake" else 1000.0)),
+                "peak_roof_x": float(peaks["x"][r, -1]),
+                "peak_drift": float(peaks["drift"][r, story]),
+                "peak_drift_story": story + 1,
+                "peak_a": float(np.max(peaks["a"][r])),
+            })
+        resp = {"dofs": model.dofs, "count": len(loads),
+                "integrator": payload.get("integrator", "newmark"),
+                "samples": n_steps + 1, "periods": model.modal_basis.periods.tolist(),
+                "records": table, "peaks": {k: v.tolist() for k, v in peaks.items()}}
+        if result.histories is not None:
+            resp.update(result.histories.as_dict(
+                stride=max(1, int(payload.get("output_stride", 1)))))
+        return resp
+
+
+def load_suite_response(model_payload: dict | None, payload: dict, stepper=None) -> bytes:
+    """Executor job for /shear-building/load-suite (or a registered model's `stepper`)."""
+    if stepper is not None:
+        model = stepper.model
+    else:
+        model = StructureFactory.create_shear_building(model_payload)
+    return encode_json(LoadSuiteService().run(model, payload, stepper))
+
+
+class IDAService:
+    """
+    Incremental dynamic analysis of a linear model by superposition.
+
+    The response to a record scaled by s is exactly s times the response at
+    unit scale (zero initial state, linear structure), so each record is
+    integrated once — all records together, as one LoadSuiteSimulator run
+    — and every scale level's peak demands are that run's peaks times s.
+    The cost is one run however many scale levels are asked for; the
+    response's "cost" block reports the saving against running each
+    (record, scale) pair.
+
+    Intensity per level: PGA and Sa(T1, ζ1), both linear in s as well.
+    """
+
+    def run(self, model, payload: dict, stepper=None) -> dict:
+        started = time.perf_counter()
+        records = payload.get("records") or [RecordLibrary.BUILTIN]
+        scales = np.asarray(payload.get("scale_factors") or [1.0], dtype=float)
+        zeta_vec = payload.get("damping_ratios", [0.02])
+        unit = {**payload, "loads": [{"type": "earthquake", "amp": 1.0, "record": r}
+                                     for r in records]}
+        n_steps, result = LoadSuiteService().simulate(model, unit, stepper)
+
+        T1 = float(model.modal_basis.periods[0])
+        heights = getattr(model, "Hc", None)
+        heights = np.mean(heights, axis=1) if heights is not None else None
+        library = default_library()
+        curves = []
+        for r, name in enumerate(records):
+            rec = library.get(name)
+            pga_g = float(np.max(np.abs(rec.accel_g)))
+            sa_g = _cached_spectrum(name, rec.fingerprint, (T1,), (float(zeta_vec[0]),))
+            peak = {k: v[r] for k, v in result.peaks.items()}
+            story = int(np.argmax(peak["drift"]))
+            drift_ratio = float(np.max(peak["drift"] / heights)) if heights is not None else None
+            curves.append({
+                "record": name,
+                "pga_g": (scales * pga_g).tolist(),
+                "sa_t1_g": (scales * float(sa_g["PSA_g"][0][0])).tolist(),
+                "peak_roof_x": (scales * float(peak["x"][-1])).tolist(),
+                "peak_drift": (scales * float(peak["drift"][story])).tolist(),
+                "peak_drift_ratio": (scales * drift_ratio).tolist()
+                                    if drift_ratio is not None else None,
+                "peak_a": (scales * float(np.max(peak["a"]))).tolist(),
+                "unit_peaks": {k: v.tolist() for k, v in peak.items()},
+            })
+
+        R, N = len(records), scales.size
+        resp = {
+            "dofs": model.dofs, "integrator": payload.get("integrator", "newmark"),
+            "samples": n_steps + 1,
+            "T1": T1, "scale_factors": scales.tolist(), "curves": curves,
+            "cost": {
+                "integrated_runs": R,
+                "equivalent_runs": R * N,
+                "runs_saved": R * N - R,
+                "saving_factor": N,
+                "steps_integrated": R * n_steps,
+                "steps_saved": (R * N - R) * n_steps,
+                "elapsed_s": time.perf_counter() - started,
+            },
+        }
+        if result.histories is not None:
+            # Unit-scale histories; the response at scale s is s times these
+            resp["unit_histories"] = result.histories.as_dict(
+                stride=max(1, int(payload.get("output_stride", 1))))
+        return resp
+
+
+def ida_response(model_payload: dict | None, payload: dict, stepper=None) -> bytes:
+    """Executor job for /shear-building/ida (or a registered model's `stepper`)."""
+    if stepper is not None:
+        model = stepper.model
+    else:
+        model = StructureFactory.create_shear_building(model_payload)
+    return encode_json(IDAService().run(model, payload, stepper))
+
+
+def monte_carlo_batch(model, payload: dict, index: int, size: int) -> dict:
+    """
+    Executor job: batch `index` of a Monte Carlo run — `size` realizations
+    of the model's uncertain properties, their periods (size, n) and, with
+    include_drifts, peak story drifts (size, n) from one BatchSimulator run
+    over all of them. Seeded by (seed, index), so a batch is the same
+    whichever worker computes it.
+    """
+    stochastic = StochasticShearBuilding(model, payload.get("distributions"))
+    rng = np.random.default_rng([int(payload.get("seed", 0)), index])
+    m, k = stochastic.sample(size, rng)
+    if not payload.get("include_drifts", True):
+        return {"periods": 2.0 * np.pi / batched_modes(m, k)}
+
+    omega, PHI = batched_modes(m, k, vectors=True)
+    t0 = float(payload.get("t0", 0.0))
+    dt = float(payload.get("dt", 0.02))
+    n_steps = step_count(float(payload.get("tf", 20.0)), dt)
+    C = caughey_stack(m, omega, PHI, payload.get("damping_ratios", [0.02]))
+    sim = BatchSimulator.from_story_data(m, k, dt, C=C,
+                                         method=payload.get("integrator", "newmark"))
+    t_grid = t0 + dt * np.arange(n_steps + 1)
+    result = sim.run(np.zeros(sim.n), np.zeros(sim.n),
+                     sim.force_history(payload.get("force_function", {}), t_grid), t0=t0)
+    drift = np.diff(result.x, axis=2, prepend=0.0)       # story drifts, (size, samples, n)
+    return {"periods": 2.0 * np.pi / omega, "peak_drift": np.max(np.abs(drift), axis=1)}
+
+
+class MonteCarloService:
+    """
+    Uncertainty propagation: periods and peak story drifts of a shear
+    building whose Ec, Ic, Hc and floor masses are random (multiplicative
+    factors on the model's values, see sim_core.stochastic).
+
+    Samples are drawn, assembled and solved a batch at a time (one
+    vectorized stiffness assembly, one stacked eigen-solve and one
+    BatchSimulator run per batch), up to executor.workers batches in
+    flight — in worker processes with SIM_EXECUTOR=process. Batches are
+    folded in index order, so a seed gives the same statistics however the
+    workers finish. A STATS frame follows every batch; the run stops early
+    once RunningStatistics.converged() holds.
+    """
+
+    async def run(self, model, payload: dict, client: str = "local"):
+        n_samples = int(payload.get("n_samples", 1000))
+        batch_size = max(1, int(payload.get("batch_size", 100)))
+        rel_tol = float(payload.get("rel_tol", 0.01))
+        min_samples = int(payload.get("min_samples", 200))
+        drifts = bool(payload.get("include_drifts", True))
+        dofs = model.dofs
+
+        # Everything a worker could reject, checked before queuing
+        try:
+            StochasticShearBuilding(model, payload.get("distributions"))
+            if dofs > MAX_MC_DOFS:
+                raise ValueError(f"Monte Carlo runs are limited to MAX_MC_DOFS={MAX_MC_DOFS} "
+                                 f"stories (model has {dofs}).")
+            n_steps = 0
+            if drifts:
+                error = run_limits_error(model, payload)
+                if error:
+                    raise ValueError(error)
+                record_fingerprint(payload.get("force_function", {}))
+                n_steps = step_count(float(payload.get("tf", 20.0)),
+                                     float(payload.get("dt", 0.02)))
+                if Trajectory.estimate_nbytes(n_steps + 1, dofs) * batch_size \
+                        > MAX_MC_BATCH_BYTES:
+                    raise ValueError(
+                        f"A batch of {batch_size} runs x {n_steps} steps x {dofs} stories "
+                        f"exceeds MAX_MC_BATCH_BYTES={MAX_MC_BATCH_BYTES}; "
+                        "use a smaller batch_size."
+                    )
+        except (ValueError, KeyError) as e:
+            yield {"type": "ERROR", "message": e.args[0]}
+            return
+
+        sizes = [min(batch_size, n_samples - i) for i in range(0, n_samples, batch_size)]
+        in_flight = max(1, executor.workers)
+        try:
+            ticket = scheduler.submit(
+                client, estimate_cost(max(n_steps, dofs) * batch_size * in_flight, dofs))
+        except AdmissionRejected as e:
+            yield {"type": "ERROR", "message": str(e)}
+            return
+
+        stats = RunningStatistics(payload.get("quantiles") or (0.05, 0.5, 0.95))
+        pending = []
+        try:
+            async for position in scheduler.wait(ticket):
+                yield {"type": "QUEUED", "position": position, "queued": scheduler.queued}
+            yield {"type": "INIT", "dofs": dofs, "n_samples": n_samples,
+                   "batch_size": batch_size, "batches": len(sizes),
+                   "nominal_periods": model.modal_basis.periods.tolist(),
+                   "quantiles": list(stats.quantiles)}
+
+            reason = "max_samples"
+            submitted = 0
+            while submitted < len(sizes) or pending:
+                while submitted < len(sizes) and len(pending) < in_flight:
+                    pending.append(asyncio.ensure_future(executor.call(
+                        monte_carlo_batch, model, payload, submitted, sizes[submitted])))
+                    submitted += 1
+                stats.update(await pending.pop(0))
+                converged = stats.converged(rel_tol, min_samples)
+                yield {"type": "STATS", "samples": stats.count, "converged": converged,
+                       "rel_error": stats.rel_error if math.isfinite(stats.rel_error) else None,
+                       "statistics": stats.summary()}
+                if converged:
+                    reason = "converged"
+                    break
+            yield {"type": "DONE", "reason": reason, "samples": stats.count}
+        except ExecutorBusy as e:
+            yield {"type": "ERROR", "message": str(e)}
+        finally:
+            for job in pending:
+                job.cancel()        # queued batches; a running one finishes unobserved
+            scheduler.release(ticket)
+
+
+def trajectory_key(model, x0: np.ndarray, v0: np.ndarray, physics: dict) -> str:
+    """Content hash of a run: model data, initial state and physics settings."""
+    bands = model.tridiagonal_form()
+    h = hashlib.sha256()
+    for arr in (bands if bands is not None else (model.M, model.K)) + (x0, v0):
+        h.update(np.ascontiguousarray(arr, dtype=float).tobytes())
+        h.update(b"|")
+    h.update(canonical_hash(physics).encode())
+    return h.hexdigest()
+
+
+def time_history_job(model, integrator: str, payload: dict, zeta_vec, force_cfg,
+                     x0, v0, t0: float, dt: float, n_steps: int,
+                     chunk_steps: int = COMPUTE_CHUNK_STEPS, upload=None, stepper=None):
+    """
+    Generator job run by `executor` in a worker thread or process: operator
+    setup (eigen-solve, damping, factorizations), then the step loop in
+    chunks. Yields ("init", periods, solver_info(stepper)), then
+    ("chunk", k0, t, x, v, a) with
+    x/v/a of shape (steps, dofs). A `stepper` from registered_stepper
+    brings its operators (and damped model) along, skipping the setup.
+
+    With an `upload` Channel the ground motion is a record still arriving
+    from the client (payload["record_upload"]): each chunk waits only for
+    the samples covering its own window.
+    """
+    basis = model.modal_basis        # one eigen-solve: periods, damping, modal engine
+    if stepper is None:
+        model.C = basis.damping_matrix(zeta_vec)
+        stepper = INTEGRATORS[integrator](model, dt, payload)
+    # One extra sample so every step also knows the load at its end.
+    t_grid = t0 + dt * np.arange(n_steps + 1)
+    ground = None
+    if upload is None:
+        # Excitation for every step, built once (vectorized over the t-grid)
+        forces = build_force_schedule(force_cfg, t_grid, model.M)
+    else:
+        spec = payload["record_upload"]
+        ground = RecordStream(upload, dt=float(spec["dt"]), npts=int(spec["npts"]),
+                              scaling_factor=float(force_cfg.get("amp", 1.0)))
+        pattern = ground_motion_pattern(model.M)
+        forces = ForceSchedule(t=t_grid[:1], pattern=pattern, history=np.zeros(1))
+    yield "init", basis.frequencies, solver_info(stepper)
+
+    stepper.start(x0, v0, forces)
+    for k0 in range(0, n_steps, chunk_steps):
+        k1 = min(k0 + chunk_steps, n_steps)
+        base = 0
+        if ground is not None:       # this chunk's window only: t[k0] .. t[k1]
+            window = t_grid[k0:k1 + 1]
+            stepper.load(ForceSchedule(t=window, pattern=pattern, history=ground.history(window)))
+            base = k0
+        x, v, a = (np.empty((k1 - k0, x0.size)) for _ in range(3))
+        for j, k in enumerate(range(k0, k1)):
+            stepper.advance(k - base)
+            x[j], v[j], a[j] = stepper.state()
+        yield "chunk", k0, t_grid[k0:k1], x, v, a
+
+
+def solver_info(stepper) -> dict | None:
+    """Factorization and conditioning of a stepper's K_hat (Newmark), else None."""
+    solver = getattr(stepper, "solver", None)
+    return solver.info() if solver is not None else None
+
+
+def session_job(model, integrator: str, payload: dict, zeta_vec, force_cfg,
+                x0, v0, t0: float, dt: float, n_steps: int, commands,
+                chunk_steps: int = COMPUTE_CHUNK_STEPS, stepper=None):
+    """
+    Generator job behind a SimulationSession. Like time_history_job, but
+    it stays alive after the last step, and between chunks it takes
+    ("restart", epoch, k, x, v, a, force_cfg) commands from `commands`:
+    continue from step k with that state and load, reusing the operators
+    already built. Chunks are ("chunk", epoch, k0, t, x, v, a).
+    """
+    basis = model.modal_basis
+    if stepper is None:
+        model.C = basis.damping_matrix(zeta_vec)
+        stepper = INTEGRATORS[integrator](model, dt, payload)
+    t_grid = t0 + dt * np.arange(n_steps + 1)
+    stepper.start(x0, v0, build_force_schedule(force_cfg, t_grid, model.M))
+    yield "init", basis.frequencies, solver_info(stepper)
+
+    epoch, k0 = 0, 0
+    while True:
+        cmd = _next_command(commands, wait=k0 >= n_steps)
+        if cmd is _STOPPED:
+            return
+        if cmd is not None:
+            _, epoch, k0, x, v, a, force_cfg = cmd
+            stepper.start(x, v, build_force_schedule(force_cfg, t_grid, model.M), a0=a)
+            continue
+        k1 = min(k0 + chunk_steps, n_steps)
+        x, v, a = (np.empty((k1 - k0, x0.size)) for _ in range(3))
+        for j, k in enumerate(range(k0, k1)):
+            stepper.advance(k)
+            x[j], v[j], a[j] = stepper.state()
+        yield "chunk", epoch, k0, t_grid[k0:k1], x, v, a
+        k0 = k1
+
+
+_STOPPED = object()
+
+
+def _next_command(commands, wait: bool):
+    """Latest pending command (older ones are superseded), None, or _STOPPED."""
+    cmd = None
+    while True:
+        if commands.stop.is_set():
+            return _STOPPED
+        try:
+            cmd = commands.queue.get(timeout=0.1) if wait and cmd is None \
+                else commands.queue.get_nowait()
+        except queue.Empty:
+            if cmd is not None or not wait:
+                return cmd
+
+
+async def _recorded_chunks(stream, record: Trajectory | None, key: str):
+    """
+    Pass (k0, t, x, v, a) chunks through, copying them into `record`; the
+    Trajectory is cached only once the whole run has arrived.
+    """
+    async for _, k0, t, x, v, a in stream:
+        if record is not None:
+            k1 = k0 + t.size
+            record.t[k0:k1], record.x[k0:k1], record.v[k0:k1], record.a[k0:k1] = t, x, v, a
+        yield k0, t, x, v, a
+    if record is not None:
+        trajectory_cache.put(key, record)
+
+
+async def _replay_chunks(traj: Trajectory, chunk_steps: int = COMPUTE_CHUNK_STEPS):
+    """Cached trajectory in the same (k0, t, x, v, a) chunks as a live run."""
+    for k0 in range(0, traj.t.size, chunk_steps):
+        k1 = k0 + chunk_steps
+        yield k0, traj.t[k0:k1], traj.x[k0:k1], traj.v[k0:k1], traj.a[k0:k1]
+
+
+def step_count(tf: float, dt: float) -> int:
+    """Same count as stepping t += dt while t < t0 + tf."""
+    return int(math.ceil(tf / dt - 1e-9))
+
+
+def run_limits_error(model, payload: dict) -> str | None:
+    """Why a time-history payload cannot run on `model` (integrator, size, steps), or None."""
+    integrator = payload.get("integrator", "newmark")
+    if integrator not in INTEGRATORS:
+        return f"Unknown integrator '{integrator}'; expected one of {sorted(INTEGRATORS)}."
+    if integrator == "exact" and model.dofs > MAX_EXACT_DOFS:
+        return (f"The exact integrator is limited to MAX_EXACT_DOFS={MAX_EXACT_DOFS} "
+                f"stories (model has {model.dofs}); use the 'modal' integrator instead.")
+    tf = float(payload.get("tf", 60.0))
+    dt = float(payload.get("dt", 0.02))
+    n_steps = step_count(tf, dt)
+    if n_steps > MAX_STEPS:
+        return (f"Requested {n_steps} steps (tf={tf}, dt={dt}); "
+                f"maximum allowed is MAX_STEPS={MAX_STEPS}. Increase dt or reduce tf.")
+    return None
+
+
+def record_fingerprint(force_cfg: dict) -> str | None:
+    """Fingerprint of the record an earthquake load uses; KeyError if unknown."""
+    if force_cfg.get("type") != "earthquake":
+        return None
+    record = force_cfg.get("record") or RecordLibrary.BUILTIN
+    try:
+        return default_library().get(record).fingerprint
+    except KeyError:
+        raise KeyError(f"Unknown ground-motion record '{record}'.") from None
+
+
+def data_frame(t, x, v, a, envelope: Envelope | None = None) -> dict:
+    """One JSON DATA frame: roof x/v/a plus every floor."""
+    frame = {
+        "type": "DATA",
+        "t": float(t),
+        "x": x[-1],
+        "v": v[-1],
+        "a": a[-1],
+        "all_x": x.tolist(),
+        "all_v": v.tolist(),
+        "all_a": a.tolist()
+    }
+    if envelope is not None:
+        frame.update(envelope.as_frame())
+    return frame
+
+
+def sleep_batch(sleep_interval: float) -> int:
+    """Steps paced per asyncio.sleep (see the Windows note in TimeSimulationService.run)."""
+    if sys.platform == "win32":
+        return max(1, math.ceil(0.016 / sleep_interval))
+    return 1
+
+
 class TimeSimulationService:
-    async def run(self, model, payload: dict):
+    async def run(self, model, payload: dict, client: str = "local", upload=None,
+                  entry: RegisteredModel | None = None):
+        """
+        Stream a simulation as INIT / QUEUED / DATA frames (or binary blocks).
+        `upload` is the Channel a streamed record arrives on when the payload
+        has a "record_upload" (see sim_app.upload.pump_record). With the
+        registry `entry` of `model`, operators are reused across runs.
+        """
         # 1. הגדרות זמן
         t0    = float(payload.get("t0", 0.0))
         tf    = float(payload.get("tf", 60.0))
@@ -95,118 +835,165 @@ class TimeSimulationService:
         else:
             v = np.zeros(dofs)
 
-        a = np.zeros(dofs)
-
-        # 3. Damping matrix (Caughey modal superposition — exact per-mode zeta)
+        # 3. Damping ratios (Caughey damping is built on a cache miss only)
         zeta_vec = payload.get("damping_ratios", [0.02])
 
-        modal = ModalAnalyzer(model).run()
-        w = modal.frequencies
-
-        model.C = caughey_damping(model.M, model.K, zeta_vec)
-        M, K, C = model.M, model.K, model.C
-
         # 4. כוח
         force_cfg = payload.get("force_function", {})
-        f_amp = float(force_cfg.get("amp", 1000.0))
-        f_freq = float(force_cfg.get("freq", 1.0))
-        f_type = force_cfg.get("type", "pulse")
         f_dur = float(force_cfg.get("duration", 2.0))
-
-        # 5. Newmark-Beta Init
-        gamma = 0.5
-        beta_const = 0.25
-
-        a0 = 1.0 / (beta_const * dt ** 2)
-        a1 = gamma / (beta_const * dt)
-        a2 = 1.0 / (beta_const * dt)
-        a3 = 1.0 / (2.0 * beta_const) - 1.0
-        a4 = gamma / beta_const - 1.0
-        a5 = (dt / 2.0) * (gamma / beta_const - 2.0)
-
-        K_hat = K + a0 * M + a1 * C
-        try:
-            K_hat_inv = np.linalg.inv(K_hat)
-        except:
-            K_hat_inv = np.linalg.pinv(K_hat)
-
-        # Step count guard — reject before allocating anything in the loop
-        n_steps = int((tf) / dt)
-        if n_steps > MAX_STEPS:
-            yield {
-                "type": "ERROR",
-                "message": (
-                    f"Requested {n_steps} steps (tf={tf}, dt={dt}); "
-                    f"maximum allowed is MAX_STEPS={MAX_STEPS}. "
-                    "Increase dt or reduce tf."
-                ),
-            }
+        record_fp = None
+        if payload.get("record_upload") and upload is None:
+            yield {"type": "ERROR", "message": "record_upload needs a streamed upload channel."}
             return
-
-        # שידור ראשוני
-        yield {"type": "INIT", "dofs": dofs, "periods": w.tolist(), "duration": f_dur}
-
-        # 6. לולאת ריצה
-        t = t0
-        end_time = t0 + tf
-
-        # Windows' asyncio event loop has a ~16ms timer floor, so sleeping
-        # after every single dt-step rounds up to the same ~16ms regardless
-        # of speed, making the speed setting a no-op below that threshold.
-        # Batch just enough steps per sleep to clear the floor — no more,
-        # or slower speeds (already above the floor) get a stutter of
-        # several instant updates followed by an oversized pause instead of
-        # smooth per-step delivery. Linux/Render doesn't have this floor, so
-        # batching there would be pure downside — leave it unbatched.
-        if sys.platform == "win32":
-            SLEEP_BATCH = max(1, math.ceil(0.016 / sleep_interval))
+        if upload is not None:
+            if force_cfg.get("type") != "earthquake":
+                yield {"type": "ERROR",
+                       "message": "A streamed record needs force_function.type 'earthquake'."}
+                return
         else:
-            SLEEP_BATCH = 1
-        steps_since_sleep = 0
-
-        while t < end_time:
-            F = np.zeros(dofs)
-
-            # לוגיקה מעודכנת לכוחות (כולל רעידת אדמה)
-            if f_type == "earthquake":
-                scale = float(force_cfg.get("amp", 1.0))
-                F = get_earthquake_force(t, M, scaling_factor=scale)
-
-            elif f_type == "pulse":
-                force_val = 0.0
-                if t <= f_dur:
-                    force_val = f_amp * np.sin(f_freq * t)
-                if dofs > 0: F[-1] = force_val
-
-            else:  # continuous
-                force_val = f_amp * np.sin(f_freq * t)
-                if dofs > 0: F[-1] = force_val
-
-            term_M = a0 * u + a2 * v + a3 * a
-            term_C = a1 * u + a4 * v + a5 * a
-            P_hat = F + M @ term_M + C @ term_C
-
-            u_next = K_hat_inv @ P_hat
-            a_next = a0 * (u_next - u) - a2 * v - a3 * a
-            v_next = v + dt * ((1.0 - gamma) * a + gamma * a_next)
-
-            yield {
-                "type": "DATA",
-                "t": t,
-                "x": u_next[-1],
-                "v": v_next[-1],
-                "a": a_next[-1],
-                "all_x": u_next.tolist(),
-                "all_v": v_next.tolist(),
-                "all_a": a_next.tolist()
-            }
-
-            u, v, a = u_next, v_next, a_next
-            t += dt
-            steps_since_sleep += 1
-            if steps_since_sleep >= SLEEP_BATCH:
-                await asyncio.sleep(SLEEP_BATCH * sleep_interval)
-                steps_since_sleep = 0
-
-        if steps_since_sleep > 0:
-            await asyncio.sleep(steps_since_sleep * sleep_interval)
\ No newline at end of file
+            try:
+                record_fp = record_fingerprint(force_cfg)
+            except KeyError as e:
+                yield {"type": "ERROR", "message": e.args[0]}
+                return
+
+        # 5. Integrator — operators depend only on (model, dt), built once;
+        #    integrator, size and step-count guards before allocating anything
+        integrator = payload.get("integrator", "newmark")
+        error = run_limits_error(model, payload)
+        if error:
+            yield {"type": "ERROR", "message": error}
+            return
+        n_steps = step_count(tf, dt)
+
+        # The trajectory depends on everything above except `speed`, so a
+        # repeat (at any speed) replays cached arrays and only re-paces them.
+        key = trajectory_key(model, u, v, {
+            "t0": t0, "tf": tf, "dt": dt, "integrator": integrator,
+            "modal_mass_threshold": payload.get("modal_mass_threshold", 1.0),
+            "force_function": force_cfg, "damping_ratios": zeta_vec,
+            "record_fingerprint": record_fp,
+        })
+        # A streamed record is not known in advance: never served from cache
+        cached = trajectory_cache.get(key) if upload is None else None
+        ticket = None
+        if cached is not None:
+            w, solver = cached.periods, cached.solver
+            chunks = _replay_chunks(cached)
+        else:
+            # Admission: wait for a share of the global compute budget,
+            # telling the client where it stands instead of going silent.
+            try:
+                ticket = scheduler.submit(client, estimate_cost(n_steps, dofs))
+            except AdmissionRejected as e:
+                yield {"type": "ERROR", "message": str(e)}
+                return
+            try:
+                async for position in scheduler.wait(ticket):
+                    yield {"type": "QUEUED", "position": position,
+                           "queued": scheduler.queued}
+
+                # Setup and stepping run in an executor worker, at most
+                # COMPUTE_AHEAD_CHUNKS ahead of this (paced) consumer.
+                stepper = None
+                if entry is not None:
+                    stepper = await registered_stepper(entry, payload)
+                    model = stepper.model
+                stream = executor.stream(
+                    time_history_job, model, integrator, payload, zeta_vec, force_cfg,
+                    u, v, t0, dt, n_steps, COMPUTE_CHUNK_STEPS, upload, stepper,
+                    maxsize=COMPUTE_AHEAD_CHUNKS)
+                _, w, solver = await stream.__anext__()
+            except ExecutorBusy as e:
+                scheduler.release(ticket)
+                yield {"type": "ERROR", "message": str(e)}
+                return
+            except BaseException:
+                scheduler.release(ticket)
+                raise
+            record = None
+            if upload is None and \
+                    Trajectory.estimate_nbytes(n_steps, dofs) <= trajectory_cache.max_entry_bytes():
+                record = Trajectory.empty(n_steps, dofs, w, solver)
+            chunks = _recorded_chunks(stream, record, key)
+
+        try:
+            # Decimation: integrate every dt, but emit at most `output_fps` frames
+            # per wall-clock second (one step is paced to sleep_interval seconds).
+            output_fps = payload.get("output_fps")
+            stride = 1
+            if output_fps:
+                stride = max(1, math.ceil(1.0 / (sleep_interval * float(output_fps)) - 1e-9))
+            envelope = Envelope(dofs) if payload.get("envelope") else None
+
+            # Wire format: per-step JSON dicts, or packed binary blocks (bytes)
+            protocol = payload.get("protocol", "json")
+            block = None
+            if protocol == "binary":
+                block = FrameBlock(dofs,
+                                   capacity=max(1, int(payload.get("frames_per_message", 16))),
+                                   dtype=payload.get("binary_dtype", "float32"),
+                                   envelope=envelope is not None)
+
+            # שידור ראשוני
+            yield {"type": "INIT", "dofs": dofs, "periods": w.tolist(), "duration": f_dur,
+                   "protocol": protocol, "stride": stride, "frame_dt": stride * dt,
+                   "solver": solver}
+
+            # 6. לולאת ריצה
+            # Windows' asyncio event loop has a ~16ms timer floor, so sleeping
+            # after every single dt-step rounds up to the same ~16ms regardless
+            # of speed, making the speed setting a no-op below that threshold.
+            # Batch just enough steps per sleep to clear the floor — no more,
+            # or slower speeds (already above the floor) get a stutter of
+            # several instant updates followed by an oversized pause instead of
+            # smooth per-step delivery. Linux/Render doesn't have this floor, so
+            # batching there would be pure downside — leave it unbatched.
+            SLEEP_BATCH = sleep_batch(sleep_interval)
+            steps_since_sleep = 0
+
+            async for k0, t_c, x_c, v_c, a_c in chunks:
+                # Emitted steps in this chunk: every stride-th, plus the final one
+                k1 = k0 + t_c.size
+                emits = list(range(k0 + stride - 1 - k0 % stride, k1, stride))
+                if k1 == n_steps and (not emits or emits[-1] != n_steps - 1):
+                    emits.append(n_steps - 1)
+
+                j0 = 0     # first step (chunk-local) not yet folded into a frame
+                for k in emits:
+                    j = k - k0
+                    if envelope is not None:
+                        envelope.update(x_c[j0:j + 1], v_c[j0:j + 1], a_c[j0:j + 1])
+                    t, u_next, v_next, a_next = t_c[j], x_c[j], v_c[j], a_c[j]
+
+                    last = k == n_steps - 1
+                    if block is not None:
+                        if last and (k + 1) % stride and block.count:
+                            yield block.pack(stride * dt)    # off-grid tail gets its own block
+                        block.append(t, u_next, v_next, a_next,
+                                     envelope.take() if envelope is not None else None)
+                        if block.full or last:
+                            yield block.pack(stride * dt)
+                    else:
+                        yield data_frame(t, u_next, v_next, a_next, envelope)
+
+                    # Pace only at emitted frames; skipped steps still count toward the sleep
+                    steps_since_sleep += j + 1 - j0
+                    j0 = j + 1
+                    if steps_since_sleep >= SLEEP_BATCH:
+                        await asyncio.sleep(steps_since_sleep * sleep_interval)
+                        steps_since_sleep = 0
+
+                if envelope is not None and j0 < t_c.size:
+                    envelope.update(x_c[j0:], v_c[j0:], a_c[j0:])
+                steps_since_sleep += t_c.size - j0
+
+            if steps_since_sleep > 0:
+                await asyncio.sleep(steps_since_sleep * sleep_interval)
+        except UploadError as e:
+            yield {"type": "ERROR", "message": str(e)}
+        finally:
+            if upload is not None:
+                upload.stop.set()          # release the upload pump
+            if ticket is not None:
+                scheduler.release(ticket)
@@ -0,0 +1,356 @@
+# sim_app/session.py
+from __future__ import annotations
+import asyncio
+import math
+from collections import deque
+
+import numpy as np
+
+from sim_app.cache import Trajectory
+from sim_app.executor import ExecutorBusy
+from sim_app.framing import Envelope, FrameBlock
+from sim_app.scheduler import AdmissionRejected, estimate_cost
+from sim_app import services
+from sim_app.registry import RegisteredModel
+from sim_app.services import (COMPUTE_AHEAD_CHUNKS, COMPUTE_CHUNK_STEPS, data_frame,
+                              record_fingerprint, registered_stepper, run_limits_error,
+                              session_job, sleep_batch, step_count)
+
+SESSION_MAX_BYTES = 256 * 1024 * 1024  # computed x/v/a kept for seeking, per session
+MIN_SPEED = 0.1
+
+
+class SimulationSession:
+    """
+    A simulation kept open on one WebSocket and steered by control messages
+    (see control()):
+
+        pause / resume          stop / restart the playback clock
+        set_speed  {speed}      new pacing (and decimation) from the next frame
+        seek       {t}          jump to time t; backwards is served from the
+                                steps already computed, forwards waits for them
+        set_force  {force_function}
+                                new load from the current time on: the worker
+                                restarts from the current state with the
+                                operators (factorization, damping, modes) it
+                                already has
+        stop                    end the session
+
+    The session holds a scheduler admission slot only while it plays with
+    steps left to compute: a pause (or reaching the end) releases it, and
+    resuming queues again for the rest.
+
+    The worker (services.session_job) runs in the job executor as for a
+    one-shot run, at most COMPUTE_AHEAD_CHUNKS chunks ahead of the playback
+    cursor. Every computed step is kept in a Trajectory so seeks and replays
+    need no recomputation; a load change discards the steps after the cursor
+    (they belong to an older "epoch" of the run). A registered model's
+    `entry` supplies operators built by earlier runs.
+    """
+
+    AHEAD_STEPS = COMPUTE_AHEAD_CHUNKS * COMPUTE_CHUNK_STEPS
+
+    def __init__(self, model, payload: dict, client: str = "local",
+                 entry: RegisteredModel | None = None):
+        self.model = model
+        self.payload = payload
+        self.client = client
+        self.entry = entry
+        self.t0 = float(payload.get("t0", 0.0))
+        self.dt = float(payload.get("dt", 0.02))
+        self.n_steps = step_count(float(payload.get("tf", 60.0)), self.dt)
+        self.t_grid = self.t0 + self.dt * np.arange(self.n_steps)
+        self.force_cfg = payload.get("force_function", {})
+
+        dofs = model.dofs
+        init_cond = payload.get("initial_conditions") or {}
+        x0, v0 = init_cond.get("x0"), init_cond.get("v0")
+        self.x0 = np.array(x0, dtype=float) if x0 and len(x0) == dofs else np.zeros(dofs)
+        self.v0 = np.array(v0, dtype=float) if v0 and len(v0) == dofs else np.zeros(dofs)
+
+        self.paused = False
+        self.cursor = 0          # next step to play
+        self.horizon = 0         # steps computed for the current epoch
+        self.epoch = 0
+        self.record: Trajectory | None = None
+        self._set_speed(float(payload.get("speed", 1.0)))
+        self._controls: deque[dict] = deque()
+        self._wake = asyncio.Event()       # control message, new chunk or failure
+        self._wanted = asyncio.Event()     # cursor moved: the pump may read further
+        self._failure: BaseException | None = None
+        self._stopped = False
+        self._pending_steps = 0      # steps played since the last pacing sleep
+        self._ticket = None          # scheduler admission, held only while playing
+
+    # -- control input (called by the WebSocket reader) --------------------------
+
+    def control(self, message: dict) -> None:
+        self._controls.append(message)
+        self._wake.set()
+
+    # -- main loop -----------------------------------------------------------------
+
+    async def run(self):
+        """Async generator of INIT / QUEUED / DATA (or binary) / control frames."""
+        model, payload, dofs = self.model, self.payload, self.model.dofs
+        error = run_limits_error(model, payload)
+        if error is None and payload.get("record_upload"):
+            error = "Streamed records cannot be used in a session."
+        if error is None and Trajectory.estimate_nbytes(self.n_steps, dofs) > SESSION_MAX_BYTES:
+            error = (f"Run too large for a session ({self.n_steps} steps x {dofs} stories); "
+                     "reduce tf or use a one-shot run.")
+        if error is None:
+            try:
+                record_fingerprint(self.force_cfg)
+            except KeyError as e:
+                error = e.args[0]
+        if error:
+            yield {"type": "ERROR", "message": error}
+            return
+
+        commands = stream = pump = None
+        try:
+            try:
+                async for frame in self._acquire():
+                    yield frame
+            except AdmissionRejected as e:
+                yield {"type": "ERROR", "message": str(e)}
+                return
+            try:
+                stepper = None
+                if self.entry is not None:
+                    stepper = await registered_stepper(self.entry, payload)
+                    model = stepper.model
+                commands = services.executor.channel(4)
+                stream = services.executor.stream(
+                    session_job, model, payload.get("integrator", "newmark"), payload,
+                    payload.get("damping_ratios", [0.02]), self.force_cfg, self.x0, self.v0,
+                    self.t0, self.dt, self.n_steps, commands, COMPUTE_CHUNK_STEPS, stepper,
+                    maxsize=COMPUTE_AHEAD_CHUNKS)
+                _, w, solver = await stream.__anext__()
+            except ExecutorBusy as e:
+                yield {"type": "ERROR", "message": str(e)}
+                return
+            self.record = Trajectory.empty(self.n_steps, dofs, w, solver)
+            pump = asyncio.create_task(self._pump(stream))
+
+            yield {"type": "INIT", "dofs": dofs, "periods": w.tolist(),
+                   "duration": float(self.force_cfg.get("duration", 2.0)),
+                   "protocol": payload.get("protocol", "json"), "session": True,
+                   "n_steps": self.n_steps, "stride": self.stride,
+                   "frame_dt": self.stride * self.dt, "solver": solver}
+            async for frame in self._play(commands):
+                yield frame
+        finally:
+            if commands is not None:
+                commands.stop.set()
+            if pump is not None:
+                pump.cancel()                # closes the stream inside the task
+                await asyncio.gather(pump, return_exceptions=True)
+            elif stream is not None:
+                await stream.aclose()
+            self._release()
+
+    async def _acquire(self):
+        """Take an admission slot for the steps still to compute, yielding QUEUED frames."""
+        self._ticket = services.scheduler.submit(
+            self.client, estimate_cost(self.n_steps - self.horizon, self.model.dofs))
+        async for position in services.scheduler.wait(self._ticket):
+            yield {"type": "QUEUED", "position": position, "queued": services.scheduler.queued}
+
+    def _release(self) -> None:
+        if self._ticket is not None:
+            services.scheduler.release(self._ticket)
+            self._ticket = None
+
+    async def _pump(self, stream) -> None:
+        """Copy the worker's chunks into the record, staying AHEAD_STEPS ahead."""
+        try:
+            async for _, epoch, k0, t, x, v, a in stream:
+                if epoch != self.epoch:
+                    continue                 # computed for a load since replaced
+                k1 = k0 + t.size
+                rec = self.record
+                rec.t[k0:k1], rec.x[k0:k1], rec.v[k0:k1], rec.a[k0:k1] = t, x, v, a
+                self.horizon = k1
+                self._wake.set()
+                while self.horizon - self.cursor >= self.AHEAD_STEPS and epoch == self.epoch:
+                    self._wanted.clear()
+                    await self._wanted.wait()
+        except Exception as e:
+            self._failure = e
+            self._wake.set()
+
+    async def _play(self, commands):
+        payload, dofs = self.payload, self.model.dofs
+        self.envelope = Envelope(dofs) if payload.get("envelope") else None
+        self.block = None
+        if payload.get("protocol", "json") == "binary":
+            self.block = FrameBlock(dofs,
+                                    capacity=max(1, int(payload.get("frames_per_message", 16))),
+                                    dtype=payload.get("binary_dtype", "float32"),
+                                    envelope=self.envelope is not None)
+        self._block_last = None      # step of the last frame in the open block
+        self._force_emit = False     # emit the cursor step even off-stride (after a seek)
+        self._folded = 0             # first step not yet folded into the envelope
+        done_sent = False
+
+        while True:
+            self._wake.clear()       # anything after this point wakes _idle()
+            while self._controls:
+                for frame in await self._apply(self._controls.popleft(), commands):
+                    yield frame
+                if self._stopped:
+                    for frame in self._flush():
+                        yield frame
+                    return
+            if self._failure is not None:
+                raise self._failure
+
+            finished = self.cursor >= self.n_steps
+            if finished and not done_sent:
+                for frame in self._flush():
+                    yield frame
+                yield {"type": "DONE", "t": float(self.t_grid[-1])}
+                done_sent = True
+            if not finished:
+                done_sent = False
+            if (self.paused and not self._force_emit) or finished:
+                self._release()              # an idle session keeps no admission slot
+                await self._idle()
+                continue
+            if self._ticket is None and not self.paused and self.horizon < self.n_steps:
+                try:
+                    async for frame in self._acquire():
+                        yield frame
+                except AdmissionRejected as e:
+                    self.paused = True
+                    yield {"type": "ERROR", "message": str(e), "fatal": False}
+                    yield {"type": "PAUSED", "t": self._time()}
+                    continue
+
+            k = self._next_emit()
+            if k >= self.horizon:
+                for frame in self._flush():          # nothing to pace against: show what we have
+                    yield frame
+                await self._idle()
+                continue
+
+            rec = self.record
+            if self.envelope is not None:
+                lo = max(self._folded, self.cursor)
+                self.envelope.update(rec.x[lo:k + 1], rec.v[lo:k + 1], rec.a[lo:k + 1])
+                self._folded = k + 1
+            for frame in self._emit(k):
+                yield frame
+            steps = k + 1 - self.cursor
+            self.cursor = k + 1
+            self._force_emit = False
+            self._wanted.set()
+            if self.paused:
+                for frame in self._flush():
+                    yield frame
+                continue
+            self._pending_steps += steps
+            if self._pending_steps >= sleep_batch(self.sleep_interval):
+                await asyncio.sleep(self._pending_steps * self.sleep_interval)
+                self._pending_steps = 0
+
+    async def _idle(self) -> None:
+        if not self._controls and self._failure is None:
+            await self._wake.wait()
+
+    def _next_emit(self) -> int:
+        """Next step to show: every stride-th step, plus the last one (or the seek target)."""
+        k = self.cursor
+        if self._force_emit:
+            return k
+        k = k + (-(k + 1)) % self.stride
+        return min(k, self.n_steps - 1)
+
+    # -- output ------------------------------------------------------------------
+
+    def _emit(self, k: int):
+        rec, env = self.record, self.envelope
+        if self.block is None:
+            yield data_frame(rec.t[k], rec.x[k], rec.v[k], rec.a[k], env)
+            if env is not None:
+                env.take()
+            return
+        if self.block.count and k - self._block_last != self.stride:
+            yield from self._flush()                 # a block has one uniform spacing
+        self.block.append(rec.t[k], rec.x[k], rec.v[k], rec.a[k],
+                          env.take() if env is not None else None)
+        self._block_last = k
+        if self.block.full:
+            yield from self._flush()
+
+    def _flush(self):
+        if self.block is not None and self.block.count:
+            yield self.block.pack(self.stride * self.dt)
+
+    # -- controls ----------------------------------------------------------------
+
+    def _set_speed(self, speed: float) -> None:
+        self.speed = max(speed, MIN_SPEED)
+        self.sleep_interval = 0.005 / self.speed
+        output_fps = self.payload.get("output_fps")
+        self.stride = 1
+        if output_fps:
+            self.stride = max(1, math.ceil(1.0 / (self.sleep_interval * float(output_fps)) - 1e-9))
+
+    def _time(self) -> float:
+        """Label of the last step shown (t0 before the first)."""
+        return float(self.t_grid[self.cursor - 1]) if self.cursor else self.t0
+
+    async def _apply(self, msg: dict, commands) -> list:
+        action = msg.get("action")
+        frames = list(self._flush())
+        if action == "pause":
+            self.paused = True
+            self._release()
+            frames.append({"type": "PAUSED", "t": self._time()})
+        elif action == "resume":
+            self.paused = False
+            frames.append({"type": "RESUMED", "t": self._time()})
+        elif action == "set_speed":
+            self._set_speed(float(msg["speed"]))
+            self._pending_steps = 0
+            frames.append({"type": "SPEED", "speed": self.speed, "stride": self.stride,
+                           "frame_dt": self.stride * self.dt})
+        elif action == "seek":
+            k = int(round((float(msg["t"]) - self.t0) / self.dt))
+            self.cursor = min(max(k, 0), self.n_steps - 1)
+            self._force_emit = True
+            self._folded = self.cursor
+            if self.envelope is not None:
+                self.envelope.take()
+            self._wanted.set()
+            frames.append({"type": "SEEK", "t": float(self.t_grid[self.cursor])})
+        elif action == "set_force":
+            force_cfg = msg["force_function"]
+            try:
+                record_fingerprint(force_cfg)
+            except KeyError as e:
+                return frames + [{"type": "ERROR", "message": e.args[0], "fatal": False}]
+            # Restart from the last state both sides agree on: the step before
+            # the cursor, or the last computed one after a seek ahead of them
+            k = min(self.cursor, self.horizon)
+            if k:
+                rec = self.record
+                x, v, a = rec.x[k - 1].copy(), rec.v[k - 1].copy(), rec.a[k - 1].copy()
+            else:
+                x, v, a = self.x0, self.v0, None
+            self.epoch += 1
+            self.horizon = k
+            self.force_cfg = force_cfg
+            await asyncio.to_thread(commands.put, ("restart", self.epoch, k, x, v, a, force_cfg))
+            self._wanted.set()
+            frames.append({"type": "FORCE", "t": float(self.t_grid[k]) if k < self.n_steps
+                           else self._time()})
+        elif action == "stop":
+            self._stopped = True
+        else:
+            frames.append({"type": "ERROR", "fatal": False,
+                           "message": msg.get("error") or f"Unknown control '{action}'."})
+        return frames
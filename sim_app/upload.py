@@ -0,0 +1,120 @@
+# sim_app/upload.py
+from __future__ import annotations
+import asyncio
+import math
+import queue
+import time
+
+import numpy as np
+
+from sim_core.earthquakes import G
+from sim_app.executor import Channel
+
+
+class UploadError(RuntimeError):
+    """A streamed record upload was malformed, stalled or abandoned."""
+
+
+async def pump_record(receive_bytes, channel: Channel, npts: int, dtype: str = "float32",
+                      max_message_bytes: int = 1_048_576) -> None:
+    """
+    Event-loop side of a streamed record upload.
+
+    Reads binary messages from `receive_bytes()` (little-endian samples in g,
+    any count per message) and forwards them into `channel` until `npts`
+    samples have arrived, then sends None. A full channel blocks the read,
+    so a fast client is held back by the WebSocket instead of buffering the
+    whole record here. Any problem is forwarded as an UploadError for the
+    worker to raise.
+    """
+    wire = np.dtype(dtype).newbyteorder("<")
+    received = 0
+    try:
+        while received < npts:
+            data = await receive_bytes()
+            if len(data) > max_message_bytes:
+                raise UploadError(f"Upload message too large (limit {max_message_bytes // 1024} KiB).")
+            if len(data) % wire.itemsize:
+                raise UploadError(f"Upload message is not a whole number of {dtype} samples.")
+            samples = np.frombuffer(data, dtype=wire).astype(float)
+            if received + samples.size > npts:
+                raise UploadError(f"Upload sent more than the declared npts={npts} samples.")
+            if not np.all(np.isfinite(samples)):
+                raise UploadError("Upload contains non-finite samples.")
+            received += samples.size
+            if not await _put(channel, samples):
+                return
+        await _put(channel, None)
+    except UploadError as e:
+        await _put(channel, e)
+    except Exception as e:          # disconnect, text frame instead of bytes, ...
+        await _put(channel, UploadError(f"Record upload interrupted: {type(e).__name__}"))
+
+
+async def _put(channel: Channel, item) -> bool:
+    return await asyncio.to_thread(channel.put, item)
+
+
+class RecordStream:
+    """
+    Worker side of a streamed upload: ground acceleration of a record whose
+    samples (step `dt`, `npts` in all) are still arriving on a Channel.
+
+    history(t) blocks until the samples covering t have arrived, and keeps
+    only the samples later calls can still need, so memory stays bounded by
+    the chunk window however long the record is. Calls must move forward
+    in time (consecutive windows may share their end points).
+    """
+
+    def __init__(self, channel: Channel, dt: float, npts: int,
+                 scaling_factor: float = 1.0, idle_timeout: float = 30.0):
+        self.channel = channel
+        self.dt = float(dt)
+        self.npts = int(npts)
+        self.scaling_factor = scaling_factor
+        self.idle_timeout = idle_timeout
+        self._buf = np.empty(0)
+        self._first = 0          # record index of _buf[0]
+        self._done = False
+
+    @property
+    def received(self) -> int:
+        return self._first + self._buf.size
+
+    def history(self, t: np.ndarray) -> np.ndarray:
+        """ag(t) [m/s^2] on increasing times t; zero before 0 and after the record."""
+        t = np.asarray(t, dtype=float)
+        need = min(self.npts, math.ceil(t[-1] / self.dt - 1e-9) + 1)
+        while self.received < need and not self._done:
+            self._receive()
+        k = self._first + np.arange(self._buf.size)
+        ag_g = np.interp(t, k * self.dt, self._buf, left=0.0, right=0.0) \
+            if self._buf.size else np.zeros(t.size)
+        # Keep from the sample at or before the window end: the next window starts there
+        keep = max(self._first, min(self.received - 1, math.floor(t[-1] / self.dt + 1e-9)))
+        self._buf = self._buf[keep - self._first:]
+        self._first = keep
+        return ag_g * G * self.scaling_factor
+
+    def _receive(self) -> None:
+        deadline = time.monotonic() + self.idle_timeout
+        while True:
+            if self.channel.stop.is_set():
+                raise UploadError("Record upload abandoned.")
+            try:
+                item = self.channel.queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if time.monotonic() > deadline:
+                    raise UploadError(
+                        f"No record samples received for {self.idle_timeout:g} s "
+                        f"({self.received} of {self.npts})."
+                    ) from None
+        if item is None:
+            self._done = True
+            if self.received < self.npts:
+                raise UploadError(f"Upload ended after {self.received} of {self.npts} samples.")
+        elif isinstance(item, BaseException):
+            raise item
+        else:
+            self._buf = np.concatenate([self._buf, item])
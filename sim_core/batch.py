@@ -0,0 +1,280 @@
+# sim_core/batch.py
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+from scipy.linalg import expm
+
+from .forcing import LoadSuite, build_force_schedule
+from .newmark import NewmarkStepper
+from .statespace import StateSpacePropagator
+from .structures import StructureModel
+
+
+@dataclass
+class BatchTimeHistoryResult:
+    t: np.ndarray      # (n_samples,)
+    x: np.ndarray      # (B, n_samples, n)
+    v: np.ndarray      # (B, n_samples, n)
+    a: np.ndarray      # (B, n_samples, n)
+
+    def peaks(self) -> dict:
+        """Peak |x|, |v|, |a| per structure and DOF, each (B, n)."""
+        return {
+            "x": np.max(np.abs(self.x), axis=1),
+            "v": np.max(np.abs(self.v), axis=1),
+            "a": np.max(np.abs(self.a), axis=1),
+        }
+
+    def as_dict(self, stride: int = 1) -> dict:
+        return {
+            "t": self.t[::stride].tolist(),
+            "x": self.x[:, ::stride].tolist(),
+            "v": self.v[:, ::stride].tolist(),
+            "a": self.a[:, ::stride].tolist(),
+        }
+
+
+@dataclass
+class LoadSuiteResult:
+    """Peaks per load case and DOF, each (R, n); histories only when kept."""
+    t: np.ndarray
+    peaks: dict
+    histories: BatchTimeHistoryResult | None = None
+
+
+def _stack_tridiagonal(diag: np.ndarray, off: np.ndarray) -> np.ndarray:
+    """(B, n) diagonals + (B, n-1) off-diagonals -> (B, n, n) symmetric stack."""
+    B, n = diag.shape
+    A = np.zeros((B, n, n))
+    idx = np.arange(n)
+    A[:, idx, idx] = diag
+    A[:, idx[:-1], idx[1:]] = off
+    A[:, idx[1:], idx[:-1]] = off
+    return A
+
+
+def _bmv(A: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Batched matvec: (B, n, m) @ (B, m) -> (B, n)."""
+    return np.matmul(A, x[..., None])[..., 0]
+
+
+class BatchSimulator:
+    """
+    Advance B linear structures with the same number of DOFs in lockstep.
+
+    M, K, C are (B, n, n) stacks. Every per-structure operator (K_hat,
+    e^{A dt}, ...) is precomputed as a stack, and each time step is a single
+    batched matmul over the whole stack, so the Python loop overhead is paid
+    once per step rather than once per step per structure.
+
+    method:
+        "newmark" – constant-average-acceleration Newmark-Beta
+        "exact"   – discrete state-space propagator (first-order-hold load)
+    """
+
+    def __init__(self, M: np.ndarray, K: np.ndarray, C: np.ndarray | None,
+                 dt: float, method: str = "newmark"):
+        M = np.asarray(M, dtype=float)
+        K = np.asarray(K, dtype=float)
+        if M.ndim != 3 or M.shape != K.shape or M.shape[1] != M.shape[2]:
+            raise ValueError("M and K must be (B, n, n) stacks of the same shape")
+        C = np.zeros_like(M) if C is None else np.asarray(C, dtype=float)
+        if method not in ("newmark", "exact"):
+            raise ValueError(f"Unknown method '{method}'; expected 'newmark' or 'exact'")
+
+        self.M, self.K, self.C = M, K, C
+        self.B, self.n = M.shape[0], M.shape[1]
+        self.dt = dt
+        self.method = method
+        self.M_inv = np.linalg.inv(M)
+
+        if method == "newmark":
+            self._init_newmark()
+        else:
+            self._init_exact()
+
+    @classmethod
+    def from_models(cls, models: list[StructureModel], dt: float,
+                    method: str = "newmark") -> "BatchSimulator":
+        return cls(np.stack([m.M for m in models]),
+                   np.stack([m.K for m in models]),
+                   np.stack([m.C for m in models]), dt, method=method)
+
+    @classmethod
+    def from_story_data(cls, floor_masses: np.ndarray, story_stiffness: np.ndarray,
+                        dt: float, C: np.ndarray | None = None,
+                        method: str = "newmark") -> "BatchSimulator":
+        """
+        Build straight from the banded shear-building data: (B, n) floor
+        masses and (B, n) story stiffnesses, as ShearBuilding stores them.
+        """
+        m = np.asarray(floor_masses, dtype=float)
+        k = np.asarray(story_stiffness, dtype=float)
+        diag = k.copy()
+        diag[:, :-1] += k[:, 1:]
+        M = np.zeros((m.shape[0], m.shape[1], m.shape[1]))
+        idx = np.arange(m.shape[1])
+        M[:, idx, idx] = m
+        return cls(M, _stack_tridiagonal(diag, -k[:, 1:]), C, dt, method=method)
+
+    # -- operator setup ------------------------------------------------------
+
+    def _init_newmark(self, gamma: float = 0.5, beta: float = 0.25):
+        dt = self.dt
+        self.gamma = gamma
+        self.c = (1.0 / (beta * dt ** 2), gamma / (beta * dt), 1.0 / (beta * dt),
+                  1.0 / (2.0 * beta) - 1.0, gamma / beta - 1.0,
+                  (dt / 2.0) * (gamma / beta - 2.0))
+        a0, a1 = self.c[0], self.c[1]
+        K_hat = self.K + a0 * self.M + a1 * self.C
+        # Cholesky first: a non-SPD K_hat in any member is an input error
+        np.linalg.cholesky(K_hat)
+        # K_hat is fixed for the whole run; a stacked inverse keeps each step a
+        # single batched GEMV (numpy has no batched triangular solve)
+        self.K_hat_inv = np.linalg.inv(K_hat)
+
+    def _init_exact(self):
+        B, n, dt = self.B, self.n, self.dt
+        aug = np.zeros((B, 4 * n, 4 * n))
+        aug[:, :n, n:2 * n] = np.eye(n) * dt
+        aug[:, n:2 * n, :n] = -(self.M_inv @ self.K) * dt
+        aug[:, n:2 * n, n:2 * n] = -(self.M_inv @ self.C) * dt
+        aug[:, n:2 * n, 2 * n:3 * n] = self.M_inv * dt
+        aug[:, 2 * n:3 * n, 3 * n:] = np.eye(n) * dt
+        E = expm(aug)   # batched over the leading axis
+        self.Phi = E[:, :2 * n, :2 * n]
+        G_zoh = E[:, :2 * n, 2 * n:3 * n]
+        self.Gamma1 = E[:, :2 * n, 3 * n:] / dt
+        self.Gamma0 = G_zoh - self.Gamma1
+
+    # -- loads -----------------------------------------------------------------
+
+    def force_history(self, force_cfg: dict, t: np.ndarray) -> np.ndarray:
+        """(B, n_samples, n) loads for a `force_function` payload, per member."""
+        return np.stack([
+            build_force_schedule(force_cfg, t, self.M[b]).as_matrix()
+            for b in range(self.B)
+        ])
+
+    # -- integration -----------------------------------------------------------
+
+    def run(self, x0: np.ndarray, v0: np.ndarray, F: np.ndarray,
+            t0: float = 0.0) -> BatchTimeHistoryResult:
+        """
+        x0, v0 : (n,) shared or (B, n) per-structure initial conditions
+        F      : loads at every sample, (n_samples, n) shared or (B, n_samples, n)
+        Sample 0 is the initial state; its acceleration is the consistent
+        one, a0 = M⁻¹ (F0 - C v0 - K x0).
+        """
+        B, n = self.B, self.n
+        F = np.broadcast_to(np.asarray(F, dtype=float), (B,) + np.shape(F)[-2:])
+        n_samples = F.shape[1]
+
+        x = np.empty((B, n_samples, n))
+        v = np.empty((B, n_samples, n))
+        x[:, 0] = np.broadcast_to(x0, (B, n))
+        v[:, 0] = np.broadcast_to(v0, (B, n))
+
+        if self.method == "newmark":
+            self._run_newmark(x, v, F)
+        else:
+            self._run_exact(x, v, F)
+
+        # a = M⁻¹ (F - C v - K x) for every sample at once
+        rhs = F - np.einsum("bij,bsj->bsi", self.C, v) - np.einsum("bij,bsj->bsi", self.K, x)
+        a = np.einsum("bij,bsj->bsi", self.M_inv, rhs)
+
+        t = t0 + self.dt * np.arange(n_samples)
+        return BatchTimeHistoryResult(t=t, x=x, v=v, a=a)
+
+    def _run_newmark(self, x, v, F):
+        a0, a1, a2, a3, a4, a5 = self.c
+        gamma, dt = self.gamma, self.dt
+        M, C, K_hat_inv = self.M, self.C, self.K_hat_inv
+
+        u, vel = x[:, 0], v[:, 0]
+        acc = _bmv(self.M_inv, F[:, 0] - _bmv(C, vel) - _bmv(self.K, u))
+        for k in range(F.shape[1] - 1):
+            P_hat = (F[:, k + 1]
+                     + _bmv(M, a0 * u + a2 * vel + a3 * acc)
+                     + _bmv(C, a1 * u + a4 * vel + a5 * acc))
+            u_next = _bmv(K_hat_inv, P_hat)
+            acc_next = a0 * (u_next - u) - a2 * vel - a3 * acc
+            vel_next = vel + dt * ((1.0 - gamma) * acc + gamma * acc_next)
+            x[:, k + 1], v[:, k + 1] = u_next, vel_next
+            u, vel, acc = u_next, vel_next, acc_next
+
+    def _run_exact(self, x, v, F):
+        n = self.n
+        # State-independent load terms for all steps and members in one go
+        drive = (np.einsum("bij,bsj->bsi", self.Gamma0, F[:, :-1])
+                 + np.einsum("bij,bsj->bsi", self.Gamma1, F[:, 1:]))
+        z = np.concatenate([x[:, 0], v[:, 0]], axis=1)
+        for k in range(F.shape[1] - 1):
+            z = _bmv(self.Phi, z) + drive[:, k]
+            x[:, k + 1], v[:, k + 1] = z[:, :n], z[:, n:]
+
+
+class LoadSuiteSimulator:
+    """
+    One linear structure under R excitations (records, scale factors, ...)
+    advanced together: the state is an (n, R) stack and every step is one
+    pass of a single stepper — for Newmark one factorized K_hat solve with
+    R right-hand sides, for the exact propagator one Φ @ Z product — so the
+    cost per step is a BLAS-3 call instead of R Python-level steps, and
+    the operators are built once for the whole suite.
+
+    Peaks (|x|, |v|, |a| and story drift) are tracked as the run goes, so
+    without histories memory stays O(n R) whatever the duration.
+    """
+
+    METHODS = {"newmark": NewmarkStepper, "exact": StateSpacePropagator}
+
+    def __init__(self, stepper):
+        self.stepper = stepper
+
+    @classmethod
+    def from_model(cls, model: StructureModel, dt: float,
+                   method: str = "newmark") -> "LoadSuiteSimulator":
+        if method not in cls.METHODS:
+            raise ValueError(f"Unknown method '{method}'; expected one of {sorted(cls.METHODS)}")
+        return cls(cls.METHODS[method](model, dt))
+
+    def run(self, loads: LoadSuite, x0: np.ndarray | None = None,
+            v0: np.ndarray | None = None, keep_histories: bool = False) -> LoadSuiteResult:
+        """
+        x0, v0 : (n,) shared or (n, R) per-case initial state (default rest).
+        Sample 0 is the initial state; the acceleration starts from zero,
+        as in a streamed run, so each column matches a single-case run.
+        """
+        n, R, n_samples = self.stepper.model.dofs, loads.size, len(loads)
+        u0 = np.zeros((n, R)) if x0 is None else np.broadcast_to(
+            np.asarray(x0, dtype=float).reshape(n, -1), (n, R)).copy()
+        w0 = np.zeros((n, R)) if v0 is None else np.broadcast_to(
+            np.asarray(v0, dtype=float).reshape(n, -1), (n, R)).copy()
+
+        stepper = self.stepper
+        stepper.start(u0, w0, loads)
+        if keep_histories:
+            hist = [np.empty((n_samples, n, R)) for _ in range(3)]
+        peaks = {k: np.zeros((n, R)) for k in ("x", "v", "a", "drift")}
+
+        for k in range(n_samples):
+            if k:
+                stepper.advance(k - 1)
+            x, v, a = stepper.state()
+            np.maximum(peaks["x"], np.abs(x), out=peaks["x"])
+            np.maximum(peaks["v"], np.abs(v), out=peaks["v"])
+            np.maximum(peaks["a"], np.abs(a), out=peaks["a"])
+            drift = np.diff(x, axis=0, prepend=0.0)
+            np.maximum(peaks["drift"], np.abs(drift), out=peaks["drift"])
+            if keep_histories:
+                hist[0][k], hist[1][k], hist[2][k] = x, v, a
+
+        histories = None
+        if keep_histories:
+            # (n_samples, n, R) -> (R, n_samples, n), as in a batch of structures
+            x, v, a = (np.ascontiguousarray(h.transpose(2, 0, 1)) for h in hist)
+            histories = BatchTimeHistoryResult(t=loads.t, x=x, v=v, a=a)
+        return LoadSuiteResult(t=loads.t, peaks={k: p.T.copy() for k, p in peaks.items()},
+                               histories=histories)
@@ -1,5 +1,7 @@
 import numpy as np
 
+G = 9.807  # m/s^2
+
 
 def get_el_centro_record():
     """
@@ -36,7 +38,7 @@ def get_earthquake_force(t: float, M: np.ndarray, scaling_factor: float = 1.0) -
         ag_g = np.interp(t, t_data, a_data_g)
 
     # המרה מ-g ל-m/s^2
-    ag_ms2 = ag_g * 9.807 * scaling_factor
+    ag_ms2 = ag_g * G * scaling_factor
 
     # 2. וקטור השפעה (כל הקומות זזות ביחד אופקית)
     influence_vec = np.ones(M.shape[0])
@@ -45,4 +47,4 @@ def get_earthquake_force(t: float, M: np.ndarray, scaling_factor: float = 1.0) -
     # המינוס חשוב! כשהקרקע זזה ימינה, הבניין "מרגיש" כוח שמאלה.
     force_vec = -1.0 * (M @ influence_vec) * ag_ms2
 
-    return force_vec
\ No newline at end of file
+    return force_vec
@@ -0,0 +1,111 @@
+# sim_core/forcing.py
+from dataclasses import dataclass
+import numpy as np
+
+from .records import RecordLibrary, default_library
+
+
+@dataclass
+class ForceSchedule:
+    """
+    Precomputed excitation on a fixed time grid:
+        F[k] = pattern * history[k]
+
+    Every load case the simulator supports is separable in space and time
+    (a tip load, or ground motion acting through -M{1}), so the full
+    (n_steps, dofs) matrix is the outer product of a spatial pattern and
+    a scalar history. Both are built once per run; the step loop only
+    indexes into them.
+    """
+    t: np.ndarray           # (n_steps,) time grid [s]
+    pattern: np.ndarray     # (dofs,) spatial load distribution
+    history: np.ndarray     # (n_steps,) scalar amplitude per step
+
+    def __len__(self) -> int:
+        return self.t.shape[0]
+
+    def __getitem__(self, k: int) -> np.ndarray:
+        return self.pattern * self.history[k]
+
+    def as_matrix(self) -> np.ndarray:
+        """The full (n_steps, dofs) excitation matrix."""
+        return np.outer(self.history, self.pattern)
+
+
+@dataclass
+class LoadSuite:
+    """
+    R excitations on one time grid, advanced together as a right-hand-side
+    matrix: F[k] is (dofs, R), column r being load case r at t[k],
+        F[k][:, r] = patterns[:, r] * histories[k, r]
+    The steppers take (n, R) state stacks, so one factorized recurrence
+    serves the whole suite.
+    """
+    t: np.ndarray           # (n_steps,) time grid [s]
+    patterns: np.ndarray    # (dofs, R) spatial load distribution per case
+    histories: np.ndarray   # (n_steps, R) scalar amplitude per step and case
+
+    @classmethod
+    def from_schedules(cls, schedules: list) -> "LoadSuite":
+        return cls(t=schedules[0].t,
+                   patterns=np.stack([s.pattern for s in schedules], axis=1),
+                   histories=np.stack([s.history for s in schedules], axis=1))
+
+    @property
+    def size(self) -> int:
+        return self.histories.shape[1]
+
+    def __len__(self) -> int:
+        return self.t.shape[0]
+
+    def __getitem__(self, k: int) -> np.ndarray:
+        return self.patterns * self.histories[k]
+
+
+def ground_motion_pattern(M: np.ndarray) -> np.ndarray:
+    """Spatial pattern of a ground acceleration: F(t) = -M {1} ag(t)."""
+    # M {1} is just the row sums of M
+    return -(M @ np.ones(M.shape[0]))
+
+
+def build_force_schedule(force_cfg: dict, t: np.ndarray, M: np.ndarray) -> ForceSchedule:
+    """
+    Evaluate the `force_function` payload once over the whole time grid.
+
+    force_cfg keys (same as the WebSocket payload):
+        type     : "pulse" | "continuous" | "earthquake"
+        amp      : force amplitude [N], or the ground-motion scale factor
+        freq     : forcing circular frequency [rad/s]
+        duration : pulse length [s]
+        record   : ground-motion record name for "earthquake" (default "el_centro")
+    """
+    t = np.asarray(t, dtype=float)
+    dofs = M.shape[0]
+
+    f_type = force_cfg.get("type", "pulse")
+    f_freq = float(force_cfg.get("freq", 1.0))
+    f_dur = float(force_cfg.get("duration", 2.0))
+
+    if f_type == "earthquake":
+        scale = float(force_cfg.get("amp", 1.0))
+        pattern = ground_motion_pattern(M)
+        record = force_cfg.get("record") or RecordLibrary.BUILTIN
+        history = default_library().ground_acceleration(record, t, scaling_factor=scale)
+        return ForceSchedule(t=t, pattern=pattern, history=history)
+
+    f_amp = float(force_cfg.get("amp", 1000.0))
+
+    # pulse / continuous: harmonic load on the top floor
+    pattern = np.zeros(dofs)
+    if dofs > 0:
+        pattern[-1] = 1.0
+    history = f_amp * np.sin(f_freq * t)
+    if f_type == "pulse":
+        history[t > f_dur] = 0.0
+
+    return ForceSchedule(t=t, pattern=pattern, history=history)
+
+
+def build_load_suite(force_cfgs: list, t: np.ndarray, M: np.ndarray) -> LoadSuite:
+    """build_force_schedule for each `force_function` payload, stacked into a LoadSuite."""
+    return LoadSuite.from_schedules([build_force_schedule(cfg, t, M) for cfg in force_cfgs])
@@ -1,7 +1,5 @@
 import numpy as np
 
-import numpy as np
-
 
 def mass_matrix_lumped(dofs: int,
                        Lb: np.ndarray,
@@ -18,16 +16,11 @@ def mass_matrix_lumped(dofs: int,
     beam_length_per_story = np.sum(Lb, axis=1)
     area = depth * beam_length_per_story
 
-    M = np.zeros((dofs, dofs), dtype=float)
-
-    for i in range(dofs):
-        # שימוש בערך הספציפי של הקומה i
-        M[i, i] = area[i] * floor_load[i] / 9.807
+    # מסה לכל קומה (וקטור) -> מטריצה אלכסונית
+    return np.diag(area * np.asarray(floor_load, dtype=float) / 9.807)
 
-    return M
 
-
-def caughey_damping(M: np.ndarray, K: np.ndarray, zeta) -> np.ndarray:
+def caughey_damping(M: np.ndarray, K: np.ndarray, zeta, basis=None) -> np.ndarray:
     """
     Classical Caughey modal-superposition damping matrix (port of caugheydamping.m).
 
@@ -45,35 +38,57 @@ def caughey_damping(M: np.ndarray, K: np.ndarray, zeta) -> np.ndarray:
         Target modal damping ratio per mode.  If fewer values are supplied than
         there are DOFs, the last value is broadcast to fill the remaining modes
         (matches MATLAB main.m: zeta = 0.02 * ones(1, DOFs)).
+    basis : ModalBasis of (M, K), e.g. model.modal_basis, to reuse an
+        existing eigen-solution instead of solving again.
 
     Returns
     -------
     C : (n, n) symmetric damping matrix  C = M * C_modal * M
     """
     # Deferred imports break the circular chain: matrices <- structures <- modal <- matrices
-    from .modal import ModalAnalyzer
     from .structures import StructureModel
 
-    n = M.shape[0]
+    if basis is None:
+        basis = StructureModel(M=M, K=K).modal_basis
+    return basis.damping_matrix(zeta)
+
 
-    modal = ModalAnalyzer(StructureModel(M=M, K=K)).run()
-    w_n = modal.frequencies          # (n,) rad/s, ascending
-    PHI = np.real(modal.modes)       # (n, n), columns = mode shapes
+def story_stiffness(dofs: int,
+                    Hc: np.ndarray,
+                    Ec: np.ndarray,
+                    Ic: np.ndarray,
+                    base: int = 1) -> np.ndarray:
+    """
+    קשיחות צידית שקולה לכל קומה (story stiffness), וקטור באורך dofs:
+        Kstory[i] = Σ (coeff * Ec * Ic / H^3) על כל העמודים בקומה i
 
-    # Broadcast zeta to exactly n values
-    zeta_arr = np.atleast_1d(np.asarray(zeta, dtype=float)).ravel()
-    if zeta_arr.size < n:
-        zeta_arr = np.append(zeta_arr, np.full(n - zeta_arr.size, zeta_arr[-1]))
-    zeta_arr = zeta_arr[:n]
+    coeff = 12 (clamped–clamped) for every story, except the first story
+    with a pinned base (base=0), where it is 3.
+    """
+    coeff_clamped = 12.0   # קבוע לעמוד מקובע–מקובע/חופשי
+    coeff_simple = 3.0     # קבוע לעמוד פשוט–פשוט
 
-    # C_modal = sum_i  (2 * zeta_i * w_i / m_i) * outer(phi_i, phi_i)
-    C_modal = np.zeros((n, n))
-    for i in range(n):
-        phi_i = PHI[:, i]
-        m_i = float(phi_i @ M @ phi_i)
-        C_modal += (2.0 * zeta_arr[i] * w_n[i] / m_i) * np.outer(phi_i, phi_i)
+    coeff = np.full(dofs, coeff_clamped)
+    if dofs > 0 and base != 1:
+        coeff[0] = coeff_simple
 
-    return M @ C_modal @ M
+    # K = coeff * E * I / H^3 לכל עמוד בקומה, ואז סכום על העמודים.
+    # Leading axes are realizations: (S, dofs, cols) stacks give (S, dofs).
+    Kcol = coeff[:, None] * Ec[..., :dofs, :] * Ic[..., :dofs, :] / (Hc[..., :dofs, :] ** 3)
+    return np.sum(Kcol, axis=-1)
+
+
+def shear_stiffness_bands(Kstory: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The two non-zero bands of the shear-building stiffness matrix:
+        diag[i] = k[i] + k[i+1]  (top floor: k[N-1])
+        off[i]  = K[i, i+1] = K[i+1, i] = -k[i+1]
+    """
+    Kstory = np.asarray(Kstory, dtype=float)
+    diag = Kstory.copy()
+    diag[..., :-1] += Kstory[..., 1:]
+    off = -Kstory[..., 1:]
+    return diag, off
 
 
 def stiffness_shear_structure(dofs: int,
@@ -93,45 +108,8 @@ def stiffness_shear_structure(dofs: int,
         קומה i:   Kii = ki + k(i+1),  Ki,i-1 = -ki,  Ki,i+1 = -k(i+1)
         קומה עליונה: KNN = kN,      KN,N-1 = -kN
     """
-    coeff_clamped = 12.0   # קבוע לעמוד מקובע–מקובע/חופשי
-    coeff_simple = 3.0     # קבוע לעמוד פשוט–פשוט
-
-    # קשיחות כל עמוד בכל קומה
-    Kcol = np.zeros_like(Hc, dtype=float)
-
-    for i in range(dofs):
-        # בקומה הראשונה לוקחים בחשבון את תנאי הבסיס
-        if i == 0:
-            coeff = coeff_clamped if base == 1 else coeff_simple
-        else:
-            coeff = coeff_clamped
-
-        # K = coeff * E * I / H^3 לכל עמוד בקומה
-        Kcol[i, :] = (coeff * Ec[i, :] * Ic[i, :]) / (Hc[i, :] ** 3)
-
-    # story stiffness שקולה לכל קומה (סכום על כל העמודים)
-    Kstory = np.sum(Kcol, axis=1)   # וקטור באורך dofs
+    Kstory = story_stiffness(dofs, Hc, Ec, Ic, base=base)
+    diag, off = shear_stiffness_bands(Kstory)
 
     # ===== הרכבת מטריצת הקשיחות הגלובלית K (תלת־אלכסונית) =====
-    K = np.zeros((dofs, dofs), dtype=float)
-
-    for i in range(dofs):
-        if i == 0:
-            # קומה ראשונה – קשיחות מעל הבסיס (k1) ועוד story שמעליה (k2)
-            K[i, i] += Kstory[i]
-            if dofs > 1:
-                K[i, i] += Kstory[i + 1]
-                K[i, i + 1] -= Kstory[i + 1]
-
-        elif i == dofs - 1:
-            # קומה עליונה – רק story האחרון
-            K[i, i] += Kstory[i]
-            K[i, i - 1] -= Kstory[i]
-
-        else:
-            # קומה פנימית – story מתחת (ki) ו-story מעל (k(i+1))
-            K[i, i] += Kstory[i] + Kstory[i + 1]
-            K[i, i - 1] -= Kstory[i]
-            K[i, i + 1] -= Kstory[i + 1]
-
-    return K
+    return np.diag(diag) + np.diag(off, 1) + np.diag(off, -1)
@@ -1,6 +1,8 @@
 # sim_core/modal.py
+from __future__ import annotations
 from dataclasses import dataclass
 import numpy as np
+from scipy.linalg import eigh, eigh_tridiagonal
 
 from .structures import StructureModel
 
@@ -11,39 +13,127 @@ class ModalResult:
     periods: np.ndarray         # T_n [s]
     modes: np.ndarray           # PHI (columns = modes)
 
-    def as_dict(self) -> dict:
+    def as_dict(self, n_shapes: int | None = None) -> dict:
+        """n_shapes: export only the first n_shapes mode shapes (default: all)."""
         return {
             "frequencies": self.frequencies.tolist(),
             "periods": self.periods.tolist(),
-            "modes": self.modes.tolist(),
+            "modes": self.modes[:, :n_shapes].tolist(),
         }
 #hi
 
 
+@dataclass
+class ModalBasis(ModalResult):
+    """
+    Everything downstream code needs from the undamped modes of a model,
+    computed once (see StructureModel.modal_basis) and shared by damping
+    assembly, the modal endpoint and modal superposition.
+
+    Modes are M-orthonormal, so the modal masses are all 1 and the
+    participation factors for uniform base excitation are Γ = φᵀ M {1}.
+    """
+    MPHI: np.ndarray            # M φ, (n, k)
+    modal_masses: np.ndarray    # φᵀ M φ per mode
+    participation: np.ndarray   # Γ per mode
+    effective_mass: np.ndarray  # Γ² / (φᵀ M φ) per mode [kg]
+    total_mass: float           # {1}ᵀ M {1} [kg]
+
+    @classmethod
+    def from_model(cls, model: StructureModel, n_modes: int | None = None) -> "ModalBasis":
+        modal = ModalAnalyzer(model, n_modes=n_modes).run()
+        PHI = modal.modes
+        bands = model.tridiagonal_form()
+        if bands is not None:
+            MPHI = bands[0][:, None] * PHI           # diagonal M scales rows
+            total_mass = float(bands[0].sum())
+        else:
+            MPHI = model.M @ PHI
+            total_mass = float(model.M.sum())
+        modal_masses = np.einsum("ij,ij->j", PHI, MPHI)
+        participation = MPHI.sum(axis=0) / modal_masses
+        return cls(frequencies=modal.frequencies, periods=modal.periods, modes=PHI,
+                   MPHI=MPHI, modal_masses=modal_masses, participation=participation,
+                   effective_mass=participation ** 2 * modal_masses, total_mass=total_mass)
+
+    def damping_matrix(self, zeta) -> np.ndarray:
+        """
+        Caughey damping with ratio zeta[i] in mode i (the last value fills
+        any remaining modes): C = M Φ diag(2ζᵢωᵢ / mᵢ) Φᵀ M, as one GEMM.
+        """
+        n = self.frequencies.size
+        zeta_arr = np.atleast_1d(np.asarray(zeta, dtype=float)).ravel()
+        if zeta_arr.size < n:
+            zeta_arr = np.append(zeta_arr, np.full(n - zeta_arr.size, zeta_arr[-1]))
+        c_modal = 2.0 * zeta_arr[:n] * self.frequencies / self.modal_masses
+        return (self.MPHI * c_modal) @ self.MPHI.T
+
+    def modal_damping(self, C: np.ndarray, n_modes: int | None = None) -> np.ndarray:
+        """Diagonal of Φᵀ C Φ (first n_modes) — 2ζᵢωᵢ per mode for classical damping."""
+        PHI = self.modes[:, :n_modes]
+        return np.einsum("ij,ij->j", PHI, C @ PHI)
+
+    def as_dict(self, n_shapes: int | None = None) -> dict:
+        resp = super().as_dict(n_shapes)
+        resp["participation_factors"] = self.participation.tolist()
+        resp["effective_masses"] = self.effective_mass.tolist()
+        resp["effective_mass_ratios"] = (self.effective_mass / self.total_mass).tolist()
+        return resp
+
+
+def _orient(PHI: np.ndarray) -> np.ndarray:
+    """Sign convention: every mode has a non-negative roof (last DOF) component."""
+    signs = np.where(PHI[-1, :] < 0.0, -1.0, 1.0)
+    return PHI * signs
+
+
 class ModalAnalyzer:
-    def __init__(self, model: StructureModel):
+    """
+    Undamped modes of K φ = λ M φ.
+
+    M and K are symmetric with M positive-definite, so this is solved as a
+    symmetric-definite problem: eigenvalues are real by construction and the
+    modes come back M-orthonormal (φᵀ M φ = I). When M is diagonal and K
+    tridiagonal — every ShearBuilding — the problem is reduced to a
+    symmetric tridiagonal one, M^-1/2 K M^-1/2, and solved with the
+    tridiagonal LAPACK driver.
+
+    n_modes: compute only the lowest n_modes modes (default: all).
+    """
+
+    def __init__(self, model: StructureModel, n_modes: int | None = None):
         self.model = model
+        self.n_modes = n_modes
 
     def run(self) -> ModalResult:
-        M = self.model.M
-        K = self.model.K
-
-        # פתרון K φ = λ M φ
-        M_inv_K = np.linalg.solve(M, K)
-        eigvals, eigvecs = np.linalg.eig(M_inv_K)
-
-        w_n = np.sqrt(np.real(eigvals))
-        idx = np.argsort(w_n)
-        w_n = w_n[idx]
-        # np.linalg.eig can return complex128-dtype eigenvectors even when
-        # every imaginary part is zero (LAPACK backend-dependent for a
-        # general, non-symmetric matrix like M^-1 K). Mode shapes of a real
-        # M/K system are real-valued, so any imaginary component here is
-        # numerical noise — discard it, or PHI.tolist() produces Python
-        # complex numbers that json.dumps can't serialize.
-        PHI = np.real(eigvecs[:, idx])
+        n = self.model.dofs
+        k = n if self.n_modes is None else max(1, min(int(self.n_modes), n))
+        subset = None if k == n else (0, k - 1)
+
+        bands = self.model.tridiagonal_form()
+        if bands is not None:
+            eigvals, PHI = self._tridiagonal(*bands, subset)
+        else:
+            eigvals, PHI = eigh(self.model.K, self.model.M, subset_by_index=subset)
+
+        # Round-off can leave a rigid-body or near-zero eigenvalue a hair below 0
+        w_n = np.sqrt(np.clip(eigvals, 0.0, None))
+        PHI = _orient(PHI)
         T_n = 2.0 * np.pi / w_n
 
         return ModalResult(frequencies=w_n, periods=T_n, modes=PHI)
 
+    @staticmethod
+    def _tridiagonal(m: np.ndarray, k_diag: np.ndarray, k_off: np.ndarray, subset):
+        # M^-1/2 K M^-1/2 keeps K's tridiagonal pattern when M is diagonal
+        s = 1.0 / np.sqrt(m)
+        d = k_diag * s * s
+        e = k_off * s[:-1] * s[1:]
+
+        if subset is None:
+            eigvals, Y = eigh_tridiagonal(d, e)
+        else:
+            eigvals, Y = eigh_tridiagonal(d, e, select="i", select_range=subset)
 
+        # y orthonormal  ⇒  φ = M^-1/2 y is M-orthonormal
+        return eigvals, s[:, None] * Y
@@ -0,0 +1,102 @@
+# sim_core/modal_superposition.py
+import numpy as np
+
+from .statespace import StateSpacePropagator
+from .stepper import Stepper
+from .structures import SingleDOF, StructureModel
+
+
+def modes_for_mass_ratio(effective_mass: np.ndarray, total_mass: float,
+                         mass_threshold: float) -> int:
+    """
+    Smallest number of (ascending-frequency) modes whose cumulative effective
+    modal mass reaches `mass_threshold` of the total mass.
+    """
+    cumulative = np.cumsum(effective_mass) / total_mass
+    k = int(np.searchsorted(cumulative, mass_threshold - 1e-12)) + 1
+    return min(k, effective_mass.size)
+
+
+class ModalSuperpositionStepper(Stepper):
+    """
+    Modal time-history engine for classically damped models.
+
+    With Caughey damping the equations decouple exactly in mass-normalized
+    modal coordinates:
+        q¨ᵢ + 2ζᵢωᵢ q˙ᵢ + ωᵢ² qᵢ = φᵢᵀ f(t)
+
+    Only the first k modes are kept, k chosen so their cumulative effective
+    mass (for uniform base excitation) reaches `mass_threshold`. Each mode
+    is advanced with its own exact piecewise-linear recurrence, all k modes
+    in one vectorized update, so a step costs O(k) instead of O(n²). The
+    O(n k) map back to floor DOFs happens only when state() is called.
+    """
+
+    def __init__(self, model: StructureModel, dt: float, mass_threshold: float = 1.0):
+        if not 0.0 < mass_threshold <= 1.0:
+            raise ValueError("mass_threshold must be in (0, 1]")
+
+        self.model = model
+        self.dt = dt
+
+        basis = model.modal_basis             # M-orthonormal: φᵀ M φ = I
+        self.effective_mass = basis.effective_mass
+        self.n_modes = modes_for_mass_ratio(self.effective_mass, basis.total_mass,
+                                            mass_threshold)
+
+        k = self.n_modes
+        self.PHI = basis.modes[:, :k]
+        self.MPHI = basis.MPHI[:, :k]
+        self.omega = basis.frequencies[:k]
+        # 2ζω per mode straight from C, so any classical damping works
+        self.two_zeta_omega = basis.modal_damping(model.C, n_modes=k)
+
+        # Exact 2x2 per-mode recurrences, stored as (k,) coefficient arrays:
+        #   [q; q˙]⁺ = P [q; q˙] + g0 p + g1 p⁺
+        P = np.empty((2, 2, k))
+        g0 = np.empty((2, k))
+        g1 = np.empty((2, k))
+        for i in range(k):
+            sdof = SingleDOF.from_parameters(m=1.0, k=self.omega[i] ** 2,
+                                             c=self.two_zeta_omega[i])
+            prop = StateSpacePropagator(sdof, dt)
+            P[:, :, i] = prop.Phi
+            g0[:, i] = prop.Gamma0[:, 0]
+            g1[:, i] = prop.Gamma1[:, 0]
+        self.P, self.g0, self.g1 = P, g0, g1
+
+    def project(self, x: np.ndarray) -> np.ndarray:
+        """Modal coordinates of a physical vector: q = Φᵀ M x."""
+        return self.MPHI.T @ x
+
+    def modal_step(self, q, qd, p, p_next):
+        """Advance all kept modes one dt; p, p_next are modal loads Φᵀf."""
+        P, g0, g1 = self.P, self.g0, self.g1
+        q_next = P[0, 0] * q + P[0, 1] * qd + g0[0] * p + g1[0] * p_next
+        qd_next = P[1, 0] * q + P[1, 1] * qd + g0[1] * p + g1[1] * p_next
+        return q_next, qd_next
+
+    def start(self, x0, v0, forces, a0=None) -> None:
+        # a0 is implied by the modal state and load, see state()
+        self.q = self.project(np.asarray(x0, dtype=float))
+        self.qd = self.project(np.asarray(v0, dtype=float))
+        self.load(forces)
+
+    def load(self, forces) -> None:
+        self._k = 0
+        # Modal load history for the whole schedule in one product: (n_steps+1, k)
+        self.p = np.outer(forces.history, self.PHI.T @ forces.pattern)
+
+    def advance(self, k: int) -> None:
+        self.q, self.qd = self.modal_step(self.q, self.qd, self.p[k], self.p[k + 1])
+        self._k = k + 1
+
+    def state(self):
+        qdd = self.p[self._k] - self.two_zeta_omega * self.qd - self.omega ** 2 * self.q
+        return self.PHI @ self.q, self.PHI @ self.qd, self.PHI @ qdd
+
+    def step(self, u, v, a, f, f_next):
+        q_next, qd_next = self.modal_step(self.project(u), self.project(v),
+                                          self.PHI.T @ f, self.PHI.T @ f_next)
+        qdd = self.PHI.T @ f_next - self.two_zeta_omega * qd_next - self.omega ** 2 * q_next
+        return self.PHI @ q_next, self.PHI @ qd_next, self.PHI @ qdd
@@ -0,0 +1,325 @@
+# sim_core/records.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from .earthquakes import G, get_el_centro_record
+
+RECORD_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+@dataclass
+class GroundMotionRecord:
+    """
+    One accelerogram, acceleration in g.
+
+    Fixed-step records (every standard format) keep only `accel_g` and `dt`;
+    t is implicit, t[k] = k dt. Irregular records (e.g. the built-in peak
+    approximation of El Centro) also carry their time samples in `t`.
+    """
+    name: str
+    accel_g: np.ndarray             # (npts,), may be a read-only memmap
+    dt: float | None = None         # sample step [s] when uniform
+    t: np.ndarray | None = None     # (npts,) sample times when not uniform
+    fingerprint: str = ""           # content hash; changes when the data does
+
+    @property
+    def npts(self) -> int:
+        return self.accel_g.shape[0]
+
+    @property
+    def duration(self) -> float:
+        return float(self.t[-1]) if self.t is not None else self.dt * (self.npts - 1)
+
+    def times(self) -> np.ndarray:
+        return self.t if self.t is not None else self.dt * np.arange(self.npts)
+
+
+# ---------------------------------------------------------------------------
+# Text formats
+# ---------------------------------------------------------------------------
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eEdD][-+]?\d+)?")
+_PEER_HEADER = re.compile(r"NPTS\s*=\s*(\d+)\s*,?\s*DT\s*=\s*([-+.\dEe]+)", re.IGNORECASE)
+
+
+def _numbers(text: str) -> np.ndarray:
+    return np.array([float(s.replace("D", "E").replace("d", "e"))
+                     for s in _NUMBER.findall(text)], dtype=float)
+
+
+def parse_record_text(text: str, fmt: str = "auto", dt: float | None = None):
+    """
+    Parse an accelerogram in a standard text format. Returns (accel_g, dt, t):
+    dt for fixed-step records (t None), else t.
+
+        "peer"     PEER NGA .AT2: 3 header lines, then "NPTS= n, DT= dt ...",
+                   then n values in g, any number per line
+        "columns"  two columns "time accel_g" per line (optional # comments)
+        "single"   one or more values per line, in g; needs `dt`
+        "auto"     "peer" if a NPTS/DT header is found, "columns" if every
+                   data line has two numbers, else "single"
+    """
+    lines = [ln for ln in text.splitlines() if ln.strip() and not ln.lstrip().startswith("#")]
+    if fmt == "auto":
+        if any(_PEER_HEADER.search(ln) for ln in lines[:10]):
+            fmt = "peer"
+        elif lines and all(len(_NUMBER.findall(ln)) == 2 for ln in lines):
+            fmt = "columns"
+        else:
+            fmt = "single"
+
+    if fmt == "peer":
+        for i, ln in enumerate(lines[:10]):
+            m = _PEER_HEADER.search(ln)
+            if m:
+                npts, step = int(m.group(1)), float(m.group(2))
+                values = _numbers("\n".join(lines[i + 1:]))
+                if values.size < npts:
+                    raise ValueError(f"PEER record declares {npts} points, found {values.size}")
+                return values[:npts], step, None
+        raise ValueError("No 'NPTS=..., DT=...' header found")
+
+    if fmt == "columns":
+        data = _numbers("\n".join(lines)).reshape(-1, 2)
+        t, acc = data[:, 0], data[:, 1]
+        if t.size < 2 or np.any(np.diff(t) <= 0):
+            raise ValueError("Time column must be strictly increasing")
+        steps = np.diff(t)
+        if t[0] == 0.0 and np.allclose(steps, steps[0], rtol=1e-6, atol=0.0):
+            return acc, float(steps[0]), None
+        return acc, None, t
+
+    if fmt == "single":
+        if dt is None or dt <= 0:
+            raise ValueError("Single-column records need dt > 0")
+        return _numbers("\n".join(lines)), float(dt), None
+
+    raise ValueError(f"Unknown record format '{fmt}'")
+
+
+# ---------------------------------------------------------------------------
+# Library
+# ---------------------------------------------------------------------------
+
+class RecordLibrary:
+    """
+    Named ground-motion records.
+
+    With a `root` directory, imported records are stored once as binary
+    .npy files (float32 accelerations) plus an index.json of metadata, and
+    memory-mapped on first use, so a process only pages in what it reads.
+    Without one, imports are kept in memory. "el_centro" is always present.
+
+    Records resampled to a simulation's dt are cached (`max_resampled`
+    entries, LRU), so a run on a uniform grid reads its ground motion by
+    direct indexing instead of interpolating every step.
+    """
+
+    BUILTIN = "el_centro"
+
+    def __init__(self, root: str | None = None, max_resampled: int = 32):
+        self.root = root
+        self.max_resampled = max_resampled
+        self._records: dict[str, GroundMotionRecord] = {}
+        self._resampled: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+
+        t, a = get_el_centro_record()
+        self._records[self.BUILTIN] = GroundMotionRecord(
+            name=self.BUILTIN, accel_g=a, t=t, fingerprint=_fingerprint(a, None, t))
+
+        if root:
+            os.makedirs(root, exist_ok=True)
+            self._reload_index()
+
+    # -- catalogue ---------------------------------------------------------------
+
+    def names(self) -> list[str]:
+        if self.root:
+            self._reload_index()
+        return sorted(set(self._records) | set(self._index))
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.get(name)
+        except KeyError:
+            return False
+        return True
+
+    def info(self, name: str) -> dict:
+        rec = self.get(name)
+        return {"name": name, "npts": rec.npts, "dt": rec.dt, "duration": rec.duration,
+                "pga_g": float(np.max(np.abs(rec.accel_g))) if rec.npts else 0.0,
+                "fingerprint": rec.fingerprint}
+
+    def get(self, name: str) -> GroundMotionRecord:
+        rec = self._records.get(name)
+        if rec is not None:
+            return rec
+        meta = self._index.get(name)
+        if meta is None and self.root:
+            self._reload_index()        # imported by another process since we started
+            meta = self._index.get(name)
+        if meta is None:
+            raise KeyError(f"Unknown record '{name}'")
+        with self._lock:
+            rec = self._records.get(name)
+            if rec is None:
+                base = os.path.join(self.root, name)
+                t = np.load(base + ".t.npy", mmap_mode="r") if meta.get("dt") is None else None
+                rec = GroundMotionRecord(name=name, accel_g=np.load(base + ".npy", mmap_mode="r"),
+                                         dt=meta.get("dt"), t=t, fingerprint=meta["fingerprint"])
+                self._records[name] = rec
+        return rec
+
+    # -- import ----------------------------------------------------------------
+
+    def add(self, name: str, accel_g: np.ndarray, dt: float | None = None,
+            t: np.ndarray | None = None, source: str = "") -> GroundMotionRecord:
+        """Store a record under `name` (replacing any record of that name)."""
+        if not RECORD_NAME.match(name):
+            raise ValueError("Record names may use letters, digits, '_', '-', '.' (max 64)")
+        if name == self.BUILTIN:
+            raise ValueError(f"'{self.BUILTIN}' is built in and cannot be replaced")
+        accel_g = np.asarray(accel_g, dtype=np.float32)
+        if accel_g.ndim != 1 or accel_g.size < 2 or not np.all(np.isfinite(accel_g)):
+            raise ValueError("A record needs at least 2 finite acceleration samples")
+        if (dt is None) == (t is None):
+            raise ValueError("Give exactly one of dt (uniform) or t (sample times)")
+        if t is not None:
+            t = np.asarray(t, dtype=float)
+            if t.shape != accel_g.shape or np.any(np.diff(t) <= 0):
+                raise ValueError("t must be strictly increasing, one time per sample")
+        elif not dt > 0:
+            raise ValueError("dt must be > 0")
+
+        fp = _fingerprint(accel_g, dt, t)
+        with self._lock:
+            if self.root:
+                base = os.path.join(self.root, name)
+                np.save(base + ".npy", accel_g)
+                if t is not None:
+                    np.save(base + ".t.npy", t)
+                self._index[name] = {"dt": dt, "npts": int(accel_g.size),
+                                     "fingerprint": fp, "source": source}
+                self._write_index()
+                self._records.pop(name, None)       # remap on next get()
+            else:
+                self._records[name] = GroundMotionRecord(name=name, accel_g=accel_g, dt=dt,
+                                                         t=t, fingerprint=fp)
+            for key in [k for k in self._resampled if k[0] == name]:
+                del self._resampled[key]
+        return self.get(name)
+
+    def import_text(self, name: str, text: str, fmt: str = "auto",
+                    dt: float | None = None, source: str = "") -> GroundMotionRecord:
+        accel_g, step, t = parse_record_text(text, fmt=fmt, dt=dt)
+        return self.add(name, accel_g, dt=step, t=t, source=source)
+
+    def import_file(self, path: str, name: str | None = None, fmt: str = "auto",
+                    dt: float | None = None) -> GroundMotionRecord:
+        if name is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return self.import_text(name, f.read(), fmt=fmt, dt=dt, source=os.path.basename(path))
+
+    def _reload_index(self) -> None:
+        path = os.path.join(self.root, "index.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                index = json.load(f)
+            with self._lock:
+                for name, meta in index.items():
+                    old = self._index.get(name)
+                    if old is not None and old["fingerprint"] != meta["fingerprint"]:
+                        self._records.pop(name, None)       # replaced on disk
+                self._index = index
+
+    def _write_index(self) -> None:
+        tmp = os.path.join(self.root, "index.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.root, "index.json"))
+
+    # -- sampling ----------------------------------------------------------------
+
+    def resampled(self, name: str, dt: float) -> np.ndarray:
+        """
+        Acceleration [g] on the grid k·dt, k = 0 .. duration/dt (float64,
+        read-only, cached). A record already sampled at dt is returned as is.
+        """
+        rec = self.get(name)
+        key = (name, rec.fingerprint, float(dt))
+        with self._lock:
+            series = self._resampled.get(key)
+            if series is not None:
+                self._resampled.move_to_end(key)
+                return series
+        if rec.dt is not None and np.isclose(rec.dt, dt, rtol=1e-9, atol=0.0):
+            series = np.asarray(rec.accel_g, dtype=float)
+        else:
+            grid = dt * np.arange(int(np.floor(rec.duration / dt + 1e-9)) + 1)
+            series = np.interp(grid, rec.times(), rec.accel_g, left=0.0, right=0.0)
+        series.setflags(write=False)
+        with self._lock:
+            self._resampled[key] = series
+            while len(self._resampled) > self.max_resampled:
+                self._resampled.popitem(last=False)
+        return series
+
+    def ground_acceleration(self, name: str, t: np.ndarray,
+                            scaling_factor: float = 1.0) -> np.ndarray:
+        """
+        ag(t) [m/s^2] on a time grid; zero before 0 and after the record.
+        A uniform grid aligned with its own dt is served from the resample
+        cache by direct indexing; any other grid falls back to np.interp.
+        """
+        t = np.asarray(t, dtype=float)
+        if t.size >= 2:
+            dt = float(t[1] - t[0])
+            k0 = t[0] / dt
+            uniform = dt > 0 and abs(k0 - round(k0)) < 1e-6 and \
+                np.allclose(np.diff(t), dt, rtol=1e-9, atol=1e-12)
+            if uniform:
+                series = self.resampled(name, dt)
+                idx = int(round(k0)) + np.arange(t.size)
+                ok = (idx >= 0) & (idx < series.size)
+                ag_g = np.zeros(t.size)
+                ag_g[ok] = series[idx[ok]]
+                return ag_g * G * scaling_factor
+        rec = self.get(name)
+        ag_g = np.interp(t, rec.times(), rec.accel_g, left=0.0, right=0.0)
+        return ag_g * G * scaling_factor
+
+
+def _fingerprint(accel_g, dt, t) -> str:
+    h = hashlib.sha256(np.ascontiguousarray(accel_g, dtype=np.float32).tobytes())
+    h.update(repr(dt).encode())
+    if t is not None:
+        h.update(np.ascontiguousarray(t, dtype=float).tobytes())
+    return h.hexdigest()[:16]
+
+
+_default_library: RecordLibrary | None = None
+
+
+def default_library() -> RecordLibrary:
+    """Process-wide library (in-memory until set_default_library is called)."""
+    global _default_library
+    if _default_library is None:
+        _default_library = RecordLibrary()
+    return _default_library
+
+
+def set_default_library(library: RecordLibrary) -> None:
+    global _default_library
+    _default_library = library
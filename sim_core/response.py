@@ -1,9 +1,12 @@
 # sim_core/response.py
-from dataclasses import dataclass
+from __future__ import annotations
+from dataclasses import dataclass, field
 import numpy as np
 from scipy.integrate import solve_ivp
 
+from .linsolve import LinearSolver
 from .structures import StructureModel
+from .statespace import StateSpacePropagator
 
 
 @dataclass
@@ -12,6 +15,7 @@ class TimeHistoryResult:
     x: np.ndarray
     v: np.ndarray
     a: np.ndarray
+    diagnostics: dict | None = field(default=None, repr=False)   # opt-in residual check
 
     def as_dict(self) -> dict:
         return {
@@ -23,6 +27,10 @@ class TimeHistoryResult:
 
 
 class TimeIntegrator:
+    # solve_ivp methods; the implicit ones get the analytic (constant) Jacobian
+    ODE_METHODS = ("RK45", "RK23", "DOP853", "Radau", "BDF", "LSODA")
+    IMPLICIT_METHODS = ("Radau", "BDF", "LSODA")
+
     def __init__(self, model: StructureModel, f_func):
         """
         f_func(t) -> vector of size DOFs (כוחות חיצוניים בזמן).
@@ -30,55 +38,92 @@ class TimeIntegrator:
         self.model = model
         self.f_func = f_func
 
+        # M is fixed: factorize once, precompute M⁻¹K and M⁻¹C, and the
+        # first-order system matrix A (y' = A y + [0; M⁻¹ f]) — also the
+        # exact Jacobian of the right-hand side.
+        n = model.dofs
+        self.M_solver = LinearSolver(model.M)
+        self.M_inv_K = self.M_solver.solve(model.K)
+        self.M_inv_C = self.M_solver.solve(model.C)
+        self.A = np.zeros((2 * n, 2 * n))
+        self.A[:n, n:] = np.eye(n)
+        self.A[n:, :n] = -self.M_inv_K
+        self.A[n:, n:] = -self.M_inv_C
+
+    def accelerations(self, x: np.ndarray, v: np.ndarray, F: np.ndarray) -> np.ndarray:
+        """a = M⁻¹ (f - C v - K x) for every column of x, v, F (n, n_samples) at once."""
+        return self.M_solver.solve(F) - self.M_inv_C @ v - self.M_inv_K @ x
+
     def run(self,
             x0: np.ndarray,
             v0: np.ndarray,
             t_span: tuple[float, float],
-            dt: float) -> TimeHistoryResult:
+            dt: float,
+            method: str = "RK45",
+            rtol: float = 1e-3,
+            atol: float = 1e-6,
+            residual_samples: int = 0) -> TimeHistoryResult:
+        """
+        method: "exact" for the discrete state-space propagator (exact for
+        loads that are piecewise-linear between output samples), otherwise
+        one of ODE_METHODS; implicit (stiff) methods use the analytic
+        Jacobian. rtol / atol go to solve_ivp.
 
-        M, C, K = self.model.M, self.model.C, self.model.K
+        residual_samples: if > 0, check ‖M a + C v + K x - f‖ at that many
+        evenly spaced output times and return it in result.diagnostics.
+        """
         n = self.model.dofs
 
-        def ode(t, y):
-            x = y[:n]
-            v = y[n:]
-            f = self.f_func(t)
-            rhs = f - C @ v - K @ x
-            a = np.linalg.solve(M, rhs)
-            return np.concatenate([v, a])
-
-        y0 = np.concatenate([x0, v0])
-
         t0, tf = t_span
         n_steps = int(np.floor((tf - t0) / dt))
         t_eval = t0 + dt * np.arange(n_steps + 1)
 
-        sol = solve_ivp(ode, (t0, tf), y0, t_eval=t_eval, method="RK45")
-
-        if not sol.success:
-            raise RuntimeError(f"ODE solver failed: {sol.message}")
+        if method == "exact":
+            F = np.array([self.f_func(tt) for tt in t_eval], dtype=float)
+            x, v, a = StateSpacePropagator(self.model, dt).propagate(x0, v0, F)
+            return TimeHistoryResult(t=t_eval, x=x, v=v, a=a,
+                                     diagnostics=self._residuals(t_eval, x, v, a, F.T,
+                                                                 residual_samples))
+        if method not in self.ODE_METHODS:
+            raise ValueError(f"Unknown method '{method}'; expected 'exact' or one of "
+                             f"{self.ODE_METHODS}")
 
-        # התוצאות מ-solve_ivp
-        Y = sol.y.T
-        x = Y[:, :n].T
-        v = Y[:, n:].T
+        A, solve_M = self.A, self.M_solver.solve
 
-        # -----------------------------
-        # 🔍 הוספת בדיקת RESIDUAL כאן
-        # -----------------------------
-        a = np.zeros_like(x)
-        residual_norms = []
-
-        for i, tt in enumerate(sol.t):
-            f = self.f_func(tt)
-            rhs = f - C @ v[:, i] - K @ x[:, i]
-            a[:, i] = np.linalg.solve(M, rhs)
+        def ode(t, y):
+            dy = A @ y
+            dy[n:] += solve_M(np.asarray(self.f_func(t), dtype=float))
+            return dy
 
-            # בדיקת השארית:  M a + C v + K x - f
-            r = M @ a[:, i] + C @ v[:, i] + K @ x[:, i] - f
-            residual_norms.append(np.linalg.norm(r))
+        y0 = np.concatenate([x0, v0])
+        options = {"jac": A} if method in self.IMPLICIT_METHODS else {}
 
-        # -----------------------------
+        sol = solve_ivp(ode, (t0, tf), y0, t_eval=t_eval, method=method,
+                        rtol=rtol, atol=atol, **options)
 
-        return TimeHistoryResult(t=sol.t, x=x, v=v, a=a)
+        if not sol.success:
+            raise RuntimeError(f"ODE solver failed: {sol.message}")
 
+        # התוצאות מ-solve_ivp
+        x = sol.y[:n]
+        v = sol.y[n:]
+
+        # Accelerations for all output times in one solve against the factorized M
+        F = np.array([self.f_func(tt) for tt in sol.t], dtype=float).reshape(sol.t.size, n).T
+        a = self.accelerations(x, v, F)
+
+        return TimeHistoryResult(t=sol.t, x=x, v=v, a=a,
+                                 diagnostics=self._residuals(sol.t, x, v, a, F,
+                                                             residual_samples))
+
+    def _residuals(self, t, x, v, a, F, samples: int) -> dict | None:
+        """Opt-in equilibrium check M a + C v + K x - f at sampled output times."""
+        if samples <= 0:
+            return None
+        idx = np.unique(np.linspace(0, t.size - 1, min(samples, t.size)).astype(int))
+        M, C, K = self.model.M, self.model.C, self.model.K
+        r = M @ a[:, idx] + C @ v[:, idx] + K @ x[:, idx] - F[:, idx]
+        norms = np.linalg.norm(r, axis=0)
+        scale = np.linalg.norm(F[:, idx], axis=0) + np.linalg.norm(K @ x[:, idx], axis=0)
+        return {"t": t[idx], "residual_norms": norms,
+                "max_relative_residual": float(np.max(norms / np.where(scale > 0, scale, 1.0)))}
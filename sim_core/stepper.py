@@ -0,0 +1,43 @@
+# sim_core/stepper.py
+from __future__ import annotations
+import numpy as np
+
+
+class Stepper:
+    """
+    Stateful driver shared by the time-step engines.
+
+    Subclasses implement the pure update step(u, v, a, f, f_next); this
+    base class keeps the running state and feeds it from a ForceSchedule,
+    so the simulation loop is engine-agnostic:
+
+        stepper.start(x0, v0, forces)
+        for k in range(n_steps):
+            stepper.advance(k)          # t[k] -> t[k+1]
+            x, v, a = stepper.state()
+    """
+
+    def start(self, x0: np.ndarray, v0: np.ndarray, forces, a0: np.ndarray | None = None) -> None:
+        """a0: acceleration when restarting mid-run (default zeros, the streamed Newmark start)."""
+        self.forces = forces
+        self.u = np.asarray(x0, dtype=float)
+        self.v = np.asarray(v0, dtype=float)
+        self.a = np.zeros_like(self.u) if a0 is None else np.asarray(a0, dtype=float)
+
+    def load(self, forces) -> None:
+        """
+        Replace the load schedule, keeping the current state; advance(k) then
+        indexes the new schedule. For excitation that arrives piecewise.
+        """
+        self.forces = forces
+
+    def advance(self, k: int) -> None:
+        self.u, self.v, self.a = self.step(
+            self.u, self.v, self.a, self.forces[k], self.forces[k + 1]
+        )
+
+    def state(self):
+        return self.u, self.v, self.a
+
+    def step(self, u, v, a, f, f_next):
+        raise NotImplementedError
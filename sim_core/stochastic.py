@@ -0,0 +1,193 @@
+# sim_core/stochastic.py
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+
+from .batch import _stack_tridiagonal
+from .matrices import shear_stiffness_bands, story_stiffness
+from .structures import ShearBuilding
+
+
+@dataclass
+class PropertyDistribution:
+    """
+    Random multiplicative factor on a nominal property (mean 1):
+
+        "fixed"      – always 1
+        "normal"     – N(1, cov²), redrawn where not positive
+        "lognormal"  – mean 1, coefficient of variation `cov`
+        "uniform"    – U(low, high)
+
+    scope: one factor per "element" (column / floor), per "story" (shared
+    by a story's columns) or per realization ("global").
+    """
+    dist: str = "fixed"
+    cov: float = 0.0
+    low: float = 1.0
+    high: float = 1.0
+    scope: str = "element"
+
+    DISTS = ("fixed", "normal", "lognormal", "uniform")
+    SCOPES = ("element", "story", "global")
+
+    def __post_init__(self):
+        if self.dist not in self.DISTS:
+            raise ValueError(f"Unknown distribution '{self.dist}'; expected one of {self.DISTS}")
+        if self.scope not in self.SCOPES:
+            raise ValueError(f"Unknown scope '{self.scope}'; expected one of {self.SCOPES}")
+        if self.cov < 0 or not 0 < self.low <= self.high:
+            raise ValueError("cov must be >= 0 and 0 < low <= high")
+
+    def factors(self, rng: np.random.Generator, S: int, shape: tuple) -> np.ndarray:
+        """(S,) + shape factors, broadcastable per scope (story: columns share one)."""
+        if self.scope == "global":
+            draw = (S,) + (1,) * len(shape)
+        elif self.scope == "story":
+            draw = (S, shape[0]) + (1,) * (len(shape) - 1)
+        else:
+            draw = (S,) + tuple(shape)
+        if self.dist == "fixed":
+            return np.ones(draw)
+        if self.dist == "uniform":
+            return rng.uniform(self.low, self.high, size=draw)
+        if self.dist == "lognormal":
+            sigma2 = np.log1p(self.cov ** 2)
+            return rng.lognormal(-0.5 * sigma2, np.sqrt(sigma2), size=draw)
+        f = rng.normal(1.0, self.cov, size=draw)
+        bad = f <= 0
+        while np.any(bad):                  # truncate at 0 by redrawing
+            f[bad] = rng.normal(1.0, self.cov, size=int(bad.sum()))
+            bad = f <= 0
+        return f
+
+
+class StochasticShearBuilding:
+    """
+    A nominal ShearBuilding with random Ec, Ic, Hc and floor masses.
+
+    sample(S, rng) draws S realizations at once: the factors are (S, ...)
+    arrays and the story stiffnesses come from one vectorized
+    story_stiffness call over the (S, dofs, columns) stacks, so there is
+    no per-realization Python work. batched_modes() then solves all of
+    their eigenproblems in one stacked LAPACK call.
+    """
+
+    PROPERTIES = ("Ec", "Ic", "Hc", "floor_mass")
+
+    def __init__(self, model: ShearBuilding, distributions: dict | None = None):
+        if model.Hc is None or model.floor_masses is None:
+            raise ValueError("A stochastic model needs a ShearBuilding built from floor data")
+        self.model = model
+        self.distributions = {}
+        for name, spec in (distributions or {}).items():
+            if name not in self.PROPERTIES:
+                raise ValueError(f"Unknown property '{name}'; expected one of {self.PROPERTIES}")
+            self.distributions[name] = spec if isinstance(spec, PropertyDistribution) \
+                else PropertyDistribution(**spec)
+
+    def _sampled(self, name: str, nominal: np.ndarray, rng, S: int) -> np.ndarray:
+        dist = self.distributions.get(name)
+        if dist is None or dist.dist == "fixed":
+            return np.broadcast_to(nominal, (S,) + nominal.shape)
+        return nominal * dist.factors(rng, S, nominal.shape)
+
+    def sample(self, S: int, rng: np.random.Generator):
+        """(floor_masses, story_stiffness), each (S, dofs)."""
+        m = self.model
+        Ec = self._sampled("Ec", m.Ec, rng, S)
+        Ic = self._sampled("Ic", m.Ic, rng, S)
+        Hc = self._sampled("Hc", m.Hc, rng, S)
+        masses = self._sampled("floor_mass", m.floor_masses, rng, S)
+        return np.array(masses, dtype=float), story_stiffness(m.dofs, Hc, Ec, Ic,
+                                                              base=m.base_condition)
+
+
+def batched_modes(floor_masses: np.ndarray, story_stiffness: np.ndarray,
+                  vectors: bool = False):
+    """
+    Frequencies (S, n), ascending, of S shear buildings — and with
+    `vectors`, their M-orthonormal modes (S, n, n) — from one stacked
+    symmetric eigen-solve of M^-1/2 K M^-1/2 (see ModalAnalyzer).
+    """
+    s = 1.0 / np.sqrt(floor_masses)
+    diag, off = shear_stiffness_bands(story_stiffness)
+    A = _stack_tridiagonal(diag * s * s, off * s[:, :-1] * s[:, 1:])
+    if not vectors:
+        return np.sqrt(np.clip(np.linalg.eigvalsh(A), 0.0, None))
+    lam, Y = np.linalg.eigh(A)
+    return np.sqrt(np.clip(lam, 0.0, None)), s[:, :, None] * Y
+
+
+def caughey_stack(floor_masses: np.ndarray, omega: np.ndarray, PHI: np.ndarray,
+                  zeta) -> np.ndarray:
+    """
+    Caughey damping for a stack, as ModalBasis.damping_matrix: ratio zeta[i]
+    in mode i (last value fills the rest), C = M Φ diag(2ζω) Φᵀ M.
+    """
+    n = omega.shape[1]
+    z = np.atleast_1d(np.asarray(zeta, dtype=float)).ravel()
+    if z.size < n:
+        z = np.append(z, np.full(n - z.size, z[-1]))
+    MPHI = floor_masses[:, :, None] * PHI
+    return (MPHI * (2.0 * z[:n] * omega)[:, None, :]) @ np.swapaxes(MPHI, 1, 2)
+
+
+class RunningStatistics:
+    """
+    Sample statistics of named (S, n) quantities, updated batch by batch.
+
+    Every sample is kept (S x n floats per quantity), so quantiles are
+    exact. converged() compares the estimates with those at the previous
+    check: the run has stabilized when, for every quantity and DOF, the
+    standard error of the mean and the change of the mean, std and
+    quantiles since the last check are all within `rel_tol` of the scale
+    of the quantity.
+    """
+
+    def __init__(self, quantiles=(0.05, 0.5, 0.95)):
+        self.quantiles = tuple(float(q) for q in quantiles)
+        self._data: dict[str, list] = {}
+        self.count = 0
+        self._previous: dict | None = None
+        self.rel_error = float("inf")
+
+    def update(self, batch: dict) -> None:
+        sizes = {len(v) for v in batch.values()}
+        if len(sizes) != 1:
+            raise ValueError("Every quantity in a batch needs the same number of samples")
+        for name, values in batch.items():
+            self._data.setdefault(name, []).append(np.asarray(values, dtype=float))
+        self.count += sizes.pop()
+
+    def _estimates(self) -> dict:
+        out = {}
+        for name, chunks in self._data.items():
+            X = np.concatenate(chunks)
+            out[name] = {
+                "mean": X.mean(axis=0),
+                "std": X.std(axis=0, ddof=1) if len(X) > 1 else np.zeros(X.shape[1]),
+                "quantiles": np.quantile(X, self.quantiles, axis=0),
+            }
+        return out
+
+    def summary(self) -> dict:
+        est = self._estimates()
+        return {name: {"mean": e["mean"].tolist(), "std": e["std"].tolist(),
+                       "quantiles": {f"{q:g}": row.tolist()
+                                     for q, row in zip(self.quantiles, e["quantiles"])}}
+                for name, e in est.items()}
+
+    def converged(self, rel_tol: float, min_samples: int = 100) -> bool:
+        """Check (and remember) the estimates; True once they have stabilized."""
+        est = self._estimates()
+        errors = []
+        for name, e in est.items():
+            scale = np.maximum(np.abs(e["mean"]), np.finfo(float).tiny)
+            errors.append(e["std"] / np.sqrt(max(self.count, 1)) / scale)
+            if self._previous is not None:
+                prev = self._previous[name]
+                for key in ("mean", "std", "quantiles"):
+                    errors.append(np.abs(e[key] - prev[key]) / scale)
+        self._previous = est
+        self.rel_error = float(max(np.max(err) for err in errors)) if errors else float("inf")
+        return self.count >= min_samples and len(errors) > len(est) and self.rel_error <= rel_tol
@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 import numpy as np
 
-from .matrices import mass_matrix_lumped, stiffness_shear_structure
+from .matrices import story_stiffness, shear_stiffness_bands
 
 
 @dataclass
@@ -18,6 +18,14 @@ class StructureModel:
 
     dofs: int = field(init=False)
 
+    # Assigning any of these invalidates the cached modal basis
+    _MODAL_INPUTS = frozenset({"M", "K", "floor_masses", "story_stiffness"})
+
+    def __setattr__(self, name, value):
+        if name in self._MODAL_INPUTS:
+            self.__dict__.pop("_modal_basis", None)
+        super().__setattr__(name, value)
+
     def __post_init__(self):
         if self.M.shape != self.K.shape:
             raise ValueError("M and K must have the same shape")
@@ -33,13 +41,75 @@ class StructureModel:
             "C": self.C.tolist(),
         }
 
+    @property
+    def modal_basis(self):
+        """
+        ModalBasis of (M, K), solved on first access and cached until M or K
+        is reassigned. In-place edits of the arrays are not tracked.
+        """
+        basis = self.__dict__.get("_modal_basis")
+        if basis is None:
+            from .modal import ModalBasis       # modal imports structures
+            basis = ModalBasis.from_model(self)
+            self.__dict__["_modal_basis"] = basis
+        return basis
+
+    def tridiagonal_form(self):
+        """
+        (m, k_diag, k_off) when M is diagonal and K tridiagonal, else None.
+        Lets modal analysis take the tridiagonal eigensolver.
+        """
+        M, K = self.M, self.K
+        if np.count_nonzero(M - np.diag(np.diagonal(M))) != 0:
+            return None
+        if np.count_nonzero(np.triu(K, 2)) != 0 or np.count_nonzero(np.tril(K, -2)) != 0:
+            return None
+        return np.diagonal(M).copy(), np.diagonal(K).copy(), np.diagonal(K, 1).copy()
+
+
+class _DenseOnDemand:
+    """
+    Field descriptor for ShearBuilding.M / K / C: the dense (dofs, dofs) matrix
+    is assembled from the compact banded data on first access and cached.
+    Assigning an explicit matrix replaces it (and, for M or K, drops the
+    banded data it no longer matches).
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.attr = "_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return None            # dataclass default: build from banded data
+        value = obj.__dict__.get(self.attr)
+        if value is None:
+            value = obj._assemble_dense(self.name)
+            obj.__dict__[self.attr] = value
+        return value
+
+    def __set__(self, obj, value):
+        if value is not None and self.name in ("M", "K"):
+            obj.__dict__["_banded_valid"] = False
+        obj.__dict__[self.attr] = value
+
 
 @dataclass
 class ShearBuilding(StructureModel):
     """
     מבנה גזירה רב־קומתי (shear building).
     נבנה מתוך פרמטרים גיאומטריים וחומריים.
+
+    Stored compactly: a diagonal mass vector and a story-stiffness vector.
+    Dense M / K / C are only built when something asks for them; banded
+    consumers (modal analysis, BatchSimulator.from_story_data) use
+    tridiagonal_form() / the story data instead. Time stepping with Caughey
+    damping works on dense matrices: C, and so Newmark's K_hat, is full.
     """
+    M: np.ndarray = _DenseOnDemand()
+    K: np.ndarray = _DenseOnDemand()
+    C: np.ndarray | None = _DenseOnDemand()
+
     Hc: np.ndarray = field(repr=False, default=None)   # גובה עמודים
     Ec: np.ndarray = field(repr=False, default=None)   # מודול אלסטיות
     Ic: np.ndarray = field(repr=False, default=None)   # מומנט אינרציה
@@ -47,6 +117,38 @@ class ShearBuilding(StructureModel):
     depth: float = 0.0
     floor_load: float = 0.0
     base_condition: int = 1  # 1=קבוע, 0=פשוט נתמך
+    floor_masses: np.ndarray = field(repr=False, default=None)     # (dofs,) [kg]
+    story_stiffness: np.ndarray = field(repr=False, default=None)  # (dofs,) [N/m]
+
+    def __post_init__(self):
+        if self.floor_masses is None or self.story_stiffness is None:
+            # Built from explicit dense matrices — behave like StructureModel
+            super().__post_init__()
+            self.__dict__["_banded_valid"] = False
+            return
+        self.dofs = self.floor_masses.shape[0]
+        if self.story_stiffness.shape != (self.dofs,):
+            raise ValueError("floor_masses and story_stiffness must have the same length")
+        self.__dict__.setdefault("_banded_valid", True)
+
+    def _assemble_dense(self, name: str) -> np.ndarray:
+        if name == "M":
+            return np.diag(self.floor_masses)
+        if name == "K":
+            diag, off = shear_stiffness_bands(self.story_stiffness)
+            return np.diag(diag) + np.diag(off, 1) + np.diag(off, -1)
+        return np.zeros((self.dofs, self.dofs))   # C: undamped until set
+
+    @property
+    def is_banded(self) -> bool:
+        """True while M / K still come from the compact story data."""
+        return self.__dict__.get("_banded_valid", False)
+
+    def tridiagonal_form(self):
+        if not self.is_banded:
+            return super().tridiagonal_form()
+        diag, off = shear_stiffness_bands(self.story_stiffness)
+        return self.floor_masses, diag, off
 
     @classmethod
     def from_floor_data(cls,
@@ -65,25 +167,24 @@ class ShearBuilding(StructureModel):
             raise ValueError("All input arrays must have shape (dofs, 2)")
 
         # ---- MASS (Direct Assignment) ----
-        # המרה למערך אם הגיע סקלר
+        # המרה למערך אם הגיע סקלר; נשמר כווקטור האלכסון של M
         if np.isscalar(floor_mass):
             floor_mass = np.full(dofs, floor_mass)
-
-        # יצירת מטריצת מסה אלכסונית ישירות מהמסה שהתקבלה
-        M = np.diag(floor_mass)
+        floor_masses = np.asarray(floor_mass, dtype=float)
 
         # ---- STIFFNESS (K) ----
-        K = stiffness_shear_structure(dofs, Hc, Ec, Ic, base=base_condition)
+        # נשמר כווקטור קשיחות הקומות; K התלת־אלכסונית נבנית רק לפי דרישה
+        Kstory = story_stiffness(dofs, Hc, Ec, Ic, base=base_condition)
 
         # ---- DAMPING (C) ----
-        # מטריצת C ראשונית (תעודכן בסימולציה לפי ריילי)
-        C = np.zeros_like(K)
+        # C = 0 עד שהסימולציה מגדירה אותה (Caughey)
 
-        return cls(M=M, K=K, C=C,
-                   Hc=Hc, Ec=Ec, Ic=Ic,
+        return cls(Hc=Hc, Ec=Ec, Ic=Ic,
                    Lb=Lb, depth=depth,
                    floor_load=0.0,  # לא רלוונטי יותר לאחסון
-                   base_condition=base_condition)
+                   base_condition=base_condition,
+                   floor_masses=floor_masses,
+                   story_stiffness=Kstory)
 
 @dataclass
 class SingleDOF(StructureModel):
@@ -764,3 +764,1343 @@ def test_simulation_max_steps_guard():
     assert len(data_frames) == 0, (
         f"Found {len(data_frames)} DATA frame(s); Newmark loop should not have started"
     )
+
+
+# ---------------------------------------------------------------------------
+# Force schedule (precomputed excitation)
+# ---------------------------------------------------------------------------
+
+def test_force_schedule_matches_per_step_evaluation():
+    """
+    build_force_schedule must reproduce, row for row, the force the step loop
+    used to evaluate one call at a time: get_earthquake_force for ground motion,
+    and a (possibly truncated) sine on the top floor for pulse/continuous.
+    """
+    from sim_core.forcing import build_force_schedule
+
+    M = np.diag([10_000.0, 20_000.0, 30_000.0])
+    t = 0.01 * np.arange(3_500) - 0.5    # spans before, during and after the record
+
+    eq = build_force_schedule({"type": "earthquake", "amp": 1.5}, t, M)
+    F = eq.as_matrix()
+    assert F.shape == (t.size, 3)
+    for k in range(0, t.size, 37):
+        assert np.allclose(F[k], get_earthquake_force(t[k], M, scaling_factor=1.5))
+        assert np.allclose(eq[k], F[k])
+
+    cfg = {"type": "pulse", "amp": 500.0, "freq": 3.0, "duration": 2.0}
+    pulse = build_force_schedule(cfg, t, M).as_matrix()
+    expected_top = np.where(t <= 2.0, 500.0 * np.sin(3.0 * t), 0.0)
+    assert np.allclose(pulse[:, -1], expected_top)
+    assert np.all(pulse[:, :-1] == 0.0)
+
+    cfg["type"] = "continuous"
+    cont = build_force_schedule(cfg, t, M).as_matrix()
+    assert np.allclose(cont[:, -1], 500.0 * np.sin(3.0 * t))
+
+
+# ---------------------------------------------------------------------------
+# Exact state-space propagator
+# ---------------------------------------------------------------------------
+
+def test_state_space_propagator_exact_at_large_dt():
+    """
+    Damped SDOF free vibration has the closed form
+        x(t) = e^{-ζωt} (x0 cos ωd t + (ζω x0 / ωd) sin ωd t)
+    The propagator must match it to round-off even with dt ≈ T/3, where
+    Newmark-Beta would be badly period-elongated.
+    """
+    from sim_core.statespace import StateSpacePropagator
+
+    m, k, zeta = 2.0, 50.0, 0.05
+    w = np.sqrt(k / m)
+    wd = w * np.sqrt(1.0 - zeta ** 2)
+    model = SingleDOF.from_parameters(m=m, k=k, c=2.0 * zeta * w * m)
+
+    dt = (2.0 * np.pi / w) / 3.0
+    n_steps = 40
+    t = dt * np.arange(n_steps + 1)
+    F = np.zeros((n_steps + 1, 1))
+
+    x, v, a = StateSpacePropagator(model, dt).propagate(np.array([0.1]), np.array([0.0]), F)
+
+    x_exact = np.exp(-zeta * w * t) * (0.1 * np.cos(wd * t) + (zeta * w * 0.1 / wd) * np.sin(wd * t))
+    assert np.allclose(x[0], x_exact, atol=1e-12)
+    # Equation of motion holds exactly at every sample
+    assert np.allclose(m * a[0] + model.c * v[0] + k * x[0], 0.0, atol=1e-9)
+
+
+def test_time_integrator_exact_method_matches_rk45():
+    """TimeIntegrator(method="exact") must agree with the RK45 path on a forced SDOF."""
+    model = SingleDOF.from_parameters(m=1.0, k=4.0, c=0.2)
+
+    def f_func(t: float) -> np.ndarray:
+        return np.array([np.sin(1.5 * t)])
+
+    integrator = TimeIntegrator(model, f_func)
+    x0, v0 = np.array([0.05]), np.array([0.0])
+
+    rk = integrator.run(x0, v0, (0.0, 10.0), dt=0.01)
+    ex = integrator.run(x0, v0, (0.0, 10.0), dt=0.01, method="exact")
+
+    # RK45 runs at solve_ivp's default rtol=1e-3, so compare at that level
+    assert ex.x.shape == rk.x.shape
+    peak = np.max(np.abs(rk.x))
+    assert np.max(np.abs(ex.x - rk.x)) < 5e-3 * peak
+    assert np.max(np.abs(ex.a - rk.a)) < 5e-3 * np.max(np.abs(rk.a))
+
+
+def test_simulation_service_exact_integrator_streams_data():
+    """payload["integrator"] = "exact" must stream the same DATA frame shape as Newmark."""
+    import asyncio
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=2))
+    payload = {
+        "tf": 1.0, "dt": 0.1, "speed": 10.0, "integrator": "exact",
+        "force_function": {"type": "earthquake", "amp": 1.0},
+    }
+
+    async def collect():
+        return [f async for f in TimeSimulationService().run(model, payload)]
+
+    frames = asyncio.run(collect())
+    data = [f for f in frames if f["type"] == "DATA"]
+    assert frames[0]["type"] == "INIT" and frames[0]["solver"] is None   # no K_hat
+    assert len(data) == 10
+    assert set(data[0]) == {"type", "t", "x", "v", "a", "all_x", "all_v", "all_a"}
+    assert len(data[-1]["all_x"]) == 2
+
+
+# ---------------------------------------------------------------------------
+# Modal superposition engine
+# ---------------------------------------------------------------------------
+
+def _damped_building(dofs, zeta=0.05):
+    building = ShearBuilding.from_floor_data(
+        Hc=np.full((dofs, 2), 3.0),
+        Ec=np.full((dofs, 2), 30e9),
+        Ic=np.full((dofs, 2), 0.002),
+        Lb=np.full((dofs, 2), 6.0),
+        depth=6.0,
+        floor_mass=np.linspace(30_000.0, 10_000.0, dofs),
+        base_condition=1,
+    )
+    building.C = caughey_damping(building.M, building.K, zeta)
+    return building
+
+
+def test_modal_superposition_all_modes_matches_exact_propagator():
+    """
+    With every mode kept, modal superposition is the same exact recurrence as
+    the full state-space propagator, just diagonalized — results must agree.
+    """
+    from sim_core.forcing import build_force_schedule
+    from sim_core.modal_superposition import ModalSuperpositionStepper
+    from sim_core.statespace import StateSpacePropagator
+
+    building = _damped_building(dofs=6)
+    dt = 0.01
+    t = dt * np.arange(401)
+    forces = build_force_schedule({"type": "earthquake", "amp": 1.0}, t, building.M)
+    x0 = np.linspace(0.0, 1e-3, 6)
+
+    full = StateSpacePropagator(building, dt)
+    modal = ModalSuperpositionStepper(building, dt, mass_threshold=1.0)
+    assert modal.n_modes == 6
+
+    full.start(x0, np.zeros(6), forces)
+    modal.start(x0, np.zeros(6), forces)
+    for k in range(400):
+        full.advance(k)
+        modal.advance(k)
+        if k % 50 == 0:
+            for got, ref in zip(modal.state(), full.state()):
+                assert np.allclose(got, ref, rtol=1e-8, atol=1e-12 * np.max(np.abs(ref)) + 1e-15)
+
+
+def test_modal_superposition_truncates_by_effective_mass():
+    """The kept modes must be the fewest whose effective mass reaches the threshold."""
+    from sim_core.modal_superposition import ModalSuperpositionStepper
+
+    building = _damped_building(dofs=12)
+    stepper = ModalSuperpositionStepper(building, 0.01, mass_threshold=0.9)
+
+    total = np.trace(building.M)
+    # Mass-normalized modes: effective masses add up to the total mass
+    assert np.isclose(stepper.effective_mass.sum(), total, rtol=1e-8)
+
+    ratios = np.cumsum(stepper.effective_mass) / total
+    k = stepper.n_modes
+    assert 1 <= k < 12
+    assert ratios[k - 1] >= 0.9
+    assert k == 1 or ratios[k - 2] < 0.9
+    assert stepper.PHI.shape == (12, k)
+
+
+# ---------------------------------------------------------------------------
+# Symmetric-definite eigensolver
+# ---------------------------------------------------------------------------
+
+def test_modal_analyzer_modes_are_mass_orthonormal_and_match_dense_path():
+    """
+    The tridiagonal fast path (diagonal M, tridiagonal K) must return
+    M-orthonormal modes and the same spectrum as the general eigh path,
+    which a full (non-tridiagonal) K forces. n_modes must give exactly the
+    lowest modes of the full solve.
+    """
+    from sim_core.structures import StructureModel
+
+    building = _damped_building(dofs=30)
+    full = ModalAnalyzer(building).run()
+    PHI = full.modes
+
+    assert np.allclose(PHI.T @ building.M @ PHI, np.eye(30), atol=1e-10)
+    assert np.all(np.diff(full.frequencies) > 0)
+    assert np.all(PHI[-1, :] >= 0)   # roof-positive sign convention
+
+    # Same matrices through the general symmetric-definite solver: rotate
+    # the problem by a dense orthogonal Q so K is no longer banded.
+    Q, _ = np.linalg.qr(np.random.default_rng(0).normal(size=(30, 30)))
+    dense = StructureModel(M=Q.T @ building.M @ Q, K=Q.T @ building.K @ Q)
+    dense_modal = ModalAnalyzer(dense).run()
+    assert np.allclose(dense_modal.frequencies, full.frequencies, rtol=1e-9)
+
+    lowest = ModalAnalyzer(building, n_modes=4).run()
+    assert lowest.modes.shape == (30, 4)
+    assert np.allclose(lowest.frequencies, full.frequencies[:4], rtol=1e-10)
+    assert np.allclose(lowest.modes, PHI[:, :4], atol=1e-8)
+
+
+# ---------------------------------------------------------------------------
+# Banded ShearBuilding storage
+# ---------------------------------------------------------------------------
+
+def test_shear_building_banded_storage_and_lazy_dense():
+    """
+    ShearBuilding keeps only floor masses and story stiffnesses; dense M/K
+    appear on first access and must equal the classic assembly. Assigning a
+    new dense K must drop the (now stale) banded fast path.
+    """
+    dofs = 500
+    building = _damped_building(dofs=dofs, zeta=0.0)
+    fresh = ShearBuilding.from_floor_data(
+        Hc=building.Hc, Ec=building.Ec, Ic=building.Ic, Lb=building.Lb,
+        depth=6.0, floor_mass=building.floor_masses, base_condition=1,
+    )
+    assert fresh.__dict__["_M"] is None and fresh.__dict__["_K"] is None
+    assert fresh.is_banded and fresh.dofs == dofs
+
+    K_ref = stiffness_shear_structure(dofs, building.Hc, building.Ec, building.Ic, base=1)
+    assert np.allclose(fresh.K, K_ref, rtol=1e-12)
+    assert np.allclose(fresh.M, np.diag(building.floor_masses))
+
+    m, k_diag, k_off = fresh.tridiagonal_form()
+    assert np.allclose(k_diag, np.diag(K_ref)) and np.allclose(k_off, np.diag(K_ref, 1))
+
+    fresh.K = 2.0 * K_ref
+    assert not fresh.is_banded
+    assert np.allclose(fresh.tridiagonal_form()[1], 2.0 * np.diag(K_ref))
+
+
+def test_modal_service_truncates_mode_shapes_for_tall_models():
+    """Above DENSE_EXPORT_MAX_DOFS the response carries only the mass-carrying mode shapes."""
+    from sim_app.services import (DENSE_EXPORT_MAX_DOFS, MODE_EXPORT_MAX, ModalService,
+                                  StructureFactory)
+
+    small = ModalService().run(StructureFactory.create_shear_building(
+        _make_valid_model_req_dict(dofs=DENSE_EXPORT_MAX_DOFS)))
+    assert small["modes_exported"] == DENSE_EXPORT_MAX_DOFS
+    assert np.shape(small["modes"]) == (DENSE_EXPORT_MAX_DOFS, DENSE_EXPORT_MAX_DOFS)
+
+    tall = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=300))
+    resp = ModalService().run(tall)
+    k = resp["modes_exported"]
+    assert 1 <= k <= MODE_EXPORT_MAX and len(resp["periods"]) == 300
+    assert np.allclose(resp["modes"], tall.modal_basis.modes[:, :k])
+    assert "M_matrix" not in resp and "K_matrix" not in resp
+
+
+# ---------------------------------------------------------------------------
+# Factorize-once linear solver
+# ---------------------------------------------------------------------------
+
+def test_linear_solver_picks_factorization_and_solves_many_rhs():
+    """
+    LinearSolver must pick the factorization from the matrix structure, solve
+    (n,) and (n, R) right-hand sides, estimate conditioning, and raise on a
+    singular matrix instead of silently falling back to a pseudo-inverse.
+    """
+    from sim_core.linsolve import LinearSolver
+
+    building = _damped_building(dofs=40, zeta=0.0)
+    rng = np.random.default_rng(7)
+    B = rng.normal(size=(40, 5))
+
+    cases = {
+        "diagonal": building.M,
+        "banded-cholesky": building.K,
+        "cholesky": caughey_damping(building.M, building.K, 0.05) + building.K,
+        "ldl": building.K - 2.0 * building.K[0, 0] * np.eye(40),
+        "lu": building.K + np.triu(building.K, 1),
+    }
+    for kind, A in cases.items():
+        solver = LinearSolver(A)
+        assert solver.kind == kind
+        assert np.allclose(A @ solver.solve(B), B, rtol=1e-8, atol=1e-10 * np.abs(B).max())
+        assert np.allclose(solver.solve(B[:, 0]), solver.solve(B)[:, 0])
+        true_rcond = 1.0 / np.linalg.cond(A, 1)
+        assert true_rcond / 3.0 <= solver.rcond <= true_rcond * 1.0001
+
+    with pytest.raises(np.linalg.LinAlgError):
+        LinearSolver(np.ones((3, 3)))
+
+    # Conditioning is reported, and a near-singular K_hat warns when the stepper is built
+    from sim_core.newmark import NewmarkStepper
+    from sim_core.structures import StructureModel
+
+    info = LinearSolver(building.K).info()
+    assert info["kind"] == "banded-cholesky" and not info["ill_conditioned"]
+    assert LinearSolver(np.diag([1.0, 1e-14])).ill_conditioned
+    stiff = StructureModel(M=np.eye(2), K=np.diag([1e18, 0.0]))
+    with pytest.warns(RuntimeWarning, match="ill-conditioned"):
+        NewmarkStepper(stiff, 0.01)
+
+
+def test_newmark_stepper_matches_reference_helper():
+    """NewmarkStepper (factorized K_hat) must reproduce the explicit-inverse reference loop."""
+    from sim_core.newmark import NewmarkStepper
+
+    building = _damped_building(dofs=4)
+    dt = 0.01
+    x0 = np.array([1e-3, 2e-3, 3e-3, 4e-3])
+
+    def f_func(t):
+        return np.array([0.0, 0.0, 0.0, 1e4 * np.sin(5.0 * t)])
+
+    _, x_ref, v_ref = _newmark_beta(building, x0, np.zeros(4), tf=1.0, dt=dt, f_func=f_func)
+
+    stepper = NewmarkStepper(building, dt)
+    u, v, a = x0.copy(), np.zeros(4), np.zeros(4)
+    for i in range(100):
+        u, v, a = stepper.step(u, v, a, f_func((i + 1) * dt))
+    assert np.allclose(u, x_ref[:, -1], rtol=1e-9)
+    assert np.allclose(v, v_ref[:, -1], rtol=1e-9)
+
+
+# ---------------------------------------------------------------------------
+# Batched multi-structure kernel
+# ---------------------------------------------------------------------------
+
+def test_batch_simulator_matches_individual_runs():
+    """
+    Every member of a batched run must reproduce its own single-structure
+    run: Newmark against NewmarkStepper, exact against StateSpacePropagator.
+    """
+    from sim_core.batch import BatchSimulator
+    from sim_core.forcing import build_force_schedule
+    from sim_core.newmark import NewmarkStepper
+    from sim_core.statespace import StateSpacePropagator
+
+    models = [_damped_building(dofs=3, zeta=z) for z in (0.02, 0.05, 0.10)]
+    models[1].K = 1.5 * models[1].K
+    dt, n_samples = 0.01, 301
+    t = dt * np.arange(n_samples)
+    cfg = {"type": "earthquake", "amp": 1.0}
+
+    for method in ("newmark", "exact"):
+        sim = BatchSimulator.from_models(models, dt, method=method)
+        F = sim.force_history(cfg, t)
+        res = sim.run(np.zeros(3), np.zeros(3), F)
+        assert res.x.shape == (3, n_samples, 3)
+
+        for b, model in enumerate(models):
+            Fb = build_force_schedule(cfg, t, model.M).as_matrix()
+            if method == "exact":
+                x_ref, v_ref, a_ref = StateSpacePropagator(model, dt).propagate(
+                    np.zeros(3), np.zeros(3), Fb)
+            else:
+                stepper = NewmarkStepper(model, dt)
+                u, v, a = np.zeros(3), np.zeros(3), np.linalg.solve(model.M, Fb[0])
+                x_ref = np.zeros((3, n_samples))
+                for k in range(n_samples - 1):
+                    u, v, a = stepper.step(u, v, a, Fb[k + 1])
+                    x_ref[:, k + 1] = u
+            scale = np.max(np.abs(x_ref))
+            assert np.allclose(res.x[b], x_ref.T, rtol=1e-7, atol=1e-9 * scale)
+
+
+def test_batch_simulation_service_sweeps_column_sizes():
+    """A sweep over column inertia must return per-variant peaks; stiffer frames move less."""
+    from sim_app.services import BatchSimulationService
+
+    variants = []
+    for Ic in (0.001, 0.002, 0.004):
+        d = _make_valid_model_req_dict(dofs=3)
+        d["Ic"] = [[Ic, Ic]] * 3
+        variants.append(d)
+
+    resp = BatchSimulationService().run(variants, {
+        "tf": 5.0, "dt": 0.01, "force_function": {"type": "earthquake", "amp": 1.0},
+    })
+    roof_peaks = [p[-1] for p in resp["peaks"]["x"]]
+    assert resp["count"] == 3 and resp["dofs"] == 3
+    assert roof_peaks[0] > roof_peaks[1] > roof_peaks[2] > 0.0
+
+
+# ---------------------------------------------------------------------------
+# Response spectrum (vectorized SDOF oscillator bank)
+# ---------------------------------------------------------------------------
+
+def test_oscillator_bank_matches_single_sdof_propagator():
+    """Each oscillator in the bank must follow its own exact SDOF response."""
+    from sim_core.spectrum import OscillatorBank
+    from sim_core.statespace import StateSpacePropagator
+
+    dt = 0.01
+    t = dt * np.arange(1_500)
+    p = -get_el_centro_record()[1].max() * 9.807 * np.sin(4.0 * t) * (t < 5.0)
+
+    omega = np.array([2.0, 8.0, 30.0])
+    zeta = np.array([0.02, 0.05, 0.20])
+    peaks = OscillatorBank(omega, zeta, dt).peak_displacement(p)
+
+    for i in range(3):
+        sdof = SingleDOF.from_parameters(m=1.0, k=omega[i] ** 2, c=2.0 * zeta[i] * omega[i])
+        x, _, _ = StateSpacePropagator(sdof, dt).propagate(np.zeros(1), np.zeros(1), p[:, None])
+        assert np.isclose(peaks[i], np.max(np.abs(x)), rtol=1e-10)
+
+
+def test_response_spectrum_limits_and_cache():
+    """
+    A very stiff oscillator rides with the ground, so its PSA tends to the
+    peak ground acceleration. Repeat requests must be served from the cache.
+    """
+    from sim_app.services import SpectrumService, _cached_spectrum
+
+    _cached_spectrum.cache_clear()
+    payload = {"periods": [0.01, 0.5, 1.0, 2.0], "damping_ratios": [0.02, 0.05]}
+    first = SpectrumService().run(payload)
+    second = SpectrumService().run(payload)
+
+    assert _cached_spectrum.cache_info().hits == 1
+    assert first["PSA_g"] == second["PSA_g"]
+
+    pga_g = np.max(np.abs(get_el_centro_record()[1]))
+    PSA_g = np.array(first["PSA_g"])
+    assert PSA_g.shape == (2, 4)
+    assert np.allclose(PSA_g[:, 0], pga_g, rtol=0.02)
+    # More damping, less response at every period
+    assert np.all(np.array(first["SD"])[1] <= np.array(first["SD"])[0])
+
+
+def test_spectrum_request_bounds_oscillator_steps():
+    """periods x damping ratios x samples is capped before anything runs."""
+    from pydantic import ValidationError as PydanticValidationError
+    from api.main import MAX_SPECTRUM_WORK, SpectrumRequest
+    from sim_core.records import default_library
+    from sim_core.spectrum import spectrum_samples
+
+    SpectrumRequest.model_validate({})                                  # default grid fits
+    dense = {"periods": [0.01 * (i + 1) for i in range(500)], "damping_ratios": [0.05] * 10}
+    duration = default_library().get("el_centro").duration
+    assert 5000 * spectrum_samples(duration, dense["periods"])[1] > MAX_SPECTRUM_WORK
+    with pytest.raises(PydanticValidationError, match="MAX_SPECTRUM_WORK"):
+        SpectrumRequest.model_validate(dense)
+
+
+# ---------------------------------------------------------------------------
+# Binary WebSocket frame protocol
+# ---------------------------------------------------------------------------
+
+def test_binary_protocol_frames_match_json_frames():
+    """protocol="binary" packs the same steps as the JSON DATA frames, in blocks."""
+    import asyncio
+    from sim_app.framing import unpack_frames
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    base = {"tf": 1.0, "dt": 0.05, "speed": 10.0,
+            "force_function": {"type": "earthquake", "amp": 1.0}}
+
+    async def collect(payload):
+        return [f async for f in TimeSimulationService().run(model, payload)]
+
+    json_frames = [f for f in asyncio.run(collect(base)) if f["type"] == "DATA"]
+    binary = asyncio.run(collect({**base, "protocol": "binary",
+                                  "frames_per_message": 7, "binary_dtype": "float64"}))
+
+    assert binary[0]["type"] == "INIT" and binary[0]["protocol"] == "binary"
+    blocks = [unpack_frames(m) for m in binary[1:]]
+    assert all(isinstance(m, bytes) for m in binary[1:])
+    assert [b["x"].shape[0] for b in blocks] == [7, 7, 6]   # partial block flushed
+
+    t = np.concatenate([b["t"] for b in blocks])
+    x = np.concatenate([b["x"] for b in blocks])
+    a = np.concatenate([b["a"] for b in blocks])
+    assert np.allclose(t, [f["t"] for f in json_frames])
+    assert np.array_equal(x, [f["all_x"] for f in json_frames])
+    assert np.array_equal(a, [f["all_a"] for f in json_frames])
+
+    # float32 halves the payload and stays within single precision
+    small = asyncio.run(collect({**base, "protocol": "binary", "frames_per_message": 20}))
+    x32 = unpack_frames(small[1])["x"]
+    assert x32.dtype == np.float32
+    assert np.allclose(x32, x[:20], rtol=1e-6, atol=1e-9)
+
+
+def test_decimated_stream_keeps_every_peak_in_the_envelope():
+    """output_fps thins the frames; the envelope still covers the skipped steps."""
+    import asyncio
+    from sim_app.framing import unpack_frames
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    base = {"tf": 1.0, "dt": 0.01, "speed": 10.0,
+            "force_function": {"type": "earthquake", "amp": 1.0}}
+
+    async def collect(payload):
+        return [f async for f in TimeSimulationService().run(model, payload)]
+
+    full = [f for f in asyncio.run(collect(base)) if f["type"] == "DATA"]
+    # speed 10 -> 2000 steps per wall second; 300 fps -> every 7th step
+    frames = asyncio.run(collect({**base, "output_fps": 300, "envelope": True}))
+    assert frames[0]["stride"] == 7
+    data = [f for f in frames if f["type"] == "DATA"]
+    assert len(data) == 15                                  # 14 full strides + final step
+    assert data[0]["all_x"] == full[6]["all_x"]
+    assert data[-1]["all_x"] == full[-1]["all_x"]
+
+    x_full = np.array([f["all_x"] for f in full])
+    assert np.allclose(np.max([f["x_max"] for f in data], axis=0), x_full.max(axis=0))
+    assert np.allclose(np.min([f["a_min"] for f in data], axis=0),
+                       np.min([f["all_a"] for f in full], axis=0))
+
+    # Same frames in binary, final off-stride step in its own block
+    binary = asyncio.run(collect({**base, "output_fps": 300, "envelope": True,
+                                  "protocol": "binary", "binary_dtype": "float64"}))
+    blocks = [unpack_frames(m) for m in binary[1:]]
+    assert [b["x"].shape[0] for b in blocks] == [14, 1]
+    assert np.isclose(blocks[0]["t"][1] - blocks[0]["t"][0], 0.07)
+    assert np.array_equal(np.concatenate([b["x_max"] for b in blocks]),
+                          [f["x_max"] for f in data])
+
+
+# ---------------------------------------------------------------------------
+# Modal response cache
+# ---------------------------------------------------------------------------
+
+def test_response_cache_lru_ttl_and_counters():
+    """Canonical keys ignore key order; LRU, byte budget and TTL all evict."""
+    import json
+    from sim_app.cache import ResponseCache, canonical_hash
+    from sim_app.services import ModalService, StructureFactory, modal_response
+
+    req = _make_valid_model_req_dict(dofs=3)
+    assert canonical_hash(req) == canonical_hash(dict(reversed(list(req.items()))))
+
+    now = [0.0]
+    cache = ResponseCache(max_entries=2, max_bytes=10_000, ttl=10.0, clock=lambda: now[0])
+
+    key = canonical_hash(req)
+    assert cache.get(key) is None
+    cache.put(key, modal_response(req))
+    body = cache.get(key)
+    assert cache.get(key) is body
+    assert json.loads(body)["periods"] == ModalService().run(
+        StructureFactory.create_shear_building(req))["periods"]
+
+    cache.put("b", b"x" * 10)
+    cache.get(key)                      # refresh: "b" is now least recent
+    cache.put("c", b"y" * 10)
+    assert cache.get("b") is None and cache.get(key) is not None
+
+    cache.put("big", b"z" * 9_999)      # byte budget evicts the rest
+    assert len(cache) == 1
+
+    now[0] = 11.0
+    assert cache.get("big") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["evictions"], stats["expirations"]) == (4, 3, 1)
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_modal_endpoint_cache_ignores_damping_ratios():
+    """damping_ratios do not change the modes, so they must not split the cache."""
+    import asyncio
+    from api.main import ModelRequest, calculate_modal_properties, modal_cache
+
+    modal_cache.clear()
+    req = _make_valid_model_req_dict(dofs=3)
+    first = asyncio.run(calculate_modal_properties(ModelRequest.model_validate(
+        {**req, "damping_ratios": [0.02]})))
+    hits = modal_cache.hits
+    second = asyncio.run(calculate_modal_properties(ModelRequest.model_validate(
+        {**req, "damping_ratios": [0.05, 0.07]})))
+    assert modal_cache.hits == hits + 1 and len(modal_cache) == 1
+    assert second.body == first.body
+
+
+# ---------------------------------------------------------------------------
+# Trajectory cache (replay at any speed)
+# ---------------------------------------------------------------------------
+
+def test_repeat_simulation_replays_cached_trajectory_at_new_speed():
+    """Same physics at another speed streams identical frames without integrating."""
+    import asyncio
+    from sim_app import services
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    services.trajectory_cache.clear()
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    base = {"tf": 0.5, "dt": 0.01, "speed": 10.0, "damping_ratios": [0.03],
+            "force_function": {"type": "earthquake", "amp": 0.7}}
+
+    async def collect(payload):
+        return [f async for f in TimeSimulationService().run(model, payload)]
+
+    first = asyncio.run(collect(base))
+    assert first[0]["solver"]["kind"] == "cholesky" and first[0]["solver"]["rcond"] > 0
+    misses = services.trajectory_cache.misses
+    assert services.trajectory_cache.stats()["entries"] == 1
+
+    replay = asyncio.run(collect({**base, "speed": 5.0}))
+    assert services.trajectory_cache.hits >= 1 and services.trajectory_cache.misses == misses
+    assert replay == first
+
+    asyncio.run(collect({**base, "damping_ratios": [0.05]}))   # different physics
+    assert services.trajectory_cache.misses == misses + 1
+
+
+def test_trajectory_cache_spills_to_disk_and_reloads(tmp_path):
+    from sim_app.cache import Trajectory, TrajectoryCache
+
+    def traj(seed):
+        r = np.random.default_rng(seed)
+        return Trajectory(t=np.arange(50.0), x=r.normal(size=(50, 4)), v=r.normal(size=(50, 4)),
+                          a=r.normal(size=(50, 4)), periods=np.array([1.0, 0.5, 0.3, 0.2]),
+                          solver={"kind": "cholesky", "n": 4, "rcond": 0.01 * (seed + 1)})
+
+    one = traj(0).nbytes
+    cache = TrajectoryCache(max_bytes=one, spill_dir=str(tmp_path), max_disk_bytes=2 * one)
+    for i in range(4):
+        cache.put(f"k{i}", traj(i))
+
+    # k3 in memory, k1/k2 on disk, k0 pushed out of the disk budget
+    assert cache.stats()["spills"] == 3
+    assert cache.get("k0") is None
+    back = cache.get("k1")
+    assert isinstance(back.x, np.memmap) and np.array_equal(back.x, traj(1).x)
+    assert back.solver == traj(1).solver
+    assert cache.stats()["disk_hits"] == 1
+
+    # A new process picks up the existing spills
+    again = TrajectoryCache(max_bytes=one, spill_dir=str(tmp_path), max_disk_bytes=2 * one)
+    assert np.array_equal(again.get("k2").a, traj(2).a)
+
+
+# ---------------------------------------------------------------------------
+# Job executor (compute-ahead streaming off the event loop)
+# ---------------------------------------------------------------------------
+
+def _count_up(n, log):
+    for i in range(n):
+        log.append(i)
+        yield i
+
+
+def _burn_cpu():
+    while True:
+        sum(range(100_000))
+        yield 0
+
+
+def test_executor_stream_is_bounded_and_stops_with_the_consumer():
+    import asyncio
+    import time
+    from sim_app.executor import JobExecutor
+
+    ex = JobExecutor("thread", workers=2, max_queue=0)
+
+    async def slow_consumer():
+        log = []
+        gen = ex.stream(_count_up, 1_000, log, maxsize=2)
+        await gen.__anext__()
+        await asyncio.sleep(0.3)
+        ahead = len(log)
+        await gen.aclose()
+        await asyncio.sleep(0.3)
+        return ahead, len(log)
+
+    ahead, final = asyncio.run(slow_consumer())
+    # 1 consumed + 2 queued + 1 blocked on put, at most
+    assert ahead <= 5 and final <= 5
+    assert ex.stats()["cancelled"] == 1 and ex.stats()["active"] == 0
+
+    async def full_and_more():
+        log = []
+        items = [i async for i in ex.stream(_count_up, 50, log)]
+        return items
+
+    assert asyncio.run(full_and_more()) == list(range(50))
+
+    limited = JobExecutor("thread", workers=1, max_queue=0, cpu_time_limit=0.05)
+
+    async def run_busy():
+        from sim_app.executor import CpuTimeExceeded, ExecutorBusy
+        first = limited.stream(_burn_cpu)
+        await first.__anext__()
+        with pytest.raises(ExecutorBusy):
+            await limited.stream(_burn_cpu).__anext__()
+        start = time.monotonic()
+        with pytest.raises(CpuTimeExceeded):
+            async for _ in first:
+                pass
+        return time.monotonic() - start
+
+    assert asyncio.run(run_busy()) < 5.0
+    assert limited.stats()["rejected"] == 1 and limited.stats()["failed"] == 1
+
+
+def test_time_history_through_process_pool_matches_thread_pool():
+    """Same frames whether the job runs in a worker thread or a worker process."""
+    import asyncio
+    from sim_app import services
+    from sim_app.executor import JobExecutor
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    payload = {"tf": 0.6, "dt": 0.01, "speed": 10.0, "damping_ratios": [0.04],
+               "force_function": {"type": "earthquake", "amp": 1.3}}
+
+    async def collect():
+        model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+        return [f async for f in TimeSimulationService().run(model, payload)]
+
+    saved = services.executor
+    frames = {}
+    try:
+        for kind in ("thread", "process"):
+            services.trajectory_cache.clear()
+            services.executor = JobExecutor(kind, workers=1)
+            frames[kind] = asyncio.run(collect())
+            services.executor.shutdown()
+    finally:
+        services.executor = saved
+    assert frames["thread"] == frames["process"]
+    assert sum(f["type"] == "DATA" for f in frames["process"]) == 60
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+def test_scheduler_budget_round_robin_and_client_limit():
+    from sim_app.scheduler import AdmissionRejected, SimulationScheduler, estimate_cost
+
+    assert estimate_cost(1_000, 10) == 100_000
+    sch = SimulationScheduler(cost_budget=100, per_client_limit=3, max_queued=10)
+
+    big = sch.submit("a", 80)
+    assert big.admitted
+    a1, a2 = sch.submit("a", 30), sch.submit("a", 30)
+    b1 = sch.submit("b", 30)
+    with pytest.raises(AdmissionRejected):
+        sch.submit("a", 1)                       # a already holds 3
+
+    # Round-robin: a's second run waits behind b's first
+    assert [sch.position(t) for t in (a1, b1, a2)] == [1, 2, 3]
+
+    sch.release(big)                             # 30 + 30 + 30 fits in 100
+    assert a1.admitted and b1.admitted and a2.admitted
+    assert sch.stats()["cost_in_use"] == 90
+
+    # An over-budget run waits, then runs alone
+    huge = sch.submit("c", 500)
+    assert not huge.admitted and sch.position(huge) == 1
+    for t in (a1, b1, a2):
+        sch.release(t)
+    assert huge.admitted
+    sch.release(huge)
+    assert sch.stats()["running"] == 0 and sch.stats()["clients"] == 0
+
+
+def test_simulation_waits_in_queue_with_position_frames():
+    """A run that does not fit the budget streams QUEUED frames, then runs."""
+    import asyncio
+    from sim_app import services
+    from sim_app.scheduler import SimulationScheduler
+    from sim_app.services import TimeSimulationService, StructureFactory
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=2))
+    payload = {"tf": 0.2, "dt": 0.01, "speed": 10.0,
+               "force_function": {"type": "earthquake", "amp": 0.9}}
+    saved = services.scheduler
+    services.scheduler = SimulationScheduler(cost_budget=1.0, per_client_limit=1)
+
+    async def scenario():
+        blocker = services.scheduler.submit("other", 1.0)
+        frames = []
+
+        async def client():
+            async for f in TimeSimulationService().run(model, payload, client="me"):
+                frames.append(f)
+
+        task = asyncio.create_task(client())
+        await asyncio.sleep(0.05)
+        assert [f["type"] for f in frames] == ["QUEUED"] and frames[0]["position"] == 1
+
+        # Same client again: over its per-client limit
+        second = [f async for f in TimeSimulationService().run(model, payload, client="me")]
+        assert second[0]["type"] == "ERROR"
+
+        services.scheduler.release(blocker)
+        await task
+        return frames
+
+    try:
+        services.trajectory_cache.clear()
+        frames = asyncio.run(scenario())
+    finally:
+        services.scheduler = saved
+    assert frames[1]["type"] == "INIT"
+    assert sum(f["type"] == "DATA" for f in frames) == 20
+
+
+# ---------------------------------------------------------------------------
+# Shared modal basis
+# ---------------------------------------------------------------------------
+
+def test_modal_basis_is_cached_invalidated_and_reused():
+    from sim_core.modal import ModalBasis
+    from sim_core.modal_superposition import ModalSuperpositionStepper
+
+    building = _damped_building(dofs=5, zeta=0.04)
+    basis = building.modal_basis
+    assert building.modal_basis is basis
+    assert np.shares_memory(ModalSuperpositionStepper(building, 0.01).PHI, basis.modes)
+
+    # Effective masses of all modes add up to the total mass
+    assert np.isclose(basis.effective_mass.sum(), basis.total_mass)
+    assert np.allclose(basis.modal_masses, 1.0)
+
+    # Damping from the basis gives exactly 2ζω in every mode, and matches the
+    # standalone function
+    C = basis.damping_matrix([0.02, 0.05])
+    assert np.allclose(basis.modal_damping(C),
+                       2.0 * np.array([0.02] + [0.05] * 4) * basis.frequencies)
+    assert np.allclose(C, caughey_damping(building.M, building.K, [0.02, 0.05]))
+
+    # Setting C keeps the basis; changing K invalidates it
+    building.C = C
+    assert building.modal_basis is basis
+    building.K = 2.0 * building.K
+    fresh = building.modal_basis
+    assert fresh is not basis
+    assert np.allclose(fresh.frequencies, np.sqrt(2.0) * basis.frequencies)
+
+    sdof = ModalBasis.from_model(SingleDOF.from_parameters(m=2.0, k=8.0))
+    assert np.isclose(sdof.frequencies[0], 2.0) and np.isclose(sdof.effective_mass[0], 2.0)
+
+
+# ---------------------------------------------------------------------------
+# TimeIntegrator: ODE methods, vectorized accelerations, residual diagnostic
+# ---------------------------------------------------------------------------
+
+def test_time_integrator_methods_agree_and_residuals_are_opt_in():
+    building = _damped_building(dofs=4, zeta=0.05)
+    f_func = lambda t: 2e4 * np.sin(6.0 * t) * np.ones(4)
+    integrator = TimeIntegrator(building, f_func)
+    x0 = np.zeros(4)
+
+    exact = integrator.run(x0, x0, (0.0, 2.0), 0.01, method="exact", residual_samples=20)
+    assert exact.diagnostics["residual_norms"].size == 20
+    assert exact.diagnostics["max_relative_residual"] < 1e-8
+
+    ref = integrator.run(x0, x0, (0.0, 2.0), 0.01, method="DOP853", rtol=1e-11, atol=1e-14)
+    # "exact" treats the sine as piecewise-linear between samples
+    assert np.allclose(exact.x, ref.x, atol=1e-3 * np.max(np.abs(ref.x)))
+
+    for method in ("RK45", "Radau", "BDF"):
+        res = integrator.run(x0, x0, (0.0, 2.0), 0.01, method=method, rtol=1e-8, atol=1e-12)
+        assert res.diagnostics is None
+        assert np.allclose(res.x, ref.x, atol=1e-6 * np.max(np.abs(ref.x)))
+        # Vectorized accelerations match a per-sample solve
+        i = 57
+        a_i = np.linalg.solve(building.M, f_func(res.t[i]) - building.C @ res.v[:, i]
+                              - building.K @ res.x[:, i])
+        assert np.allclose(res.a[:, i], a_i)
+
+    with pytest.raises(ValueError):
+        integrator.run(x0, x0, (0.0, 1.0), 0.01, method="Euler")
+
+
+# ---------------------------------------------------------------------------
+# Ground-motion record library: text import, memmap store, resample cache
+# ---------------------------------------------------------------------------
+
+def test_record_text_formats_and_memmap_store(tmp_path):
+    from sim_core.records import RecordLibrary, parse_record_text
+
+    peer = ("PEER NGA STRONG MOTION DATABASE RECORD\n"
+            "Test event, station\n"
+            "ACCELERATION TIME SERIES IN UNITS OF G\n"
+            "NPTS=   5, DT=   .0100 SEC\n"
+            "  .1000E-01  .2000E-01 -.3000E-01\n"
+            "  .4000E-01 -.5000E-01\n")
+    acc, dt, t = parse_record_text(peer)
+    assert dt == 0.01 and t is None and np.allclose(acc, [0.01, 0.02, -0.03, 0.04, -0.05])
+
+    acc_c, dt_c, t_c = parse_record_text("# t a\n0.0 0.1\n0.02 0.2\n0.04 -0.1\n")
+    assert np.isclose(dt_c, 0.02) and t_c is None and np.allclose(acc_c, [0.1, 0.2, -0.1])
+    with pytest.raises(ValueError):
+        parse_record_text("0.1\n0.2\n", fmt="single")      # no dt
+
+    lib = RecordLibrary(str(tmp_path))
+    lib.import_text("quake_1", peer)
+    rec = lib.get("quake_1")
+    assert isinstance(rec.accel_g, np.memmap)
+    assert (tmp_path / "quake_1.npy").exists()
+
+    # A second library on the same directory sees the import
+    other = RecordLibrary(str(tmp_path))
+    assert "quake_1" in other.names() and "el_centro" in other.names()
+    assert other.get("quake_1").fingerprint == rec.fingerprint
+
+    with pytest.raises(ValueError):
+        lib.add("../escape", np.ones(4), dt=0.01)
+
+
+def test_record_direct_indexing_matches_interpolation():
+    from sim_core.records import RecordLibrary
+    from sim_core.forcing import build_force_schedule
+
+    lib = RecordLibrary()
+    rng = np.random.default_rng(1)
+    lib.add("noise", rng.normal(scale=0.2, size=3000), dt=0.005)
+    rec = lib.get("noise")
+
+    t = np.arange(200, 1200) * 0.005                    # aligned with the record's dt
+    direct = lib.ground_acceleration("noise", t)
+    interp = np.interp(t, rec.times(), rec.accel_g, left=0.0, right=0.0) * 9.807
+    assert np.allclose(direct, interp)
+    assert lib.resampled("noise", 0.005).size == rec.npts
+
+    t2 = np.arange(0.0, 20.0, 0.02)                     # other dt, runs past the end
+    resampled = lib.ground_acceleration("noise", t2)
+    assert np.allclose(resampled, np.interp(t2, rec.times(), rec.accel_g,
+                                            left=0.0, right=0.0) * 9.807)
+    assert np.all(resampled[t2 > rec.duration] == 0.0)
+
+    # The built-in record still reproduces the legacy interpolation
+    t3 = np.arange(0.0, 30.0, 0.02)
+    t_data, a_data_g = get_el_centro_record()
+    assert np.allclose(lib.ground_acceleration("el_centro", t3, 1.5),
+                       1.5 * 9.807 * np.interp(t3, t_data, a_data_g, left=0.0, right=0.0))
+
+    # force_function selects a record by name from the default library
+    model = SingleDOF.from_parameters(m=2.0, k=8.0)
+    from sim_core.records import default_library
+    default_library().add("noise_fn", rec.accel_g, dt=0.005)
+    forces = build_force_schedule({"type": "earthquake", "record": "noise_fn", "amp": 2.0},
+                                  t, model.M)
+    assert np.allclose(forces.as_matrix()[:, 0], -2.0 * model.M[0, 0] * interp)
+
+
+# ---------------------------------------------------------------------------
+# Streamed record upload: chunked binary samples feed a running simulation
+# ---------------------------------------------------------------------------
+
+def test_streamed_record_upload_matches_library_record():
+    import asyncio
+    from sim_app import services
+    from sim_app.services import TimeSimulationService, StructureFactory
+    from sim_app.upload import RecordStream, pump_record
+    from sim_core.records import default_library
+
+    samples = np.random.default_rng(3).normal(scale=0.1, size=4000).astype(np.float32)
+    default_library().add("upload_ref", samples, dt=0.005)
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    base = {"tf": 8.0, "dt": 0.01, "speed": 10.0, "output_fps": 200,
+            "force_function": {"type": "earthquake", "amp": 1.3}}
+
+    async def run(payload, messages=None):
+        upload = pump = None
+        if messages is not None:
+            pending = list(messages)
+
+            async def receive_bytes():
+                return pending.pop(0)
+            upload = services.executor.channel(2)
+            pump = asyncio.create_task(pump_record(receive_bytes, upload,
+                                                   samples.size, "float32"))
+        frames = [f async for f in TimeSimulationService().run(model, payload, upload=upload)]
+        if pump is not None:
+            await pump
+        return frames
+
+    messages = [c.tobytes() for c in np.array_split(samples, 9)]
+    named = {**base["force_function"], "record": "upload_ref"}
+    for integrator in ("modal", "newmark"):
+        ref = asyncio.run(run({**base, "integrator": integrator, "force_function": named}))
+        streamed = asyncio.run(run({**base, "integrator": integrator,
+                                    "record_upload": {"npts": samples.size, "dt": 0.005}},
+                                   messages))
+        xs = [f["all_x"] for f in streamed if f["type"] == "DATA"]
+        assert xs and np.allclose(xs, [f["all_x"] for f in ref if f["type"] == "DATA"])
+
+    bad = asyncio.run(run({**base, "record_upload": {"npts": samples.size, "dt": 0.005}},
+                          [samples[:3].tobytes() + b"x"]))
+    assert bad[-1]["type"] == "ERROR" and "whole number" in bad[-1]["message"]
+
+    # The worker keeps only the samples the next window can still need
+    import queue, threading
+    from sim_app.executor import Channel
+    channel = Channel(queue.Queue(), threading.Event())
+    for c in np.array_split(samples.astype(float), 40):
+        channel.queue.put(c)
+    stream = RecordStream(channel, dt=0.005, npts=samples.size)
+    t = np.arange(0.0, 21.0, 0.01)
+    for k0 in range(0, t.size - 1, 100):
+        stream.history(t[k0:k0 + 101])
+        assert stream._buf.size <= 2 * 100 + 101
+
+
+# ---------------------------------------------------------------------------
+# Frequency-domain (FFT) response
+# ---------------------------------------------------------------------------
+
+def test_fft_transient_matches_exact_propagator_and_steady_state_is_analytic():
+    from sim_core.frequency import FrequencyResponseSolver
+    from sim_core.forcing import build_force_schedule
+    from sim_core.statespace import StateSpacePropagator
+
+    building = _damped_building(dofs=4, zeta=0.05)
+    dt, n = 0.005, 4000
+    t = dt * np.arange(n + 1)
+    forces = build_force_schedule({"type": "earthquake", "amp": 1.0}, t, building.M)
+    solver = FrequencyResponseSolver(building)
+    fft = solver.solve_schedule(forces, dt)
+    assert fft.diagnostics["tail_amplitude"] < 1e-5
+
+    prop = StateSpacePropagator(building, dt)
+    prop.start(np.zeros(4), np.zeros(4), forces)
+    x = [np.zeros(4)]
+    for k in range(n):
+        prop.advance(k)
+        x.append(prop.state()[0])
+    assert np.allclose(fft.x, x, atol=2e-3 * np.max(np.abs(x)))
+    # a is the equation of motion evaluated on x, v
+    rhs = forces.as_matrix() - fft.v @ building.C.T - fft.x @ building.K.T
+    assert np.allclose(fft.a, np.linalg.solve(building.M, rhs.T).T)
+
+    # General (R, n_samples, n) loads give the same answer as the separable path
+    both = solver.solve(np.stack([forces.as_matrix(), 2.0 * forces.as_matrix()]), dt)
+    assert np.allclose(both.x[0], fft.x) and np.allclose(both.x[1], 2.0 * fft.x)
+
+    # Steady state of a harmonic load over whole periods: X = H(Ω) F
+    Omega, n_per = 6.0, 400
+    dt_s = 2.0 * np.pi / Omega / n_per
+    t_s = dt_s * np.arange(3 * n_per)
+    F = np.outer(np.sin(Omega * t_s), np.ones(4)) * 1e4
+    steady = solver.solve(F, dt_s, mode="steady")
+    Hm = np.linalg.inv(building.K - Omega ** 2 * building.M + 1j * Omega * building.C)
+    X = Hm @ (np.ones(4) * 1e4)
+    expected = np.imag(np.outer(np.exp(1j * Omega * t_s), X))
+    assert np.allclose(steady.x, expected, atol=1e-8 * np.max(np.abs(expected)))
+
+
+def test_batch_service_fft_matches_newmark_peaks():
+    from sim_app.services import BatchSimulationService
+
+    variants = [_make_valid_model_req_dict(dofs=3) for _ in range(2)]
+    variants[1]["Ic"] = [[0.004, 0.004]] * 3
+    payload = {"tf": 10.0, "dt": 0.005, "force_function": {"type": "earthquake", "amp": 1.0}}
+    stepped = BatchSimulationService().run(variants, payload)
+    fft = BatchSimulationService().run(variants, {**payload, "integrator": "fft"})
+    assert fft["count"] == 2
+    assert np.allclose(fft["peaks"]["x"], stepped["peaks"]["x"], rtol=2e-2)
+
+
+# ---------------------------------------------------------------------------
+# Persistent simulation sessions
+# ---------------------------------------------------------------------------
+
+def test_session_pause_seek_resume_and_force_change():
+    import asyncio
+    from sim_app.services import StructureFactory, TimeSimulationService
+    from sim_app.session import SimulationSession
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    base = {"tf": 3.0, "dt": 0.01, "speed": 20.0, "integrator": "newmark",
+            "force_function": {"type": "earthquake", "amp": 1.0}}
+
+    async def one_shot(payload):
+        return [f async for f in TimeSimulationService().run(model, payload)
+                if f["type"] == "DATA"]
+
+    async def session(payload, on_frame):
+        s, out = SimulationSession(model, payload), []
+        async for f in s.run():
+            out.append(f)
+            on_frame(s, f)
+            if f["type"] == "DONE":
+                s.control({"action": "stop"})
+        return out
+
+    ref = asyncio.run(one_shot(base))
+
+    paused = []
+
+    def pause_then_seek(s, f):
+        if f["type"] == "DATA" and abs(f["t"] - 1.0) < 1e-9 and not paused:
+            paused.append(f["t"])         # once: the replay passes t = 1.0 again
+            s.control({"action": "pause"})
+        elif f["type"] == "PAUSED":
+            s.control({"action": "seek", "t": 0.5})
+            s.control({"action": "resume"})
+
+    out = asyncio.run(session(base, pause_then_seek))
+    assert [f["type"] for f in out if f["type"] != "DATA"] == \
+        ["INIT", "PAUSED", "SEEK", "RESUMED", "DONE"]
+    seek = next(i for i, f in enumerate(out) if f["type"] == "SEEK")
+    replay = [f["all_x"] for f in out[seek:] if f["type"] == "DATA"]
+    assert np.allclose(replay, [f["all_x"] for f in ref[50:]])
+
+    # Restarting with the same load mid-run is seamless; a new load changes the rest
+    def change_force(force):
+        def on_frame(s, f):
+            if f["type"] == "DATA" and abs(f["t"] - 1.0) < 1e-9:
+                s.control({"action": "set_force", "force_function": force})
+        return on_frame
+
+    same = asyncio.run(session(base, change_force(base["force_function"])))
+    assert np.allclose([f["all_x"] for f in same if f["type"] == "DATA"],
+                       [f["all_x"] for f in ref])
+    pulse = {"type": "pulse", "amp": 5000, "freq": 6.0, "duration": 10}
+    other = asyncio.run(session(base, change_force(pulse)))
+    xs = [f["all_x"] for f in other if f["type"] == "DATA"]
+    assert len(xs) == len(ref)
+    assert np.allclose(xs[:101], [f["all_x"] for f in ref[:101]])
+    assert not np.allclose(xs[101:], [f["all_x"] for f in ref[101:]])
+
+    bad = asyncio.run(session(base, lambda s, f: f["type"] == "INIT" and s.control(
+        {"action": "set_force", "force_function": {"type": "earthquake", "record": "nope"}})))
+    errors = [f for f in bad if f["type"] == "ERROR"]
+    assert errors and errors[0]["fatal"] is False and bad[-1]["type"] == "DONE"
+
+
+def test_paused_session_gives_up_its_admission_slot(monkeypatch):
+    import asyncio
+    from sim_app import services
+    from sim_app.scheduler import SimulationScheduler
+    from sim_app.services import StructureFactory
+    from sim_app.session import SimulationSession
+
+    scheduler = SimulationScheduler(cost_budget=1.0)     # one run at a time
+    monkeypatch.setattr(services, "scheduler", scheduler)
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    payload = {"tf": 40.0, "dt": 0.01, "speed": 50.0, "integrator": "newmark",
+               "force_function": {"type": "earthquake", "amp": 1.0}}
+    other = []
+
+    async def session():
+        s, out = SimulationSession(model, payload), []
+        async for f in s.run():
+            out.append(f)
+            if f["type"] == "DATA" and abs(f["t"] - 1.0) < 1e-9:
+                s.control({"action": "pause"})
+            elif f["type"] == "PAUSED":
+                assert scheduler.stats()["running"] == 0
+                other.append(scheduler.submit("other", 1.0))   # admitted in our place
+                assert other[0].admitted
+                s.control({"action": "resume"})
+            elif f["type"] == "QUEUED" and other:
+                scheduler.release(other.pop())
+            elif f["type"] == "DONE":
+                s.control({"action": "stop"})
+        return out
+
+    out = asyncio.run(session())
+    assert [f["type"] for f in out if f["type"] != "DATA"] == \
+        ["INIT", "PAUSED", "RESUMED", "QUEUED", "DONE"]
+    assert sum(f["type"] == "DATA" for f in out) == 4000
+    assert scheduler.stats()["running"] == 0 and scheduler.queued == 0
+
+
+# ---------------------------------------------------------------------------
+# Model registry
+# ---------------------------------------------------------------------------
+
+def test_registered_model_reuses_operators_and_matches_inline_runs():
+    import asyncio
+    from api.main import WsPayload
+    from sim_app.registry import ModelRegistry, RegisteredModel
+    from sim_app.services import (TimeSimulationService, StructureFactory, register_model,
+                                  registered_stepper, registry_key, model_registry,
+                                  trajectory_cache)
+
+    req = _make_valid_model_req_dict(dofs=4)
+    key = registry_key(req)
+    assert key == registry_key({**req, "damping_ratios": [0.1]})   # a run setting, not the model
+    model, modal_body = register_model(req)
+    entry = model_registry.add(RegisteredModel(key, model, modal_body))
+    assert model_registry.get(key) is entry and "_modal_basis" in model.__dict__
+
+    payload = {"tf": 2.0, "dt": 0.01, "speed": 10.0, "integrator": "exact",
+               "damping_ratios": [0.05], "force_function": {"type": "earthquake", "amp": 1.0}}
+
+    async def run(model, **kw):
+        return [f async for f in TimeSimulationService().run(model, payload, **kw)
+                if f["type"] == "DATA"]
+
+    inline = asyncio.run(run(StructureFactory.create_shear_building(req)))
+    trajectory_cache.clear()
+    registered = asyncio.run(run(entry.model, entry=entry))
+    assert np.allclose([f["all_x"] for f in registered], [f["all_x"] for f in inline])
+    assert not np.any(entry.model.C)              # damping lives on the operators' copy
+    assert entry.operators == 1
+
+    # The same settings get a fresh stepper on the same operators
+    a = asyncio.run(registered_stepper(entry, payload))
+    b = asyncio.run(registered_stepper(entry, payload))
+    assert a is not b and a.Phi is b.Phi and entry.operators == 1
+    asyncio.run(registered_stepper(entry, {**payload, "dt": 0.02}))
+    assert entry.operators == 2 and model_registry.stats()["operators"] >= 2
+
+    # Bounded by count and bytes; the entry being added always stays
+    small = ModelRegistry(max_entries=2, max_bytes=10 * entry.nbytes)
+    for i in range(3):
+        small.add(RegisteredModel(f"{i:064x}", model, modal_body))
+    assert len(small) == 2 and f"{0:064x}" not in small and small.stats()["evictions"] == 1
+    tiny = ModelRegistry(max_bytes=1)
+    tiny.add(RegisteredModel(key, model, modal_body))
+    assert key in tiny
+
+    with pytest.raises(Exception):
+        WsPayload.model_validate({"model_req": req, "model_id": key})
+    with pytest.raises(Exception):
+        WsPayload.model_validate({"model_id": "not-a-hash"})
+    assert WsPayload.model_validate({"model_id": key}).model_req is None
+
+
+# ---------------------------------------------------------------------------
+# Load suites (one model, many excitations)
+# ---------------------------------------------------------------------------
+
+def test_load_suite_matches_single_runs_and_reports_peaks():
+    from sim_core.batch import LoadSuiteSimulator
+    from sim_core.forcing import build_force_schedule, build_load_suite
+    from sim_core.newmark import NewmarkStepper
+    from sim_core.statespace import StateSpacePropagator
+    from sim_app.services import LoadSuiteService
+
+    building = _damped_building(dofs=4, zeta=0.05)
+    dt = 0.01
+    t = dt * np.arange(401)
+    loads = [{"type": "earthquake", "amp": s} for s in (0.5, 1.0, 2.0)] + \
+            [{"type": "continuous", "amp": 2000.0, "freq": 7.0}]
+    suite = build_load_suite(loads, t, building.M)
+    assert suite.size == 4 and suite[10].shape == (4, 4)
+
+    for cls, method in ((NewmarkStepper, "newmark"), (StateSpacePropagator, "exact")):
+        result = LoadSuiteSimulator.from_model(building, dt, method).run(
+            suite, keep_histories=True)
+        assert result.histories.x.shape == (4, t.size, 4)
+        for r, cfg in enumerate(loads):
+            stepper = cls(building, dt)
+            stepper.start(np.zeros(4), np.zeros(4), build_force_schedule(cfg, t, building.M))
+            x = [np.zeros(4)]
+            for k in range(t.size - 1):
+                stepper.advance(k)
+                x.append(stepper.state()[0])
+            assert np.allclose(result.histories.x[r], x, rtol=1e-10, atol=1e-14)
+        x = result.histories.x
+        drift = np.diff(x, axis=2, prepend=0.0)
+        assert np.allclose(result.peaks["x"], np.max(np.abs(x), axis=1))
+        assert np.allclose(result.peaks["drift"], np.max(np.abs(drift), axis=1))
+        # Linear in the scale factor
+        assert np.allclose(result.peaks["x"][2], 4.0 * result.peaks["x"][0])
+
+    resp = LoadSuiteService().run(building, {"tf": 4.0, "dt": dt, "loads": loads,
+                                             "damping_ratios": [0.05]})
+    assert resp["count"] == 4 and "x" not in resp
+    assert [row["amp"] for row in resp["records"]] == [0.5, 1.0, 2.0, 2000.0]
+    assert resp["records"][0]["record"] == "el_centro"
+    assert 1 <= resp["records"][1]["peak_drift_story"] <= 4
+
+
+# ---------------------------------------------------------------------------
+# Incremental dynamic analysis
+# ---------------------------------------------------------------------------
+
+def test_ida_by_superposition_matches_scaled_runs():
+    from sim_app.services import IDAService, LoadSuiteService, StructureFactory
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=3))
+    scales = [0.25, 0.5, 1.0, 1.5, 3.0]
+    base = {"tf": 5.0, "dt": 0.01, "damping_ratios": [0.05]}
+    ida = IDAService().run(model, {**base, "scale_factors": scales})
+    assert ida["cost"]["integrated_runs"] == 1 and ida["cost"]["saving_factor"] == 5
+    assert ida["cost"]["steps_saved"] == 4 * 500
+
+    direct = LoadSuiteService().run(model, {**base, "loads": [
+        {"type": "earthquake", "amp": s} for s in scales]})
+    curve = ida["curves"][0]
+    assert np.allclose(curve["peak_roof_x"], [r["peak_roof_x"] for r in direct["records"]])
+    assert np.allclose(curve["peak_drift"], [r["peak_drift"] for r in direct["records"]])
+    assert np.allclose(np.diff(curve["sa_t1_g"]) / np.diff(scales), curve["sa_t1_g"][2])
+    assert curve["peak_drift_ratio"][2] > 0
+
+
+# ---------------------------------------------------------------------------
+# Monte Carlo uncertainty propagation
+# ---------------------------------------------------------------------------
+
+def test_monte_carlo_batches_match_per_sample_models_and_stop_early():
+    import asyncio
+    from sim_core.matrices import story_stiffness
+    from sim_core.modal import ModalBasis
+    from sim_core.stochastic import StochasticShearBuilding, batched_modes
+    from sim_app.services import MonteCarloService, StructureFactory, monte_carlo_batch
+
+    model = StructureFactory.create_shear_building(_make_valid_model_req_dict(dofs=4))
+    stochastic = StochasticShearBuilding(model, {
+        "Ec": {"dist": "lognormal", "cov": 0.1},
+        "Hc": {"dist": "uniform", "low": 0.95, "high": 1.05, "scope": "story"},
+        "floor_mass": {"dist": "normal", "cov": 0.05, "scope": "global"}})
+    m, k = stochastic.sample(6, np.random.default_rng(1))
+    omega = batched_modes(m, k)
+    for s in range(6):
+        # Vectorized assembly and stacked eigen-solve vs one building at a time
+        assert np.allclose(m[s] / m[s, 0], 1.0)                 # one global mass factor
+        single = ShearBuilding(floor_masses=m[s], story_stiffness=k[s])
+        assert np.allclose(omega[s], np.sort(ModalBasis.from_model(single).frequencies))
+    H = np.broadcast_to(model.Hc, (6,) + model.Hc.shape)
+    assert np.allclose(story_stiffness(4, H, model.Ec, model.Ic),
+                       np.broadcast_to(model.story_stiffness, (6, 4)))
+
+    base = {"seed": 3, "tf": 2.0, "dt": 0.01, "force_function": {"type": "earthquake", "amp": 1.0},
+            "damping_ratios": [0.05]}
+    fixed = monte_carlo_batch(model, base, 0, 5)
+    assert np.allclose(fixed["periods"], model.modal_basis.periods)
+    assert np.allclose(fixed["peak_drift"], fixed["peak_drift"][0], rtol=1e-12)
+
+    async def collect(payload):
+        return [f async for f in MonteCarloService().run(model, payload)]
+
+    payload = {**base, "distributions": {"Ic": {"dist": "lognormal", "cov": 0.05}},
+               "n_samples": 2000, "batch_size": 50, "min_samples": 100, "rel_tol": 0.02}
+    frames = asyncio.run(collect(payload))
+    assert [f["type"] for f in frames[:2]] == ["INIT", "STATS"]
+    done = frames[-1]
+    assert done["type"] == "DONE" and done["reason"] == "converged"
+    assert 100 <= done["samples"] < 2000
+    stats = frames[-2]["statistics"]
+    assert set(stats) == {"periods", "peak_drift"} and stats["periods"]["std"][0] > 0
+    q = stats["periods"]["quantiles"]
+    assert q["0.05"][0] < q["0.5"][0] < q["0.95"][0]
+    # Same seed, same statistics, however the batches were scheduled
+    assert asyncio.run(collect(payload))[-2] == frames[-2]
+
+    bad = asyncio.run(collect({**payload, "distributions": {"Lb": {"dist": "normal"}}}))
+    assert bad[0]["type"] == "ERROR"